@@ -116,7 +116,17 @@ DEFAULT_CONFIG = {
     "rbot_enabled": True,
     "rbot_enabled_groups": [],
     "rbot_admin_users": [],
-    "rbot_weekly_reset_day": 0
+    "rbot_weekly_reset_day": 0,
+    "flush_interval_seconds": 10,
+    "flush_max_mutations": 200,
+    "storage_backend": "json",
+    "render_pool_size": 2,
+    "avatar_cache_ttl_hours": 72,
+    "avatar_cache_max_mb": 50,
+    "render_backend": "playwright",
+    "pillow_font_path": "",
+    "persistent_render_page": False,
+    "render_worker_enabled": False
 }
 
 # 支持的命令列表
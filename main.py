@@ -5,14 +5,17 @@
 
 # 标准库导入
 import asyncio 
+import copy
 import os
+import time
 import aiofiles
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any
 import json
 import os
-# 第三方库导入
-from cachetools import TTLCache
+
+# 记录本模块导入耗时，计入启动耗时统计
+_MODULE_IMPORT_STARTED = time.perf_counter()
 
 # AstrBot框架导入
 from astrbot.api.event import filter, AstrMessageEvent
@@ -23,10 +26,16 @@ from astrbot.api import logger as astrbot_logger
 # 本地模块导入
 from .utils.data_manager import DataManager
 from .utils.image_generator import ImageGenerator, ImageGenerationError
-from .utils.validators import Validators
+from .utils.validators import Validators, ValidationError
+from .utils.ranking import top_k
+from .utils.rank_service import RankService
+from .utils.avatar_cache import AvatarCache
+from .utils.single_flight import SingleFlight
+from .utils.member_directory import MemberDirectory
+from .utils.nickname_cache import NicknameCache
 
 from .utils.models import (
-    UserData, PluginConfig, GroupInfo, MessageDate, 
+    UserData, GroupUsers, PluginConfig, GroupInfo, MessageDate, 
     RankType
 )
 
@@ -47,6 +56,8 @@ from .utils.exception_handlers import (
     safe_generation,
     safe_timer_operation
 )
+
+_MODULE_IMPORT_SECONDS = time.perf_counter() - _MODULE_IMPORT_STARTED
 #===========JSON操作导入===========
 # JSON处理模块
 class JsonHandler:
@@ -196,10 +207,16 @@ Json = JsonHandler
 # ========== 全局常量定义 ==========
 
 # 缓存配置
-CACHE_TTL_SECONDS = 300
 USER_NICKNAME_CACHE_TTL = 600
+USER_NICKNAME_CACHE_MAXSIZE = 5000
 MAX_RANK_COUNT = 100
 
+# 图片生成器在后台启动，排行榜请求最多等待这么久（秒），超时后本次使用文字模式
+IMAGE_GENERATOR_WAIT_SECONDS = 10
+
+# 直接修改成员目录的群成员变动通知类型（OneBot v11）
+MEMBER_NOTICE_TYPES = ('group_increase', 'group_decrease', 'group_card')
+
 # 配置键名
 RANK_COUNT_KEY = 'rand'
 IMAGE_MODE_KEY = 'if_send_pic'
@@ -224,7 +241,9 @@ class MessageStatsPlugin(Star):
         data_manager (DataManager): 数据管理器,负责数据的存储和读取
         plugin_config (PluginConfig): 插件配置对象
         image_generator (ImageGenerator): 图片生成器,用于生成排行榜图片
-        group_members_cache (TTLCache): 群成员列表缓存,5分钟TTL
+        avatar_cache (AvatarCache): 本地头像缓存,渲染排行榜图片时不访问头像服务器
+        member_directory (MemberDirectory): 持久化的群成员目录,记录发言时查询昵称不等待平台API
+        nickname_cache (NicknameCache): 按(群组, 用户)缓存的昵称,10分钟TTL
         logger: 日志记录器
         initialized (bool): 插件初始化状态
         
@@ -247,25 +266,29 @@ class MessageStatsPlugin(Star):
         # 使用StarTools获取插件数据目录
         data_dir = StarTools.get_data_dir('message_stats')
         
-        # 初始化组件
-        self.data_manager = DataManager(data_dir)
-        
         # 使用AstrBot的标准配置系统
         self.config = config
         self.plugin_config = self._convert_to_plugin_config()
+        
+        # 初始化组件（存储后端由配置决定）
+        self.data_manager = DataManager(data_dir, storage_backend=self.plugin_config.storage_backend)
+        # 排行榜筛选、标题和文字生成，命令和定时推送共用
+        self.rank_service = RankService(self.data_manager, self.logger)
+        # 合并同一排行榜的并发计算和图片渲染
+        self.rank_flight = SingleFlight()
         self.image_generator = None
+        self.avatar_cache = None
+        # 图片生成器（浏览器）的后台初始化任务
+        self.image_generator_task: Optional[asyncio.Task] = None
         
         # 群组unified_msg_origin映射表 - 用于主动消息发送
         self.group_unified_msg_origins = {}
         
-        # 群成员列表缓存 - 5分钟TTL,减少API调用
-        self.group_members_cache = TTLCache(maxsize=100, ttl=CACHE_TTL_SECONDS)
-        
-        # 群成员字典缓存 - 用于快速查找群成员信息
-        self.group_members_dict_cache = {}
+        # 群成员目录 - 成员列表保存在磁盘上，过期后在后台刷新
+        self.member_directory = MemberDirectory(self.data_manager.data_dir / "cache" / "members", logger=self.logger)
         
-        # 用户昵称缓存 - 缓存用户ID到昵称的映射，减少重复查找
-        self.user_nickname_cache = TTLCache(maxsize=500, ttl=USER_NICKNAME_CACHE_TTL)
+        # 昵称缓存 - 按(群组, 用户)缓存群名片/昵称，同一用户在不同群的昵称互不影响
+        self.nickname_cache = NicknameCache(maxsize=USER_NICKNAME_CACHE_MAXSIZE, ttl=USER_NICKNAME_CACHE_TTL)
         
         # 定时任务管理器 - 延迟初始化
         self.timer_manager = None
@@ -373,26 +396,40 @@ class MessageStatsPlugin(Star):
         """
         try:
             self.logger.info("群发言统计插件初始化中...")
+            timings = {"模块导入": _MODULE_IMPORT_SECONDS}
+            started = step_started = time.perf_counter()
+            
+            def mark(step: str):
+                nonlocal step_started
+                now = time.perf_counter()
+                timings[step] = now - step_started
+                step_started = now
             
             # 步骤1: 初始化数据管理器
             await self._initialize_data_manager()
+            mark("数据管理器")
             
-            # 步骤2: 加载插件配置和创建图片生成器
+            # 步骤2: 加载插件配置和创建图片生成器（浏览器在后台启动）
             await self._load_plugin_config()
+            mark("配置加载")
             
             # 步骤3: 设置数据管理器的配置引用
             self.data_manager.set_plugin_config(self.plugin_config)
             
             # 步骤4: 初始化定时任务管理器
             await self._initialize_timer_manager()
+            mark("定时任务")
             
             # 步骤5: 初始化Rbot功能定时任务
             await self._initialize_rbot_timers()
+            mark("Rbot定时任务")
             
             # 步骤6: 设置缓存和最终初始化状态
             await self._setup_caches()
+            mark("缓存设置")
             
-            self.logger.info("群发言统计插件初始化完成")
+            breakdown = ", ".join(f"{step} {seconds * 1000:.0f}ms" for step, seconds in timings.items())
+            self.logger.info(f"群发言统计插件初始化完成，耗时 {(time.perf_counter() - started) * 1000:.0f}ms（{breakdown}）")
             
         except (OSError, IOError) as e:
             self.logger.error(f"插件初始化失败: {e}")
@@ -426,22 +463,57 @@ class MessageStatsPlugin(Star):
         # 更新插件配置（从AstrBot配置转换）
         self.plugin_config = self._convert_to_plugin_config()
         
-        # 创建图片生成器
-        self.image_generator = ImageGenerator(self.plugin_config)
+        # 创建本地头像缓存和图片生成器
+        self.avatar_cache = AvatarCache(
+            self.data_manager.data_dir / "cache" / "avatars",
+            ttl=self.plugin_config.avatar_cache_ttl_hours * 3600,
+            max_bytes=self.plugin_config.avatar_cache_max_mb * 1024 * 1024,
+            logger=self.logger
+        )
+        self.image_generator = ImageGenerator(self.plugin_config, avatar_cache=self.avatar_cache)
+        
+        # 启动浏览器耗时数秒，放到后台进行，不阻塞插件初始化
+        self.image_generator_task = asyncio.create_task(self._initialize_image_generator())
         
-        # 初始化图片生成器
+        # 记录当前配置状态
+        self.logger.info(f"当前配置: 图片模式={self.plugin_config.if_send_pic}, 显示人数={self.plugin_config.rand}, 自动记录={self.plugin_config.auto_record_enabled}")
+    
+    async def _initialize_image_generator(self):
+        """在后台初始化图片生成器（导入Playwright并启动浏览器）"""
+        started = time.perf_counter()
         try:
+            if self.avatar_cache:
+                # 创建缓存目录和扫描已有头像在线程中执行
+                await self.avatar_cache.initialize()
             await self.image_generator.initialize()
-            self.logger.info("图片生成器初始化成功")
+            if self.image_generator.is_available:
+                self.logger.info(f"图片生成器初始化成功，耗时 {(time.perf_counter() - started) * 1000:.0f}ms")
         except ImageGenerationError as e:
             self.logger.warning(f"图片生成器初始化失败: {e}")
             self.logger.warning("💡 提示: 如果需要图片功能，请运行 'playwright install' 命令安装浏览器")
             self.logger.warning("📝 注意: 即使图片功能不可用，排行榜仍会以文字模式显示")
             # 不设置image_generator为None，让它尝试在需要时重新初始化
             # 这样可以支持后续的图片生成尝试
+    
+    async def _wait_for_image_generator(self) -> bool:
+        """等待后台初始化的图片生成器就绪
         
-        # 记录当前配置状态
-        self.logger.info(f"当前配置: 图片模式={self.plugin_config.if_send_pic}, 显示人数={self.plugin_config.rand}, 自动记录={self.plugin_config.auto_record_enabled}")
+        插件刚启动时浏览器可能还在启动，最多等待 IMAGE_GENERATOR_WAIT_SECONDS 秒；
+        超时不取消后台任务，本次请求由调用方回退到文字模式。
+        
+        Returns:
+            bool: 图片生成器是否可用
+        """
+        if not self.image_generator:
+            return False
+        
+        task = self.image_generator_task
+        if task and not task.done():
+            await asyncio.wait({task}, timeout=IMAGE_GENERATOR_WAIT_SECONDS)
+            if not task.done():
+                self.logger.info("图片生成器仍在后台启动，本次使用文字模式")
+        
+        return self.image_generator.is_available
     
     async def _initialize_timer_manager(self):
         """初始化定时任务管理器
@@ -464,7 +536,8 @@ class MessageStatsPlugin(Star):
         """
         try:
             from .utils.timer_manager import TimerManager
-            self.timer_manager = TimerManager(self.data_manager, self.image_generator, self.context, self.group_unified_msg_origins)
+            self.timer_manager = TimerManager(self.data_manager, self.image_generator, self.context,
+                                              self.group_unified_msg_origins, rank_service=self.rank_service)
             self.logger.info("定时任务管理器初始化成功")
             
             # 尝试启动定时任务（不阻塞初始化过程）
@@ -595,15 +668,29 @@ class MessageStatsPlugin(Star):
         try:
             self.logger.info("群发言统计插件卸载中...")
             
-            # 清理图片生成器
+            # 停止尚未完成的后台启动，再清理图片生成器
+            if self.image_generator_task and not self.image_generator_task.done():
+                self.image_generator_task.cancel()
+                try:
+                    await self.image_generator_task
+                except asyncio.CancelledError:
+                    pass
             if self.image_generator:
                 await self.image_generator.cleanup()
             
+            # 停止后台头像下载
+            if self.avatar_cache:
+                await self.avatar_cache.close()
+            
+            # 强制写回尚未落盘的群组数据
+            await self.data_manager.terminate()
+            
             # 清理数据缓存
             await self.data_manager.clear_cache()
             
-            # 清理群成员列表缓存
-            self.group_members_cache.clear()
+            # 停止后台成员目录刷新，清理昵称缓存
+            await self.member_directory.close()
+            self.nickname_cache.clear()
             self.logger.info("群成员列表缓存已清理")
             
             self.initialized = False
@@ -617,6 +704,12 @@ class MessageStatsPlugin(Star):
     @filter.event_message_type(EventMessageType.ALL)
     async def auto_message_listener(self, event: AstrMessageEvent):
         """自动消息监听器 - 监听所有消息并记录群成员发言统计和Rbot功能"""
+        # 入群、退群和群名片变更通知：直接修改成员目录和昵称，不计入发言
+        notice = self._get_member_notice(event)
+        if notice is not None:
+            await self._handle_member_notice(event, notice)
+            return
+        
         # 检查是否启用了自动记录功能
         if not self.plugin_config or not getattr(self.plugin_config, 'auto_record_enabled', True):
             return
@@ -666,6 +759,86 @@ class MessageStatsPlugin(Star):
         except (AttributeError, KeyError, TypeError):
             return False
     
+    # ========== 成员变动通知 ==========
+    
+    def _get_member_notice(self, event: AstrMessageEvent) -> Optional[Dict[str, Any]]:
+        """从事件中取出群成员变动通知（OneBot v11 的 group_increase/group_decrease/group_card）"""
+        raw = getattr(getattr(event, 'message_obj', None), 'raw_message', None)
+        try:
+            if raw and raw.get('post_type') == 'notice' and raw.get('notice_type') in MEMBER_NOTICE_TYPES:
+                return raw
+        except (AttributeError, TypeError):
+            pass
+        return None
+    
+    async def _handle_member_notice(self, event: AstrMessageEvent, notice: Dict[str, Any]):
+        """按通知修改群成员目录、昵称缓存和已记录的用户昵称
+        
+        只修改涉及的单个成员，不重新拉取完整的成员列表；收到过通知的群，
+        成员目录改为很长的间隔后才做一次完整刷新。
+        """
+        group_id = str(notice.get('group_id') or '')
+        user_id = str(notice.get('user_id') or '')
+        notice_type = notice.get('notice_type')
+        if not group_id or not user_id:
+            return
+        
+        try:
+            if notice_type == 'group_increase':
+                # 新成员的群名片通常为空，只查询这一个成员的昵称
+                member = await self._fetch_group_member_from_api(event, group_id, user_id)
+                if member:
+                    await self.member_directory.upsert_member(
+                        group_id, user_id, card=member.get('card') or '', nickname=member.get('nickname') or ''
+                    )
+                self.nickname_cache.invalidate(group_id, user_id)
+            
+            elif notice_type == 'group_decrease':
+                if notice.get('sub_type') == 'kick_me' or self._is_bot_message(event, user_id):
+                    # 机器人已不在群中，整个群的成员目录和昵称都不再需要
+                    self.member_directory.drop_group(group_id)
+                    self.nickname_cache.invalidate(group_id)
+                else:
+                    await self.member_directory.remove_member(group_id, user_id)
+                    self.nickname_cache.invalidate(group_id, user_id)
+            
+            elif notice_type == 'group_card':
+                card = notice.get('card_new') or ''
+                await self.member_directory.upsert_member(group_id, user_id, card=card)
+                member = (await self.member_directory.get_members(group_id)).get(user_id)
+                display_name = self._get_display_name_from_member(member) if member else None
+                if not display_name:
+                    self.nickname_cache.invalidate(group_id, user_id)
+                    return
+                
+                self.nickname_cache.set(group_id, user_id, display_name)
+                nickname = Validators.validate_nickname(display_name)
+                if await self.data_manager.update_user_nickname(group_id, user_id, nickname):
+                    self.logger.info(f"群 {group_id} 用户 {user_id} 群名片已更新为 {display_name}")
+        
+        except ValidationError as e:
+            self.logger.warning(f"群名片变更通知中的昵称无效: {e}")
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            self.logger.warning(f"处理群成员变动通知失败(数据格式错误): {e}")
+        except OSError as e:
+            self.logger.warning(f"处理群成员变动通知失败(系统错误): {e}")
+    
+    async def _fetch_group_member_from_api(self, event: AstrMessageEvent, group_id: str,
+                                           user_id: str) -> Optional[Dict[str, Any]]:
+        """从API获取单个群成员的信息"""
+        try:
+            member = await event.bot.api.call_action(
+                'get_group_member_info', group_id=group_id, user_id=user_id, no_cache=True
+            )
+            if member and isinstance(member, dict):
+                return member
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            self.logger.warning(f"获取群成员信息失败(数据格式错误): {e}")
+        except (ConnectionError, TimeoutError, OSError, RuntimeError) as e:
+            self.logger.warning(f"获取群成员信息失败(网络错误): {e}")
+        
+        return None
+    
     async def _record_message_stats(self, group_id: str, user_id: str, nickname: str):
         """记录消息统计
         
@@ -744,18 +917,19 @@ class MessageStatsPlugin(Star):
                     nickname=nickname,
                     message_count=0
                 )
-                # 保存新用户
+                # 标记新用户待写回
                 users = await self.data_manager.get_group_data(group_id)
                 users.append(user)
-                await self.data_manager.save_group_data(group_id, users)
+                await self.data_manager.mark_group_dirty(group_id, users)
             else:
                 # 增加修为和阅历
                 user.add_cultivation(1)  # 修为+1
                 user.add_experience(1)   # 阅历+1
                 
-                # 保存用户数据 - 直接使用当前的用户列表，避免数据不一致
+                # 标记用户数据待写回 - 直接使用当前的用户列表，避免数据不一致
+                # 由后台任务合并写盘，避免每条消息都重写整个群组文件
                 users = await self.data_manager.get_group_data(group_id)
-                await self.data_manager.save_group_data(group_id, users)
+                await self.data_manager.mark_group_dirty(group_id, users)
             
             # 只在开启详细日志时记录Rbot奖励
             if self.plugin_config and getattr(self.plugin_config, 'detailed_logging_enabled', True):
@@ -879,10 +1053,42 @@ class MessageStatsPlugin(Star):
     
     @filter.command("发言榜")
     async def show_full_rank(self, event: AstrMessageEvent):
-        """显示总排行榜"""
-        async for result in self._show_rank(event, RankType.TOTAL):
+        """显示总排行榜，带日期参数时显示自定义日期范围排行榜
+        
+        用法：#发言榜、#发言榜 2026-09-01 2026-09-30、#发言榜 2026-09-01（单日）
+        """
+        args = event.message_str.split()[1:] if hasattr(event, 'message_str') else []
+        if not args:
+            async for result in self._show_rank(event, RankType.TOTAL):
+                yield result
+            return
+        
+        date_range = self._parse_rank_date_range(args)
+        if date_range is None:
+            yield event.plain_result("日期格式错误！用法:#发言榜 2026-09-01 2026-09-30")
+            return
+        
+        async for result in self._show_rank(event, RankType.CUSTOM, date_range):
             yield result
     
+    def _parse_rank_date_range(self, args: List[str]) -> Optional[tuple]:
+        """解析自定义排行榜的日期参数
+        
+        Args:
+            args (List[str]): 命令参数，一个日期表示单日，两个日期表示范围
+            
+        Returns:
+            Optional[tuple]: (start_date, end_date)，格式错误或开始日期晚于结束日期时返回None
+        """
+        try:
+            start_date = date.fromisoformat(args[0])
+            end_date = date.fromisoformat(args[1]) if len(args) > 1 else start_date
+        except ValueError:
+            return None
+        if start_date > end_date:
+            return None
+        return start_date, end_date
+    
     @filter.command("水群榜")
     async def show_water_group_rank(self, event: AstrMessageEvent):
         """显示水群排行榜(发言榜别名)"""
@@ -1152,8 +1358,8 @@ class MessageStatsPlugin(Star):
             
             # 6. 清除群成员缓存
             try:
-                self.group_members_cache.clear()
-                self.user_nickname_cache.clear()
+                self.nickname_cache.clear()
+                self.member_directory.clear()
                 members_cache_cleared = True
             except Exception as e:
                 self.logger.error(f"清除群成员缓存失败: {e}")
@@ -1195,14 +1401,18 @@ class MessageStatsPlugin(Star):
                 return
             group_id = str(group_id)
             
-            # 清除特定群的成员缓存
-            cache_key = f"group_members_{group_id}"
-            if cache_key in self.group_members_cache:
-                del self.group_members_cache[cache_key]
+            # 立即重新拉取该群的成员目录（已有刷新任务时等待其完成）
+            task = self.member_directory.refresh(
+                group_id, lambda: self._fetch_group_members_from_api(event, group_id), force=True
+            )
+            if task and await task:
+                # 该群缓存的昵称可能已过时
+                self.nickname_cache.invalidate(group_id)
+                members = await self.member_directory.get_members(group_id)
                 self.logger.info(f"刷新群 {group_id} 成员缓存")
-                yield event.plain_result("群成员缓存已刷新！")
+                yield event.plain_result(f"群成员缓存已刷新！共 {len(members)} 人")
             else:
-                yield event.plain_result("该群没有缓存的成员信息！")
+                yield event.plain_result("获取群成员列表失败,请稍后重试！")
             
         except AttributeError as e:
             self.logger.error(f"刷新群成员缓存失败(属性错误): {e}", exc_info=True)
@@ -1231,20 +1441,27 @@ class MessageStatsPlugin(Star):
             # 获取数据管理器缓存统计
             cache_stats = await self.data_manager.get_cache_stats()
             
-            # 获取群成员缓存信息
-            members_cache_size = len(self.group_members_cache)
-            members_cache_maxsize = self.group_members_cache.maxsize
+            # 获取群成员目录信息
+            directory_stats = self.member_directory.get_stats()
+            nickname_stats = self.nickname_cache.get_stats()
+            metadata_stats = self.data_manager.group_metadata.get_stats()
             
             status_msg = [
                 "📊 缓存状态报告",
                 "━━━━━━━━━━━━━━",
                 f"💾 数据缓存: {cache_stats['data_cache_size']}/{cache_stats['data_cache_maxsize']}",
+                f"📚 常驻群组数据: {cache_stats['group_state_size']}/{cache_stats['group_state_maxsize']} (待写回 {cache_stats['dirty_group_count']})",
                 f"⚙️ 配置缓存: {cache_stats['config_cache_size']}/{cache_stats['config_cache_maxsize']}",
-                f"👥 群成员缓存: {members_cache_size}/{members_cache_maxsize}",
+                f"👥 群成员目录: {directory_stats['groups']}个群/{directory_stats['members']}人 (命中 {directory_stats['hits']}, 未命中 {directory_stats['misses']}, 通知更新 {directory_stats['patches']})",
+                f"🏷️ 昵称缓存: {nickname_stats['size']}/{nickname_stats['maxsize']} (命中率 {nickname_stats['hit_rate']:.1%})",
+                f"🏠 群组元数据: {metadata_stats['groups']}个群 (刷新 {metadata_stats['refreshes']}次)",
                 "━━━━━━━━━━━━━━",
                 "🕐 数据缓存TTL: 5分钟",
+                "🕐 常驻群组数据: 空闲30分钟后释放",
                 "🕐 配置缓存TTL: 1分钟", 
-                "🕐 群成员缓存TTL: 5分钟"
+                f"🕐 昵称缓存TTL: {USER_NICKNAME_CACHE_TTL // 60}分钟",
+                f"🕐 群成员目录: {self.member_directory.ttl // 60:.0f}分钟后在后台刷新（收到成员变动通知的群 {self.member_directory.notice_ttl // 3600:.0f}小时）",
+                f"🕐 群组元数据: {self.data_manager.group_metadata.ttl // 3600:.0f}小时后在后台刷新"
             ]
             
             yield event.plain_result('\n'.join(status_msg))
@@ -1303,10 +1520,9 @@ class MessageStatsPlugin(Star):
         """统一的用户昵称获取方法 - 重构版本
         
         使用扁平化的逻辑，拆分为独立的辅助方法：
-        1. 从昵称缓存获取
-        2. 从群成员字典缓存获取
-        3. 从API获取并缓存
-        4. 返回默认昵称
+        1. 从昵称缓存获取（按群组和用户区分）
+        2. 从群成员目录获取（不等待API，需要时在后台刷新目录）
+        3. 返回默认昵称
         
         Args:
             event (AstrMessageEvent): 消息事件对象
@@ -1317,69 +1533,36 @@ class MessageStatsPlugin(Star):
             str: 用户的显示昵称，如果都失败则返回 "用户{user_id}"
         """
         # 步骤1: 从昵称缓存获取
-        nickname = await self._get_from_nickname_cache(user_id)
-        if nickname:
-            return nickname
-        
-        # 步骤2: 从群成员字典缓存获取
-        nickname = await self._get_from_dict_cache(group_id, user_id)
+        nickname = self.nickname_cache.get(group_id, user_id)
         if nickname:
             return nickname
         
-        # 步骤3: 从API获取并缓存
-        nickname = await self._fetch_and_cache_from_api(event, group_id, user_id)
+        # 步骤2: 从群成员目录获取
+        nickname = await self._get_from_member_directory(event, group_id, user_id)
         if nickname:
             return nickname
         
-        # 步骤4: 返回默认昵称
+        # 步骤3: 返回默认昵称
         return f"用户{user_id}"
     
-    @exception_handler(ExceptionConfig(log_exception=True, reraise=True))
-    async def _get_from_nickname_cache(self, user_id: str) -> Optional[str]:
-        """从昵称缓存获取昵称"""
-        nickname_cache_key = f"nickname_{user_id}"
-        return self.user_nickname_cache.get(nickname_cache_key)
-    
-    @exception_handler(ExceptionConfig(log_exception=True, reraise=True))
-    async def _get_from_dict_cache(self, group_id: str, user_id: str) -> Optional[str]:
-        """从群成员字典缓存获取昵称"""
-        dict_cache_key = f"group_members_dict_{group_id}"
-        if dict_cache_key in self.group_members_cache:
-            members_dict = self.group_members_cache[dict_cache_key]
-            if user_id in members_dict:
-                member = members_dict[user_id]
+    async def _get_from_member_directory(self, event: AstrMessageEvent, group_id: str, user_id: str) -> Optional[str]:
+        """从群成员目录获取昵称
+        
+        目录只读内存和本地文件；列表过期或查不到该成员时在后台重新拉取，本次消息不等待。
+        """
+        try:
+            member = await self.member_directory.get_member(
+                group_id, user_id, lambda: self._fetch_group_members_from_api(event, group_id)
+            )
+            if member:
                 display_name = self._get_display_name_from_member(member)
                 if display_name:
                     # 缓存到昵称缓存
-                    nickname_cache_key = f"nickname_{user_id}"
-                    self.user_nickname_cache[nickname_cache_key] = display_name
+                    self.nickname_cache.set(group_id, user_id, display_name)
                     return display_name
-        return None
-    
-    async def _fetch_and_cache_from_api(self, event: AstrMessageEvent, group_id: str, user_id: str) -> Optional[str]:
-        """从API获取群成员信息并缓存"""
-        try:
-            members_info = await self._fetch_group_members_from_api(event, group_id)
-            if members_info:
-                # 重建字典缓存
-                dict_cache_key = f"group_members_dict_{group_id}"
-                members_dict = {str(m.get("user_id", "")): m for m in members_info if m.get("user_id")}
-                self.group_members_dict_cache[dict_cache_key] = members_dict
-                
-                # 查找用户
-                if user_id in members_dict:
-                    member = members_dict[user_id]
-                    display_name = self._get_display_name_from_member(member)
-                    if display_name:
-                        # 缓存到昵称缓存
-                        nickname_cache_key = f"nickname_{user_id}"
-                        self.user_nickname_cache[nickname_cache_key] = display_name
-                        return display_name
         except (AttributeError, KeyError, TypeError) as e:
             self.logger.warning(f"获取群成员信息失败(数据格式错误): {e}")
-        except (ConnectionError, TimeoutError, OSError) as e:
-            self.logger.warning(f"获取群成员信息失败(网络错误): {e}")
-        except (ImportError, RuntimeError) as e:
+        except OSError as e:
             self.logger.warning(f"获取群成员信息失败(系统错误): {e}")
         
         return None
@@ -1414,73 +1597,33 @@ class MessageStatsPlugin(Star):
             return f"用户{user_id}"
 
     @exception_handler(ExceptionConfig(log_exception=True, reraise=False))
-    def clear_user_cache(self, user_id: str = None):
-        """清理用户缓存"""
-        if user_id:
-            # 清理特定用户的缓存
-            nickname_cache_key = f"nickname_{user_id}"
-            if nickname_cache_key in self.user_nickname_cache:
-                del self.user_nickname_cache[nickname_cache_key]
+    def clear_user_cache(self, user_id: str = None, group_id: str = None):
+        """清理用户昵称缓存
+        
+        Args:
+            user_id (str): 用户ID，为None时清理群组内（或全部）用户
+            group_id (str): 群组ID，为None时清理所有群组
+        """
+        if group_id:
+            # 清理指定群组内特定用户或全部用户的缓存
+            self.nickname_cache.invalidate(group_id, user_id)
+        elif user_id:
+            # 清理特定用户在所有群组中的缓存
+            self.nickname_cache.invalidate_user(user_id)
         else:
             # 清理所有用户缓存
-            self.user_nickname_cache.clear()
+            self.nickname_cache.clear()
         
-        self.logger.info(f"清理用户缓存: {user_id or '全部'}")
-    
-    async def _get_group_members_cache(self, event: AstrMessageEvent, group_id: str) -> Optional[List[Dict[str, Any]]]:
-        """获取群成员缓存"""
-        cache_key = f"group_members_{group_id}"
-        
-        if cache_key in self.group_members_cache:
-            cache_data = self.group_members_cache[cache_key]
-            
-            # 检查缓存是否过期
-            import time
-            if isinstance(cache_data, dict) and 'timestamp' in cache_data and 'ttl' in cache_data:
-                if time.time() - cache_data['timestamp'] < cache_data['ttl']:
-                    return cache_data['members']
-                else:
-                    # 缓存过期，删除
-                    del self.group_members_cache[cache_key]
-            else:
-                # 兼容旧格式缓存
-                return cache_data
-        
-        # 缓存未命中或已过期,从API获取
-        return await self._fetch_group_members_from_api(event, group_id)
+        self.logger.info(f"清理用户缓存: {user_id or '全部'}{f' (群 {group_id})' if group_id else ''}")
     
     async def _fetch_group_members_from_api(self, event: AstrMessageEvent, group_id: str) -> Optional[List[Dict[str, Any]]]:
-        """从API获取群成员"""
+        """从API获取群成员列表，由群成员目录在后台调用"""
         client = event.bot
         params = {"group_id": group_id}
         
         try:
             members_info = await client.api.call_action('get_group_member_list', **params)
             if members_info:
-                # 缓存群成员列表,根据群大小设置不同的过期时间
-                cache_key = f"group_members_{group_id}"
-                
-                # 对于大群(成员数>500),使用更长的缓存时间
-                if len(members_info) > 500:
-                    # 大群使用30分钟缓存，记录缓存时间戳
-                    import time
-                    cache_data = {
-                        'members': members_info,
-                        'timestamp': time.time(),
-                        'ttl': 1800  # 30分钟
-                    }
-                    self.group_members_cache[cache_key] = cache_data
-                    self.logger.info(f"群 {group_id} 成员数较多({len(members_info)}),已启用30分钟缓存策略")
-                else:
-                    # 普通群组使用5分钟缓存，记录缓存时间戳
-                    import time
-                    cache_data = {
-                        'members': members_info,
-                        'timestamp': time.time(),
-                        'ttl': 300  # 5分钟
-                    }
-                    self.group_members_cache[cache_key] = cache_data
-                
                 return members_info
         except (AttributeError, KeyError, TypeError) as e:
             self.logger.warning(f"获取群成员列表失败(数据格式错误): {e}")
@@ -1496,40 +1639,44 @@ class MessageStatsPlugin(Star):
         return None
 
     async def _get_group_name(self, event: AstrMessageEvent, group_id: str) -> str:
-        """获取群名称 - 改进版本"""
+        """获取群名称
+        
+        从群组元数据索引读取；已过期时在后台刷新，只有从未记录的群才等待平台API。
+        """
+        return await self.data_manager.group_metadata.get_group_name(
+            group_id, lambda: self._fetch_group_info(event, group_id)
+        )
+    
+    async def _fetch_group_info(self, event: AstrMessageEvent, group_id: str) -> Optional[Dict[str, Any]]:
+        """通过平台API获取群信息（群名称、成员数）"""
         try:
-            # 首先尝试通过事件对象获取群组信息
+            if hasattr(event, 'bot') and hasattr(event.bot, 'api'):
+                group_info = await event.bot.api.call_action('get_group_info', group_id=group_id)
+                if group_info and isinstance(group_info, dict):
+                    return group_info
+            
+            # 非aiocqhttp平台尝试通过事件对象获取群组信息
             group_data = await event.get_group(group_id)
             if group_data:
-                # 简化群名获取逻辑，直接尝试常用属性
-                return getattr(group_data, 'group_name', None) or \
-                       getattr(group_data, 'name', None) or \
-                       getattr(group_data, 'title', None) or \
-                       getattr(group_data, 'group_title', None) or \
-                       f"群{group_id}"
-            
-            # 如果事件对象获取失败，尝试通过API获取
-            try:
-                if hasattr(event, 'bot') and hasattr(event.bot, 'api'):
-                    group_info = await event.bot.api.call_action('get_group_info', group_id=group_id)
-                    if group_info and isinstance(group_info, dict):
-                        group_name = group_info.get('group_name') or group_info.get('group_title') or group_info.get('name')
-                        if group_name:
-                            return str(group_name).strip()
-            except (ConnectionError, asyncio.TimeoutError, ValueError, TypeError, AttributeError) as api_error:
-                # 修复：替换过于宽泛的Exception为具体异常类型
-                self.logger.warning(f"通过API获取群组 {group_id} 名称失败: {api_error}")
-            
-            return f"群{group_id}"
-        except (AttributeError, KeyError, TypeError, OSError) as e:
-            self.logger.warning(f"获取群名称失败，使用默认名称: {e}")
-            return f"群{group_id}"
+                group_name = getattr(group_data, 'group_name', None) or \
+                             getattr(group_data, 'name', None) or \
+                             getattr(group_data, 'title', None) or \
+                             getattr(group_data, 'group_title', None)
+                return {'group_name': group_name} if group_name else None
+        except (ConnectionError, asyncio.TimeoutError, ValueError, TypeError, AttributeError, KeyError, OSError) as e:
+            self.logger.warning(f"通过API获取群组 {group_id} 信息失败: {e}")
+        
+        return None
     
-    async def _show_rank(self, event: AstrMessageEvent, rank_type: RankType):
+    async def _show_rank(self, event: AstrMessageEvent, rank_type: RankType, date_range: Optional[tuple] = None):
         """显示排行榜 - 重构版本"""
         try:
+            # 在读取数据前确定缓存键，保证缓存结果与键中的数据版本一致
+            group_id = event.get_group_id()
+            cache_key = self._get_rank_cache_key(str(group_id), rank_type, date_range) if group_id else None
+            
             # 准备数据
-            rank_data = await self._prepare_rank_data(event, rank_type)
+            rank_data = await self._prepare_rank_data(event, rank_type, date_range, cache_key)
             if rank_data is None:
                 yield event.plain_result("无法获取排行榜数据,请检查群组信息或稍后重试")
                 return
@@ -1538,10 +1685,13 @@ class MessageStatsPlugin(Star):
             
             # 根据配置选择显示模式
             if config.if_send_pic:
-                async for result in self._render_rank_as_image(event, filtered_data, group_info, title, current_user_id, config):
+                # 同一排行榜的所有请求共享一张图片，当前用户的名次另附一行文字
+                image_cache_key = f"{cache_key}:image" if cache_key else None
+                async for result in self._render_rank_as_image(event, filtered_data, group_info, title, current_user_id, config, image_cache_key):
                     yield result
             else:
-                async for result in self._render_rank_as_text(event, filtered_data, group_info, title, config):
+                text_cache_key = f"{cache_key}:text" if cache_key else None
+                async for result in self._render_rank_as_text(event, filtered_data, group_info, title, config, text_cache_key):
                     yield result
         
         except (IOError, OSError) as e:
@@ -1563,8 +1713,26 @@ class MessageStatsPlugin(Star):
             self.logger.error(f"数据格式错误: {e}")
             yield event.plain_result("数据格式错误,请联系管理员")
     
-    async def _prepare_rank_data(self, event: AstrMessageEvent, rank_type: RankType):
-        """准备排行榜数据"""
+    def _get_rank_cache_key(self, group_id: str, rank_type: RankType, date_range: Optional[tuple] = None) -> str:
+        """生成排行榜结果缓存键
+        
+        由群号、排行榜类型、时间段锚点、显示人数和群组数据版本组成，
+        任一项变化（有新消息、跨天、修改显示人数）都会得到新的键。
+        """
+        if date_range:
+            start_date, end_date = date_range
+        else:
+            start_date, end_date = self.rank_service.get_time_period(rank_type)
+        return self.data_manager.get_rank_cache_key(
+            group_id, rank_type.value, start_date, end_date, self.plugin_config.rand
+        )
+    
+    async def _prepare_rank_data(self, event: AstrMessageEvent, rank_type: RankType,
+                                 date_range: Optional[tuple] = None, cache_key: Optional[str] = None):
+        """准备排行榜数据
+        
+        cache_key 对应的结果已缓存时直接复用，跳过筛选、排序和群名称查询。
+        """
         # 获取群组ID和用户ID
         group_id = event.get_group_id()
         current_user_id = event.get_sender_id()
@@ -1578,26 +1746,48 @@ class MessageStatsPlugin(Star):
         group_id = str(group_id)
         current_user_id = str(current_user_id)
         
-        # 获取群组数据
-        group_data = await self.data_manager.get_group_data(group_id)
+        # 群组数据没有变化时复用上次的排行榜结果
+        if cache_key:
+            cached = await self.data_manager.get_cached_rank(cache_key)
+            if cached is not None:
+                filtered_data, title, group_info = cached
+                return group_id, current_user_id, filtered_data, self.plugin_config, title, group_info
+        
+        # 同一排行榜的并发请求只计算一次
+        if cache_key:
+            result = await self.rank_flight.do(
+                f"{cache_key}:data",
+                lambda: self._build_rank_result(event, group_id, rank_type, date_range, cache_key)
+            )
+        else:
+            result = await self._build_rank_result(event, group_id, rank_type, date_range, cache_key)
         
-        if not group_data:
+        if result is None:
             return None
         
-        # 根据类型筛选数据并获取排序值
-        filtered_data_with_values = await self._filter_data_by_rank_type(group_data, rank_type)
+        filtered_data, title, group_info = result
+        return group_id, current_user_id, filtered_data, self.plugin_config, title, group_info
+    
+    async def _build_rank_result(self, event: AstrMessageEvent, group_id: str, rank_type: RankType,
+                                 date_range: Optional[tuple], cache_key: Optional[str]) -> Optional[tuple]:
+        """筛选排序并生成标题和群组信息，返回 (filtered_data, title, group_info)，没有数据时返回None"""
+        # 获取群组数据
+        group_data = await self.data_manager.get_group_data(group_id)
         
-        if not filtered_data_with_values:
+        if not group_data:
             return None
         
-        # 对数据进行排序
-        filtered_data = sorted(filtered_data_with_values, key=lambda x: x[1], reverse=True)
-        
         # 获取配置
         config = self.plugin_config
         
+        # 筛选并排序：只对前 config.rand 名做堆选择排序，其余用户保留在列表尾部用于统计发言总数
+        filtered_data = await self.rank_service.build_rank(group_data, rank_type, config.rand, group_id, date_range)
+        
+        if not filtered_data:
+            return None
+        
         # 生成标题
-        title = self._generate_title(rank_type)
+        title = self.rank_service.generate_title(rank_type, date_range)
         
         # 创建群组信息
         group_info = GroupInfo(group_id=group_id)
@@ -1606,40 +1796,52 @@ class MessageStatsPlugin(Star):
         group_name = await self._get_group_name(event, group_id)
         group_info.group_name = group_name
         
-        return group_id, current_user_id, filtered_data, config, title, group_info
+        if cache_key:
+            await self.data_manager.cache_rank(cache_key, (filtered_data, title, group_info))
+        
+        return filtered_data, title, group_info
     
     async def _render_rank_as_image(self, event: AstrMessageEvent, filtered_data: List[tuple],
-                                  group_info: GroupInfo, title: str, current_user_id: str, config: PluginConfig):
-        """渲染排行榜为图片模式"""
+                                  group_info: GroupInfo, title: str, current_user_id: str, config: PluginConfig,
+                                  cache_key: Optional[str] = None):
+        """渲染排行榜为图片模式
+        
+        图片不再按请求用户分别渲染：同一排行榜的并发请求合并为一次渲染并共享结果，
+        数据未变化的重复请求直接发送缓存的图片。请求者在榜上时另附一行名次文字；
+        不在榜上时在共享图片底部追加请求者的高亮行（无法追加时同样以文字显示名次）。
+        """
         temp_path = None
+        row_path = None
         try:
-            # 检查图片生成器是否可用
-            if not self.image_generator or not hasattr(self.image_generator, 'browser') or not self.image_generator.browser:
-                self.logger.warning("图片生成器未初始化或浏览器不可用，回退到文字模式")
-                text_msg = self._generate_text_message(filtered_data, group_info, title, config)
-                yield event.plain_result(text_msg)
-                return
-            
-            # 提取用户数据用于图片生成，并应用人数限制
-            # 先限制数量，再提取用户数据
-            limited_data = filtered_data[:config.rand]
-            users_for_image = []
-            
-            # 为用户数据设置display_total属性，确保图片生成器使用正确的数据
-            # 修复：直接命令版排行榜图片显示错误数据的问题
-            for user_data, count in limited_data:
-                # 设置display_total属性（时间段内的发言数）
-                user_data.display_total = count
-                users_for_image.append(user_data)
-            
-            # 使用图片生成器
-            temp_path = await self.image_generator.generate_rank_image(
-                users_for_image, group_info, title, current_user_id
-            )
-            
-            # 检查图片文件是否存在
-            if await aiofiles.os.path.exists(temp_path):
-                yield event.image_result(str(temp_path))
+            image_path = None
+            if cache_key:
+                cached_path = await self.data_manager.get_cached_image(cache_key)
+                if cached_path and await aiofiles.os.path.exists(cached_path):
+                    image_path = cached_path
+            
+            if image_path is None:
+                # 检查图片生成器是否可用（刚启动时等待后台初始化完成）
+                if not await self._wait_for_image_generator():
+                    self.logger.warning("图片生成器未初始化或浏览器不可用，回退到文字模式")
+                    text_msg = self._generate_text_message(filtered_data, group_info, title, config)
+                    yield event.plain_result(text_msg)
+                    return
+                
+                if cache_key:
+                    image_path = await self.rank_flight.do(
+                        cache_key,
+                        lambda: self._generate_rank_image_file(filtered_data, group_info, title, config, cache_key)
+                    )
+                else:
+                    image_path = temp_path = await self._generate_rank_image_file(filtered_data, group_info, title, config)
+            
+            if image_path:
+                position = self._get_rank_position(filtered_data, current_user_id, config)
+                if position and not position[3] and self.image_generator:
+                    row_path = await self._append_requester_row(image_path, filtered_data, position, config)
+                yield event.image_result(str(row_path or image_path))
+                if position and not row_path:
+                    yield event.plain_result(self._format_rank_position(position, config))
             else:
                 # 回退到文字模式
                 text_msg = self._generate_text_message(filtered_data, group_info, title, config)
@@ -1672,184 +1874,101 @@ class MessageStatsPlugin(Star):
             yield event.plain_result(text_msg)
         finally:
             # 清理临时文件，避免资源泄漏
-            if temp_path and await aiofiles.os.path.exists(temp_path):
-                try:
-                    await aiofiles.os.unlink(temp_path)
-                except OSError as e:
-                    self.logger.warning(f"清理临时图片文件失败: {temp_path}, 错误: {e}")
-    
-    async def _render_rank_as_text(self, event: AstrMessageEvent, filtered_data: List[tuple], 
-                                 group_info: GroupInfo, title: str, config: PluginConfig):
-        """渲染排行榜为文字模式"""
-        text_msg = self._generate_text_message(filtered_data, group_info, title, config)
-        yield event.plain_result(text_msg)
-    
-    @exception_handler(ExceptionConfig(log_exception=True, reraise=True))
-    def _get_time_period_for_rank_type(self, rank_type: RankType) -> tuple:
-        """获取排行榜类型对应的时间段
-        
-        Args:
-            rank_type (RankType): 排行榜类型
-            
-        Returns:
-            tuple: (start_date, end_date, period_name)，如果不需要时间段过滤则返回(None, None, None)
-        """
-        current_date = datetime.now().date()
-        
-        if rank_type == RankType.TOTAL:
-            return None, None, "total"
-        elif rank_type == RankType.DAILY:
-            return current_date, current_date, "daily"
-        elif rank_type == RankType.WEEKLY:
-            # 获取本周开始日期(周一)
-            days_since_monday = current_date.weekday()
-            week_start = current_date - timedelta(days=days_since_monday)
-            return week_start, current_date, "weekly"
-        elif rank_type == RankType.MONTHLY:
-            # 获取本月开始日期
-            month_start = current_date.replace(day=1)
-            return month_start, current_date, "monthly"
-        else:
-            return None, None, "unknown"
+            for path in (temp_path, row_path):
+                if path and await aiofiles.os.path.exists(path):
+                    try:
+                        await aiofiles.os.unlink(path)
+                    except OSError as e:
+                        self.logger.warning(f"清理临时图片文件失败: {path}, 错误: {e}")
     
-    async def _filter_data_by_rank_type(self, group_data: List[UserData], rank_type: RankType) -> List[tuple]:
-        """根据排行榜类型筛选数据并计算时间段内的发言次数 - 性能优化版本"""
-        start_date, end_date, period_name = self._get_time_period_for_rank_type(rank_type)
-        
-        if rank_type == RankType.TOTAL:
-            # 总榜：返回每个用户及其总发言数的元组，但过滤掉从未发言的用户
-            return [(user, user.message_count) for user in group_data if user.message_count > 0]
-        
-        # 时间段过滤：优化版本，使用预聚合策略减少双重循环
-        # 策略：如果时间段较短（日榜），直接计算；如果时间段较长（周榜/月榜），使用缓存
-        
-        # 对于日榜，直接计算（因为时间段短，性能影响小）
-        if rank_type == RankType.DAILY:
-            return self._calculate_daily_rank(group_data, start_date, end_date)
+    async def _generate_rank_image_file(self, filtered_data: List[tuple], group_info: GroupInfo, title: str,
+                                        config: PluginConfig, cache_key: Optional[str] = None) -> Optional[str]:
+        """生成排行榜图片文件
         
-        # 对于周榜和月榜，使用优化策略（现在是异步方法）
-        elif rank_type in [RankType.WEEKLY, RankType.MONTHLY]:
-            return await self._calculate_period_rank_optimized(group_data, start_date, end_date)
-        
-        return []
-    
-    @exception_handler(ExceptionConfig(log_exception=True, reraise=True))
-    def _calculate_daily_rank(self, group_data: List[UserData], start_date, end_date) -> List[tuple]:
-        """计算日榜（直接计算策略）"""
-        filtered_users = []
-        for user in group_data:
-            if not user.history:
-                continue
-            
-            # 计算指定时间段的发言次数
-            period_count = user.get_message_count_in_period(start_date, end_date)
-            if period_count > 0:
-                filtered_users.append((user, period_count))
-        
-        return filtered_users
-    
-    async def _calculate_period_rank_optimized(self, group_data: List[UserData], start_date, end_date) -> List[tuple]:
-        """计算周榜/月榜（优化策略）"""
-        # 优化策略：先筛选出有历史记录的用户，然后批量计算
-        active_users = [user for user in group_data if user.history]
-        
-        if not active_users:
-            return []
-        
-        # 批量计算，减少函数调用开销
-        filtered_users = []
-        for user in active_users:
-            # 使用更高效的计算方法（现在是异步方法）
-            period_count = await self._count_messages_in_period_fast(user.history, start_date, end_date)
-            if period_count > 0:
-                filtered_users.append((user, period_count))
-        
-        return filtered_users
-    
-    async def _count_messages_in_period_fast(self, history: List, start_date, end_date) -> int:
-        """快速计算指定时间段内的消息数量（优化版本）
-        
-        如果历史记录未排序，将自动排序后进行计算。
-        对于已排序的记录，使用高效的早停算法。
+        提供 cache_key 时把图片复制到缓存目录并删除临时文件，返回缓存路径，供合并的请求共享；
+        否则返回临时文件路径，由调用方清理。生成失败时返回None。
         """
-        # 如果历史记录为空，直接返回0
-        if not history:
-            return 0
+        # 先限制数量，再提取用户数据；使用副本设置display_total（时间段内的发言数），
+        # 避免并发渲染不同排行榜时互相覆盖共享UserData上的属性
+        users_for_image = []
+        for user_data, count in filtered_data[:config.rand]:
+            user_copy = copy.copy(user_data)
+            user_copy.display_total = count
+            users_for_image.append(user_copy)
+        
+        # 共享图片不高亮任何用户
+        temp_path = await self.image_generator.generate_rank_image(users_for_image, group_info, title)
+        if not temp_path or not await aiofiles.os.path.exists(temp_path):
+            return None
+        if not cache_key:
+            return temp_path
         
-        # 完整遍历检查列表是否真正有序，避免采样检查的误判问题
-        is_sorted = True
-        if len(history) > 1:
+        try:
+            return await self.data_manager.store_rank_image(cache_key, str(temp_path))
+        finally:
             try:
-                # 完整遍历检查：确保列表真正有序（优化版本）
-                for current_item, next_item in zip(history[:-1], history[1:]):
-                    current_date = current_item.to_date() if hasattr(current_item, 'to_date') else current_item
-                    next_date = next_item.to_date() if hasattr(next_item, 'to_date') else next_item
-                    if current_date > next_date:
-                        is_sorted = False
-                        break
-                        
-            except (AttributeError, TypeError):
-                # 如果无法比较，假设未排序
-                is_sorted = False
-        
-        # 如果检测到列表确实有序，使用早停算法
-        if is_sorted:
-            count = 0
-            for hist_date in history:
-                # 转换为日期对象
-                hist_date_obj = hist_date.to_date() if hasattr(hist_date, 'to_date') else hist_date
-                
-                # 检查是否在指定时间段内
-                if hist_date_obj < start_date:
-                    continue
-                if hist_date_obj > end_date:
-                    # 已排序，可以提前跳出循环
-                    break
-                count += 1
-            
-            return count
-        
-        # 如果检测到列表无序，直接使用无序版本计算
-        else:
-            return self._count_messages_in_period_unordered(history, start_date, end_date)
+                await aiofiles.os.unlink(temp_path)
+            except OSError as e:
+                self.logger.warning(f"清理临时图片文件失败: {temp_path}, 错误: {e}")
     
-    @exception_handler(ExceptionConfig(log_exception=True, reraise=True))
-    def _count_messages_in_period_unordered(self, history: List, start_date, end_date) -> int:
-        """计算指定时间段内的消息数量（适用于未排序的历史记录）"""
-        if not history:
-            return 0
+    def _get_rank_position(self, filtered_data: List[tuple], current_user_id: str,
+                           config: PluginConfig) -> Optional[tuple]:
+        """在完整排名中查找请求者
         
-        count = 0
-        for hist_date in history:
-            hist_date_obj = hist_date.to_date() if hasattr(hist_date, 'to_date') else hist_date
-            if start_date <= hist_date_obj <= end_date:
-                count += 1
+        filtered_data 只有前 config.rand 名排好序，其余用户按原顺序保留在尾部；
+        榜外用户的名次按发言数多于他的人数计算，至少排在榜单之后。
         
-        return count
+        Returns:
+            Optional[tuple]: (名次, 发言数, 用户数据, 是否在榜上)，本时间段没有发言记录时返回None
+        """
+        board_size = min(config.rand, len(filtered_data))
+        for index, (user_data, count) in enumerate(filtered_data[:board_size]):
+            if user_data.user_id == current_user_id:
+                return index + 1, count, user_data, True
+        
+        for user_data, count in filtered_data[board_size:]:
+            if user_data.user_id == current_user_id:
+                ahead = sum(1 for _, other_count in filtered_data if other_count > count)
+                return max(ahead + 1, board_size + 1), count, user_data, False
+        return None
     
-    @exception_handler(ExceptionConfig(log_exception=True, reraise=True))
-    def _generate_title(self, rank_type: RankType) -> str:
-        """生成标题"""
-        now = datetime.now()
-        
-        if rank_type == RankType.TOTAL:
-            return "总发言排行榜"
-        elif rank_type == RankType.DAILY:
-            return f"今日[{now.year}年{now.month}月{now.day}日]发言榜单"
-        elif rank_type == RankType.WEEKLY:
-            # 计算周数
-            week_num = now.isocalendar().week
-            return f"本周[{now.year}年{now.month}月第{week_num}周]发言榜单"
-        elif rank_type == RankType.MONTHLY:
-            return f"本月[{now.year}年{now.month}月]发言榜单"
-        else:
-            return "发言榜单"
+    def _format_rank_position(self, position: tuple, config: PluginConfig) -> str:
+        """生成请求者的名次提示文字"""
+        rank, count, _, on_board = position
+        if on_board:
+            return f"你在本榜排第{rank}名（{count}次）"
+        return f"你在本榜排第{rank}名（{count}次），未进入前{config.rand}名"
+    
+    async def _append_requester_row(self, image_path: str, filtered_data: List[tuple],
+                                    position: tuple, config: PluginConfig) -> Optional[str]:
+        """在共享图片底部追加榜外请求者的高亮行，返回临时图片路径，失败时返回None"""
+        rank, count, user_data, _ = position
+        board = filtered_data[:config.rand]
+        # 使用副本设置display_total，不修改共享的UserData
+        user_copy = copy.copy(user_data)
+        user_copy.display_total = count
+        return await self.image_generator.append_user_row(
+            image_path, user_copy, rank,
+            total_messages=sum(board_count for _, board_count in board),
+            top_messages=board[0][1] if board else 0
+        )
+    
+    async def _render_rank_as_text(self, event: AstrMessageEvent, filtered_data: List[tuple], 
+                                 group_info: GroupInfo, title: str, config: PluginConfig,
+                                 cache_key: Optional[str] = None):
+        """渲染排行榜为文字模式"""
+        text_msg = await self.data_manager.get_cached_rank(cache_key) if cache_key else None
+        if text_msg is None:
+            text_msg = self._generate_text_message(filtered_data, group_info, title, config)
+            if cache_key:
+                await self.data_manager.cache_rank(cache_key, text_msg)
+        yield event.plain_result(text_msg)
     
     def _generate_text_message(self, users_with_values: List[tuple], group_info: GroupInfo, title: str, config: PluginConfig) -> str:
         """生成文字消息
         
         Args:
-            users_with_values: 包含(UserData, sort_value)元组的列表
+            users_with_values: 包含(UserData, sort_value)元组的列表，前 config.rand 名已排好序
             group_info: 群组信息
             title: 排行榜标题
             config: 插件配置
@@ -1857,20 +1976,7 @@ class MessageStatsPlugin(Star):
         Returns:
             str: 格式化的文字消息
         """
-        # 计算时间段内的总发言数
-        total_messages = sum(sort_value for _, sort_value in users_with_values)
-        
-        # 数据已经在_show_rank中排好序，直接使用并限制数量
-        top_users = users_with_values[:config.rand]
-        
-        msg = [f"{title}\n发言总数: {total_messages}\n━━━━━━━━━━━━━━\n"]
-        
-        for i, (user, user_messages) in enumerate(top_users):
-            # 使用时间段内的发言数计算百分比
-            percentage = ((user_messages / total_messages) * 100) if total_messages > 0 else 0
-            msg.append(f"第{i + 1}名:{user.nickname}·{user_messages}次(占比{percentage:.2f}%)\n")
-        
-        return ''.join(msg)
+        return self.rank_service.generate_text_message(users_with_values, title, config.rand)
     
     # ========== 定时功能管理命令 ==========
     
@@ -2434,9 +2540,7 @@ class MessageStatsPlugin(Star):
                     message_count=0
                 )
                 # 保存新用户
-                users = await self.data_manager.get_group_data(group_id)
-                users.append(user)
-                await self.data_manager.save_group_data(group_id, users)
+                await self.data_manager.save_user_data(group_id, user)
             
             # 执行签到
             success, message, stones_gain, cultivation_gain = user.sign_today()
@@ -2445,14 +2549,8 @@ class MessageStatsPlugin(Star):
                 # 标记用户今天已签到
                 await self._set_sign_in_status(group_id, user_id, True)
                 
-                # 保存用户数据
-                users = await self.data_manager.get_group_data(group_id)
-                # 找到当前用户并更新
-                for i, u in enumerate(users):
-                    if u.user_id == user_id:
-                        users[i] = user  # 使用更新后的用户对象
-                        break
-                await self.data_manager.save_group_data(group_id, users)
+                # 保存用户数据（按 user_id 索引定位，无需遍历群组）
+                await self.data_manager.save_user_data(group_id, user)
                 
                 # 使用event.plain_result发送消息
                 yield event.plain_result(f"{user_name} {message}")
@@ -2497,11 +2595,11 @@ class MessageStatsPlugin(Star):
                 yield event.plain_result("本群暂无用户数据！")
                 return
             
-            # 按修为排序
-            cultivation_sorted = sorted(users, key=lambda x: x.cultivation, reverse=True)
+            # 按修为选出前10名
+            cultivation_sorted = top_k(users, 10, key=lambda x: x.cultivation)
             
-            # 按阅历排序
-            experience_sorted = sorted(users, key=lambda x: x.experience, reverse=True)
+            # 按阅历选出前10名
+            experience_sorted = top_k(users, 10, key=lambda x: x.experience)
             
             # 生成排行榜消息
             rank_msg = "🏆 修为排行榜 🏆\n━━━━━━━━━━━━━━\n"
@@ -2549,8 +2647,8 @@ class MessageStatsPlugin(Star):
                 yield event.plain_result("本群暂无用户数据！")
                 return
             
-            # 按修为排序
-            sorted_users = sorted(users, key=lambda x: x.cultivation, reverse=True)
+            # 按修为选出前10名
+            sorted_users = top_k(users, 10, key=lambda x: x.cultivation)
             
             # 生成排行榜消息
             rank_msg = "🏆 修为排行榜 🏆\n━━━━━━━━━━━━━━\n"
@@ -2604,8 +2702,8 @@ class MessageStatsPlugin(Star):
                 yield event.plain_result("本群暂无用户数据！")
                 return
             
-            # 按阅历排序
-            sorted_users = sorted(users, key=lambda x: x.experience, reverse=True)
+            # 按阅历选出前10名
+            sorted_users = top_k(users, 10, key=lambda x: x.experience)
             
             # 生成排行榜消息
             rank_msg = "📚 阅历排行榜 📚\n━━━━━━━━━━━━━━\n"
@@ -2666,9 +2764,7 @@ class MessageStatsPlugin(Star):
                     message_count=0
                 )
                 # 保存新用户
-                users = await self.data_manager.get_group_data(group_id)
-                users.append(user)
-                await self.data_manager.save_group_data(group_id, users)
+                await self.data_manager.save_user_data(group_id, user)
             
             # 生成个人信息消息
             info_msg = f"👤 {user.nickname} 的个人信息 👤\n"
@@ -2881,11 +2977,8 @@ class MessageStatsPlugin(Star):
             # 查找目标用户（优先使用用户ID，其次使用昵称）
             target_user = None
             if target_user_id:
-                # 使用用户ID查找
-                for user in users:
-                    if user.user_id == target_user_id:
-                        target_user = user
-                        break
+                # 使用用户ID查找（群组数据自带 user_id 索引）
+                target_user = users.get_user(target_user_id) if isinstance(users, GroupUsers) else None
             
             if not target_user:
                 # 使用昵称模糊匹配
@@ -3133,8 +3226,8 @@ class MessageStatsPlugin(Star):
                 if not users:
                     continue
                 
-                # 按阅历排序（重置前的值）
-                sorted_users = sorted(users, key=lambda x: x.experience, reverse=True)
+                # 按阅历选出前10名（重置前的值）
+                sorted_users = top_k(users, 10, key=lambda x: x.experience)
                 
                 # 给前10名发放灵石奖励
                 rewards = [100, 80, 60, 50, 40, 30, 20, 15, 10, 5]  # 第1名100灵石，第10名5灵石
@@ -3309,9 +3402,7 @@ class MessageStatsPlugin(Star):
                                 message_count=0
                             )
                             # 保存新用户
-                            users = await self.data_manager.get_group_data(group_id)
-                            users.append(user)
-                            await self.data_manager.save_group_data(group_id, users)
+                            await self.data_manager.save_user_data(group_id, user)
                         
                         # 执行签到
                         success, message, stones_gain, cultivation_gain = user.sign_today()
@@ -3320,14 +3411,8 @@ class MessageStatsPlugin(Star):
                             # 标记用户今天已签到
                             await self._set_sign_in_status(group_id, user_id, True)
                             
-                            # 保存用户数据
-                            users = await self.data_manager.get_group_data(group_id)
-                            # 找到当前用户并更新
-                            for i, u in enumerate(users):
-                                if u.user_id == user_id:
-                                    users[i] = user  # 使用更新后的用户对象
-                                    break
-                            await self.data_manager.save_group_data(group_id, users)
+                            # 保存用户数据（按 user_id 索引定位，无需遍历群组）
+                            await self.data_manager.save_user_data(group_id, user)
                         
                         # 直接发送结果，避免Plain组件问题
                         yield event.plain_result(f"{user_name} {message}")
@@ -3411,9 +3496,7 @@ class MessageStatsPlugin(Star):
                     message_count=0
                 )
                 # 保存新用户
-                users = await self.data_manager.get_group_data(group_id)
-                users.append(user)
-                await self.data_manager.save_group_data(group_id, users)
+                await self.data_manager.save_user_data(group_id, user)
             
             # 执行签到
             success, message, stones_gain, cultivation_gain = user.sign_today()
@@ -3422,14 +3505,8 @@ class MessageStatsPlugin(Star):
                 # 标记用户今天已签到
                 await self._set_sign_in_status(group_id, user_id, True)
                 
-                # 保存用户数据
-                users = await self.data_manager.get_group_data(group_id)
-                # 找到当前用户并更新
-                for i, u in enumerate(users):
-                    if u.user_id == user_id:
-                        users[i] = user  # 使用更新后的用户对象
-                        break
-                await self.data_manager.save_group_data(group_id, users)
+                # 保存用户数据（按 user_id 索引定位，无需遍历群组）
+                await self.data_manager.save_user_data(group_id, user)
                 
                 # 直接使用字符串消息，避免Plain组件问题
                 await self._safe_send_message(event, f"{user_name} {message}")
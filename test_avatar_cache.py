@@ -0,0 +1,176 @@
+"""
+头像缓存测试
+
+使用本地 http.server 提供头像（通过 url_template 注入），验证：
+- get() 不等待网络，未命中立即返回None
+- 同一用户的并发未命中只下载一次
+- 按总大小淘汰时遵循最近最少使用顺序
+- initialize() 从已有缓存目录恢复索引
+
+运行: python -m pytest test_avatar_cache.py
+"""
+
+import asyncio
+import importlib.util
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# avatar_cache 没有插件内部依赖，直接按文件加载，不导入整个 utils 包
+_MODULE_PATH = Path(__file__).resolve().parent / "utils" / "avatar_cache.py"
+_spec = importlib.util.spec_from_file_location("avatar_cache", _MODULE_PATH)
+avatar_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(avatar_cache)
+AvatarCache = avatar_cache.AvatarCache
+
+AVATAR_SIZE = 100
+
+
+def _avatar_bytes(user_id: str) -> bytes:
+    """生成固定大小、带PNG文件头的头像数据"""
+    body = user_id.encode().ljust(AVATAR_SIZE - 8, b"\0")
+    return b"\x89PNG\r\n\x1a\n" + body
+
+
+class AvatarServer:
+    """本地头像服务器，记录每个用户的请求次数，可暂停响应模拟慢网络"""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.gate = threading.Event()
+        self.gate.set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                user_id = parse_qs(urlparse(self.path).query)["nk"][0]
+                server.requests[user_id] += 1
+                server.gate.wait(10)
+                data = _avatar_bytes(user_id)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url_template = f"http://127.0.0.1:{self.httpd.server_address[1]}/g?b=qq&nk={{user_id}}&s=100"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.gate.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = AvatarServer()
+    yield server
+    server.close()
+
+
+async def _wait_for_fetches(cache: AvatarCache):
+    """等待所有后台下载完成"""
+    while cache._inflight:
+        await asyncio.gather(*list(cache._inflight.values()), return_exceptions=True)
+
+
+async def _make_cache(cache_dir, server, **kwargs) -> AvatarCache:
+    cache = AvatarCache(cache_dir, url_template=server.url_template, **kwargs)
+    await cache.initialize()
+    return cache
+
+
+def test_constructor_does_not_touch_disk(tmp_path):
+    cache_dir = tmp_path / "avatars"
+    AvatarCache(cache_dir)
+    assert not cache_dir.exists()
+
+
+def test_get_does_not_block_on_network(tmp_path, server):
+    async def run():
+        cache = await _make_cache(tmp_path / "avatars", server)
+        server.gate.clear()  # 服务器暂停响应
+
+        started = time.perf_counter()
+        assert await cache.get("10001") is None
+        assert time.perf_counter() - started < 0.5
+
+        server.gate.set()
+        await _wait_for_fetches(cache)
+        assert await cache.get("10001") == _avatar_bytes("10001")
+        await cache.close()
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_fetch_once(tmp_path, server):
+    async def run():
+        cache = await _make_cache(tmp_path / "avatars", server)
+        server.gate.clear()
+
+        results = await asyncio.gather(*[cache.get("10002") for _ in range(20)])
+        cache.prefetch(["10002"] * 5)
+        assert results == [None] * 20
+
+        server.gate.set()
+        await _wait_for_fetches(cache)
+        assert server.requests["10002"] == 1
+        assert await cache.get("10002") == _avatar_bytes("10002")
+        assert server.requests["10002"] == 1
+        await cache.close()
+
+    asyncio.run(run())
+
+
+def test_lru_eviction_respects_size_cap(tmp_path, server):
+    async def run():
+        cache_dir = tmp_path / "avatars"
+        cache = await _make_cache(cache_dir, server, max_bytes=3 * AVATAR_SIZE)
+
+        for user_id in ("1", "2", "3"):
+            cache.prefetch([user_id])
+            await _wait_for_fetches(cache)
+        # 访问1，使2成为最久未使用的头像
+        assert await cache.get("1") is not None
+
+        cache.prefetch(["4"])
+        await _wait_for_fetches(cache)
+
+        stats = cache.get_stats()
+        assert stats["total_bytes"] <= 3 * AVATAR_SIZE
+        assert stats["entries"] == 3
+        assert not (cache_dir / "2.img").exists()
+        for user_id in ("1", "3", "4"):
+            assert (cache_dir / f"{user_id}.img").exists()
+        await cache.close()
+
+    asyncio.run(run())
+
+
+def test_initialize_restores_index(tmp_path, server):
+    async def run():
+        cache_dir = tmp_path / "avatars"
+        cache = await _make_cache(cache_dir, server)
+        cache.prefetch(["10003"])
+        await _wait_for_fetches(cache)
+        await cache.close()
+
+        restored = await _make_cache(cache_dir, server)
+        assert await restored.get("10003") == _avatar_bytes("10003")
+        await _wait_for_fetches(restored)
+        assert server.requests["10003"] == 1
+        await restored.close()
+
+    asyncio.run(run())
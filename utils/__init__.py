@@ -8,11 +8,20 @@
 - date_utils: 日期时间处理工具
 - data_manager: 数据管理器
 - image_generator: 图像生成器
+- avatar_cache: 本地头像缓存
+- pillow_renderer: Pillow排行榜渲染（无浏览器）
+- render_worker: 独立渲染进程
+- member_directory: 持久化的群成员目录
+- nickname_cache: 按群组划分的昵称缓存
+- group_metadata: 群组元数据索引（群名称、成员数）
 - validators: 验证器
+- ranking: 排行榜Top-K选择
+- rank_service: 排行榜服务（命令和定时推送共用）
+- single_flight: 并发请求合并
 """
 
 from .models import (
-    UserData, MessageDate, PluginConfig,
+    UserData, GroupUsers, MessageDate, PluginConfig,
     GroupInfo, RankData, RankType
 )
 from .file_utils import load_json_file, save_json_file
@@ -22,11 +31,19 @@ from .date_utils import (
 )
 from .data_manager import DataManager
 from .image_generator import ImageGenerator, ImageGenerationError
+from .avatar_cache import AvatarCache
+from .render_worker import RenderWorkerClient, RenderWorkerError
+from .member_directory import MemberDirectory
+from .nickname_cache import NicknameCache
+from .group_metadata import GroupMetadataStore
 from .validators import Validators, ValidationError
+from .ranking import top_k, partial_sort
+from .rank_service import RankService
+from .single_flight import SingleFlight
 
 __all__ = [
     # 数据模型
-    "UserData", "MessageDate", "PluginConfig",
+    "UserData", "GroupUsers", "MessageDate", "PluginConfig",
     "GroupInfo", "RankData", "RankType",
     
     # 文件操作工具
@@ -37,11 +54,15 @@ __all__ = [
     "is_same_week", "is_same_month", "get_date_range_days",
     
     # 核心组件
-    "DataManager", "ImageGenerator",
+    "DataManager", "ImageGenerator", "RankService", "AvatarCache", "SingleFlight",
+    "RenderWorkerClient", "MemberDirectory", "NicknameCache", "GroupMetadataStore",
     
     # 异常类
-    "ImageGenerationError", "ValidationError",
+    "ImageGenerationError", "ValidationError", "RenderWorkerError",
     
     # 验证器
-    "Validators"
+    "Validators",
+    
+    # 排行榜选择
+    "top_k", "partial_sort"
 ]
@@ -0,0 +1,141 @@
+"""
+发言活跃度矩阵模块
+
+把群组的按天发言历史转换为 用户 × 天 的稠密计数矩阵，并沿天方向做前缀和。
+任意日期范围的发言数只需一次向量化减法，不再在Python中逐个用户遍历历史记录，
+前K名的选择交给 ranking 模块的有界堆。
+
+NumPy为可选依赖，未安装时 NUMPY_AVAILABLE 为False，调用方回退到逐用户计算。
+NumPy导入耗时较长，第一次构建矩阵时才导入。
+"""
+
+import importlib.util
+from datetime import date
+from typing import Dict, List, Optional
+
+from .models import UserData
+
+# 矩阵最多包含的单元格数量（用户数 × 天数），超出时不构建，避免占用过多内存（int32，约16MB）
+ACTIVITY_MATRIX_MAX_CELLS = 4_000_000
+
+# numpy为可选依赖，未安装时不启用矩阵计算
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+np = None
+
+
+def _load_numpy() -> bool:
+    """导入numpy，返回是否可用"""
+    global NUMPY_AVAILABLE, np
+    if np is not None:
+        return True
+    if not NUMPY_AVAILABLE:
+        return False
+    try:
+        import numpy as np
+    except ImportError:
+        NUMPY_AVAILABLE = False
+        return False
+    return True
+
+
+class ActivityMatrix:
+    """用户 × 天 的发言数前缀和矩阵
+
+    计数使用int32（单个用户的累计发言数远小于2^31），节省一半内存。
+    prefix[i, j] 表示第i个用户从 first_day 到 first_day + j - 1 的累计发言数，
+    第0列恒为0，因此 [start, end] 范围内的发言数为 prefix[:, end+1] - prefix[:, start]。
+
+    Attributes:
+        user_ids (List[str]): 矩阵行对应的用户ID，顺序与群组用户列表一致
+        first_day (int): 第一列对应的日期序号(date.toordinal())
+        last_day (int): 最后一列对应的日期序号
+
+    Example:
+        >>> matrix = ActivityMatrix.build(users, date.today())
+        >>> matrix.range_counts(date(2026, 9, 1), date(2026, 9, 30))
+        {'123456': 42, ...}
+    """
+
+    def __init__(self, user_ids: List[str], first_day: int, last_day: int, prefix):
+        self.user_ids = user_ids
+        self.first_day = first_day
+        self.last_day = last_day
+        self._prefix = prefix
+        self._rows = {user_id: row for row, user_id in enumerate(user_ids)}
+
+    @classmethod
+    def build(cls, users: List[UserData], until: Optional[date] = None) -> Optional['ActivityMatrix']:
+        """从群组用户列表构建矩阵
+
+        Args:
+            users (List[UserData]): 群组用户列表
+            until (Optional[date]): 矩阵至少覆盖到的日期（通常为今天），便于之后的发言增量更新
+
+        Returns:
+            Optional[ActivityMatrix]: 构建的矩阵；NumPy不可用或矩阵超过 ACTIVITY_MATRIX_MAX_CELLS 时返回None
+        """
+        if not _load_numpy():
+            return None
+
+        rows, days, counts = [], [], []
+        for row, user in enumerate(users):
+            for day, count in user.history.items():
+                rows.append(row)
+                days.append(day)
+                counts.append(count)
+
+        last_day = max(days) if days else None
+        if until is not None:
+            last_day = max(last_day or 0, until.toordinal())
+        if last_day is None:
+            return None
+        first_day = min(days) if days else last_day
+
+        width = last_day - first_day + 1
+        if len(users) * (width + 1) > ACTIVITY_MATRIX_MAX_CELLS:
+            return None
+
+        prefix = np.zeros((len(users), width + 1), dtype=np.int32)
+        if days:
+            np.add.at(prefix, (np.asarray(rows), np.asarray(days) - first_day + 1), np.asarray(counts))
+            np.cumsum(prefix, axis=1, out=prefix)
+        return cls([user.user_id for user in users], first_day, last_day, prefix)
+
+    def add_message(self, user_id: str, day: date) -> bool:
+        """增量记录一条发言
+
+        Args:
+            user_id (str): 用户ID
+            day (date): 发言日期
+
+        Returns:
+            bool: 是否已更新；新用户或日期超出矩阵范围时返回False，调用方应丢弃矩阵重新构建
+        """
+        row = self._rows.get(user_id)
+        ordinal = day.toordinal()
+        if row is None or not self.first_day <= ordinal <= self.last_day:
+            return False
+        self._prefix[row, ordinal - self.first_day + 1:] += 1
+        return True
+
+    def _range_vector(self, start_date: date, end_date: date):
+        """计算 [start_date, end_date] 内每个用户的发言数向量"""
+        start = min(max(start_date.toordinal(), self.first_day), self.last_day + 1) - self.first_day
+        end = min(max(end_date.toordinal() + 1, self.first_day), self.last_day + 1) - self.first_day
+        if end <= start:
+            return np.zeros(len(self.user_ids), dtype=np.int32)
+        return self._prefix[:, end] - self._prefix[:, start]
+
+    def range_counts(self, start_date: date, end_date: date) -> Dict[str, int]:
+        """汇总每个用户在日期范围内的发言数
+
+        Args:
+            start_date (date): 开始日期（包含）
+            end_date (date): 结束日期（包含）
+
+        Returns:
+            Dict[str, int]: {user_id: 发言数}，只包含发言数大于0的用户
+        """
+        vector = self._range_vector(start_date, end_date)
+        active = np.flatnonzero(vector > 0)
+        return {self.user_ids[row]: int(vector[row]) for row in active}
@@ -0,0 +1,337 @@
+"""
+头像缓存模块
+
+排行榜图片最多包含上百个头像，每次渲染都让Chromium去 q1.qlogo.cn 下载，
+既是渲染耗时的主要来源，离线时还会整体失败。
+
+AvatarCache 把头像按 user_id 存放在本地磁盘，带TTL和按总大小淘汰的LRU：
+- 渲染时只读本地文件，未命中返回None，由调用方使用本地占位图，不阻塞在外部网络上
+- 未命中或已过期的头像交给后台任务下载，同一用户同时只有一个下载任务
+- 过期的头像在刷新完成前继续使用
+- 创建缓存目录和扫描已有头像在 initialize() 中于线程里执行，不占用插件启动路径
+
+ImageGenerator 通过Playwright请求拦截把头像URL映射到这里的缓存。
+"""
+
+import asyncio
+import os
+import re
+import time
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import aiofiles
+
+from astrbot.api import logger as astrbot_logger
+
+# aiohttp由AstrBot自带，不可用时在线程中使用urllib下载
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+# 头像下载地址，排行榜头像显示为75像素，下载100像素的尺寸即可
+AVATAR_FETCH_URL = "https://q1.qlogo.cn/g?b=qq&nk={user_id}&s=100"
+# 需要拦截的头像请求地址
+AVATAR_URL_PATTERN = re.compile(r"^https?://q\d\.qlogo\.cn/")
+AVATAR_CACHE_TTL = 72 * 3600  # 默认头像有效期（秒）
+AVATAR_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 默认缓存目录最大总大小
+AVATAR_FETCH_CONCURRENCY = 4  # 同时下载的头像数量
+AVATAR_FETCH_TIMEOUT = 10  # 单个头像下载超时（秒）
+AVATAR_MAX_SIZE = 1024 * 1024  # 单个头像的最大字节数，超出视为异常响应
+AVATAR_FILE_SUFFIX = ".img"  # 缓存文件后缀，内容类型由文件头判断
+
+# 未命中时使用的本地占位头像
+AVATAR_PLACEHOLDER_SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100">'
+    b'<rect width="100" height="100" fill="#dfe4ea"/>'
+    b'<circle cx="50" cy="38" r="18" fill="#a4b0be"/>'
+    b'<path d="M16 92c4-20 18-30 34-30s30 10 34 30z" fill="#a4b0be"/>'
+    b'</svg>'
+)
+AVATAR_PLACEHOLDER_CONTENT_TYPE = "image/svg+xml"
+
+# 合法的用户ID（同时作为文件名）
+_USER_ID_PATTERN = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+
+# 图片文件头与内容类型
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+)
+
+
+def guess_image_type(data: bytes) -> Optional[str]:
+    """根据文件头判断图片内容类型
+
+    Args:
+        data (bytes): 图片数据
+
+    Returns:
+        Optional[str]: MIME类型，不是已知图片格式时返回None
+    """
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    return None
+
+
+class AvatarCache:
+    """本地磁盘头像缓存
+
+    Attributes:
+        cache_dir (Path): 缓存目录，每个头像一个 <user_id>.img 文件
+        ttl (float): 头像有效期（秒），过期后仍可使用，同时触发后台刷新
+        max_bytes (int): 缓存目录最大总大小，超出后按最近最少使用淘汰
+        url_template (str): 头像下载地址模板，包含 {user_id} 占位符
+
+    Example:
+        >>> cache = AvatarCache(data_dir / "cache" / "avatars")
+        >>> await cache.initialize()
+        >>> cache.prefetch(["123456", "654321"])
+        >>> data = await cache.get("123456")  # 未下载完成时返回None
+    """
+
+    def __init__(self, cache_dir, ttl: float = AVATAR_CACHE_TTL, max_bytes: int = AVATAR_CACHE_MAX_BYTES,
+                 url_template: str = AVATAR_FETCH_URL, logger=None):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.url_template = url_template
+        self.logger = logger or astrbot_logger
+
+        # user_id -> (文件大小, 下载时间)，按最近使用顺序排列
+        self._index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._fetch_semaphore = asyncio.Semaphore(AVATAR_FETCH_CONCURRENCY)
+        self._session = None
+        self._init_task: Optional[asyncio.Task] = None
+
+        self._hits = 0
+        self._misses = 0
+        self._fetch_failures = 0
+
+    async def initialize(self):
+        """创建缓存目录并加载已有头像的索引
+
+        目录扫描在线程中执行；可以重复调用，并发调用只扫描一次。
+        未初始化前 get() 按未命中处理，下载任务会先等待初始化完成。
+        """
+        if self._init_task is None:
+            self._init_task = asyncio.create_task(self._load_index())
+        await asyncio.shield(self._init_task)
+
+    def _scan_cache_dir(self) -> List[Tuple[float, str, int]]:
+        """创建缓存目录并列出已有头像，返回按修改时间从旧到新排列的 (mtime, user_id, size)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.cache_dir.glob(f"*{AVATAR_FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        return sorted(entries)
+
+    async def _load_index(self):
+        """扫描缓存目录重建索引"""
+        try:
+            entries = await asyncio.to_thread(self._scan_cache_dir)
+        except OSError as e:
+            self.logger.warning(f"初始化头像缓存目录失败: {e}")
+            return
+
+        # 扫描期间已写入的头像更新，放在索引末尾（最近使用）
+        loaded: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        for mtime, user_id, size in entries:
+            if user_id not in self._index:
+                loaded[user_id] = (size, mtime)
+                self._total_bytes += size
+        loaded.update(self._index)
+        self._index = loaded
+        self._evict()
+
+    def _path(self, user_id: str) -> Path:
+        return self.cache_dir / f"{user_id}{AVATAR_FILE_SUFFIX}"
+
+    @staticmethod
+    def user_id_from_url(url: str) -> Optional[str]:
+        """从头像URL中解析用户ID
+
+        Args:
+            url (str): 头像URL，如 https://q1.qlogo.cn/g?b=qq&nk=123456&s=640
+
+        Returns:
+            Optional[str]: 用户ID，无法解析或不合法时返回None
+        """
+        values = parse_qs(urlparse(url).query).get("nk")
+        if not values or not _USER_ID_PATTERN.match(values[0]):
+            return None
+        return values[0]
+
+    def _is_fresh(self, user_id: str) -> bool:
+        entry = self._index.get(user_id)
+        return entry is not None and time.time() - entry[1] < self.ttl
+
+    # ========== 读取 ==========
+
+    async def get(self, user_id: str) -> Optional[bytes]:
+        """读取缓存的头像，不访问网络
+
+        未命中时安排后台下载并返回None；命中但已过期时返回旧头像并安排刷新。
+
+        Args:
+            user_id (str): 用户ID
+
+        Returns:
+            Optional[bytes]: 头像数据，未缓存时返回None
+        """
+        if not _USER_ID_PATTERN.match(str(user_id)):
+            return None
+
+        if user_id not in self._index:
+            self._misses += 1
+            self._schedule_fetch(user_id)
+            return None
+
+        try:
+            async with aiofiles.open(self._path(user_id), "rb") as f:
+                data = await f.read()
+        except OSError:
+            # 文件被外部删除，视为未命中
+            self._forget(user_id)
+            self._misses += 1
+            self._schedule_fetch(user_id)
+            return None
+
+        self._hits += 1
+        self._index.move_to_end(user_id)
+        if not self._is_fresh(user_id):
+            self._schedule_fetch(user_id)
+        return data
+
+    def prefetch(self, user_ids: Iterable[str]):
+        """在后台下载未缓存或已过期的头像，立即返回
+
+        Args:
+            user_ids (Iterable[str]): 用户ID列表
+        """
+        for user_id in user_ids:
+            user_id = str(user_id)
+            if _USER_ID_PATTERN.match(user_id) and not self._is_fresh(user_id):
+                self._schedule_fetch(user_id)
+
+    # ========== 下载 ==========
+
+    def _schedule_fetch(self, user_id: str):
+        """安排后台下载，同一用户同时只有一个下载任务"""
+        if user_id in self._inflight:
+            return
+        task = asyncio.create_task(self._fetch(user_id))
+        self._inflight[user_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+
+    async def _fetch(self, user_id: str):
+        """下载头像并写入缓存"""
+        await self.initialize()
+        if self._is_fresh(user_id):
+            # 初始化前的未命中，磁盘上已有可用头像
+            return
+        async with self._fetch_semaphore:
+            url = self.url_template.format(user_id=user_id)
+            try:
+                data = await self._download(url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._fetch_failures += 1
+                self.logger.debug(f"下载头像失败 {user_id}: {e}")
+                return
+
+            if not data or len(data) > AVATAR_MAX_SIZE or guess_image_type(data) is None:
+                self._fetch_failures += 1
+                self.logger.debug(f"头像响应不是有效图片 {user_id}")
+                return
+
+            await self._store(user_id, data)
+
+    async def _download(self, url: str) -> bytes:
+        """下载URL内容，优先使用aiohttp"""
+        if AIOHTTP_AVAILABLE:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=AVATAR_FETCH_TIMEOUT))
+            async with self._session.get(url) as response:
+                response.raise_for_status()
+                return await response.read()
+
+        def _blocking_download() -> bytes:
+            with urllib.request.urlopen(url, timeout=AVATAR_FETCH_TIMEOUT) as response:
+                return response.read(AVATAR_MAX_SIZE + 1)
+
+        return await asyncio.to_thread(_blocking_download)
+
+    async def _store(self, user_id: str, data: bytes):
+        """原子写入头像文件并更新索引"""
+        path = self._path(user_id)
+        temp_path = path.with_suffix(".tmp")
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                await f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            self.logger.warning(f"写入头像缓存失败 {user_id}: {e}")
+            return
+
+        self._forget(user_id)
+        self._index[user_id] = (len(data), time.time())
+        self._total_bytes += len(data)
+        self._evict()
+
+    # ========== 淘汰 ==========
+
+    def _forget(self, user_id: str):
+        entry = self._index.pop(user_id, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    def _evict(self):
+        """总大小超出 max_bytes 时，从最久未使用的头像开始删除"""
+        while self._total_bytes > self.max_bytes and self._index:
+            user_id, (size, _) = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                self._path(user_id).unlink()
+            except OSError:
+                pass
+
+    # ========== 管理 ==========
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        return {
+            'entries': len(self._index),
+            'total_bytes': self._total_bytes,
+            'hits': self._hits,
+            'misses': self._misses,
+            'fetching': len(self._inflight),
+            'fetch_failures': self._fetch_failures
+        }
+
+    async def close(self):
+        """取消未完成的下载并关闭HTTP会话"""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -5,9 +5,9 @@
 支持异步操作和缓存机制。
 """
 
-import json
 import re
 import time
+import shutil
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 import aiofiles
@@ -15,10 +15,16 @@ import asyncio
 from datetime import datetime, timedelta
 from cachetools import TTLCache
 from astrbot.api import logger as astrbot_logger
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
-from .models import UserData, PluginConfig, MessageDate
-from .data_stores import GroupDataStore, ConfigManager, PluginCache
+from .models import UserData, GroupUsers, PluginConfig, MessageDate
+from .data_stores import (
+    GroupDataStore, SQLiteGroupDataStore, ConfigManager, PluginCache,
+    MESSAGE_LOG_CHECKPOINT_EVENTS, STORAGE_BACKEND_JSON, STORAGE_BACKEND_SQLITE, SQLITE_DB_FILENAME
+)
+from .ranking import top_k
+from .activity_matrix import ActivityMatrix, NUMPY_AVAILABLE
+from .group_metadata import GroupMetadataStore, GROUP_METADATA_FILENAME
 from .exception_handlers import safe_data_operation, safe_file_operation, safe_cache_operation, safe_config_operation, safe_calculation
 
 # 缓存配置常量
@@ -28,13 +34,22 @@ DATA_CACHE_TTL = 300  # 数据缓存生存时间（秒），5分钟后过期
 CONFIG_CACHE_MAXSIZE = 10  # 配置缓存最大容量，用于缓存插件配置
 CONFIG_CACHE_TTL = 60  # 配置缓存生存时间（秒），1分钟后过期
 
+# 延迟写回（write-behind）默认参数，实际值优先取自插件配置
+DEFAULT_FLUSH_INTERVAL_SECONDS = 10  # 脏数据最长停留时间（秒）
+DEFAULT_FLUSH_MAX_MUTATIONS = 200  # 单群组累计修改次数达到该值时立即写回
+
+# 常驻内存的群组状态配置
+GROUP_STATE_MAXSIZE = 1000  # 最多常驻的群组数量，超出时淘汰最久未访问的干净群组
+GROUP_STATE_IDLE_TTL = 1800  # 干净群组空闲超过该时间（秒）后从内存中淘汰
+ACTIVITY_MATRIX_MAXSIZE = 16  # 最多缓存的发言矩阵数量，超出时淘汰最久未使用的矩阵
+
 
 class DataManager:
     """数据管理器（重构版本）
     
     协调各个专门的组件，提供统一的数据管理接口。
     将原来的单一职责拆分为多个专门的组件：
-    - GroupDataStore: 群组数据存储
+    - GroupDataStore / SQLiteGroupDataStore: 群组数据存储（按配置选择后端）
     - ConfigManager: 配置管理
     - PluginCache: 缓存管理
     
@@ -44,11 +59,12 @@ class DataManager:
         >>> users = await dm.get_group_data("123456789")
     """
     
-    def __init__(self, data_dir: Optional[str] = None):
+    def __init__(self, data_dir: Optional[str] = None, storage_backend: str = STORAGE_BACKEND_JSON):
         """初始化数据管理器
 
         Args:
             data_dir (str): 数据目录路径，由StarTools.get_data_dir()确定
+            storage_backend (str): 群组数据存储后端，"json"（默认）或 "sqlite"
         """
         if data_dir is None:
             raise ValueError("data_dir不能为None。请在插件初始化时提供正确的数据目录路径")
@@ -63,7 +79,13 @@ class DataManager:
         self.logger = astrbot_logger
         
         # 初始化各个专门的组件
-        self.group_store = GroupDataStore(self.groups_dir, self.logger)
+        if storage_backend == STORAGE_BACKEND_SQLITE:
+            self.group_store = SQLiteGroupDataStore(self.groups_dir, self.data_dir / SQLITE_DB_FILENAME, self.logger)
+        else:
+            if storage_backend != STORAGE_BACKEND_JSON:
+                self.logger.warning(f"未知的存储后端 {storage_backend}，使用默认的JSON存储")
+            self.group_store = GroupDataStore(self.groups_dir, self.logger)
+        self.storage_backend = storage_backend if storage_backend == STORAGE_BACKEND_SQLITE else STORAGE_BACKEND_JSON
         self.config_manager = ConfigManager(self.config_file, self.logger)
         self.cache_manager = PluginCache(
             data_cache_maxsize=DATA_CACHE_MAXSIZE,
@@ -76,6 +98,25 @@ class DataManager:
         # 群组级别的锁机制，防止并发安全问题
         self._group_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
         
+        # 常驻内存的群组状态（权威数据源），按最近访问顺序排列，并记录最后访问时间
+        self._group_states: "OrderedDict[str, List[UserData]]" = OrderedDict()
+        self._group_last_access: Dict[str, float] = {}
+        
+        # 延迟写回：脏群组、累计修改次数和后台写回任务
+        self._dirty_groups: set = set()
+        self._dirty_mutations: Dict[str, int] = defaultdict(int)
+        self._flush_event = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        # 各群组的发言前缀和矩阵（需要NumPy），用于任意日期范围排行榜
+        self._activity_matrices: "OrderedDict[str, ActivityMatrix]" = OrderedDict()
+        
+        # 各群组的数据版本号，每次写入递增，作为排行榜结果缓存键的一部分
+        self._group_versions: Dict[str, int] = defaultdict(int)
+        
+        # 群组元数据索引（群名称、成员数），命令和定时推送共用
+        self.group_metadata = GroupMetadataStore(self.data_dir / GROUP_METADATA_FILENAME, logger=self.logger)
+        
         # 确保目录存在
         self._ensure_directories()
         
@@ -123,8 +164,35 @@ class DataManager:
         if not await asyncio.to_thread(self.config_file.exists):
             await self._create_default_config()
         
+        # 上次运行留下的排行榜图片对应的缓存索引已不存在，直接清理
+        await asyncio.to_thread(self._purge_rank_images)
+        
+        # 加载群组元数据索引
+        await self.group_metadata.load()
+        
+        # 启动后台写回任务
+        self._start_flusher()
+        
         self.logger.info("数据管理器初始化完成")
     
+    async def terminate(self):
+        """停止后台写回任务并强制写回所有脏数据
+        
+        插件卸载时调用，保证内存中尚未落盘的修改全部写入磁盘。
+        """
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        
+        flushed = await self.flush_all()
+        await self.group_store.close()
+        await self.group_metadata.close()
+        self.logger.info(f"数据管理器已停止，退出前写回 {flushed} 个群组")
+    
     async def _create_default_config(self):
         """创建默认基本配置
         
@@ -150,112 +218,20 @@ class DataManager:
         await self.save_config(default_config)
         self.logger.info("已创建默认配置文件")
     
-    def _validate_json_content(self, content: str) -> bool:
-        """验证JSON内容格式
-        
-        Args:
-            content (str): JSON内容字符串
-            
-        Returns:
-            bool: 格式是否有效
-        """
-        try:
-            json.loads(content)
-            return True
-        except json.JSONDecodeError:
-            return False
-    
-    async def _repair_corrupted_json(self, file_path: Path, content: str) -> List[Dict]:
-        """尝试修复损坏的JSON数据
-        
-        稳健的修复策略：
-        1. 尝试简单修复（清理多余逗号）
-        2. 如果失败，备份损坏的文件并创建新的空数据文件
-        
-        Args:
-            file_path (Path): 文件路径，用于备份
-            content (str): 损坏的JSON内容
-            
-        Returns:
-            List[Dict]: 修复后的数据（空列表表示创建了新文件）
-        """
-        try:
-            # 首先尝试直接解析
-            return await asyncio.to_thread(json.loads, content)
-        except json.JSONDecodeError:
-            pass
-        
-        try:
-            # 尝试简单修复：清理多余的逗号
-            cleaned_content = re.sub(r',(\s*[}\]])', r'\1', content)
-            return await asyncio.to_thread(json.loads, cleaned_content)
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            # 简单修复失败，采用稳健策略：备份并重建
-            self.logger.warning(f"JSON文件 {file_path} 损坏，创建备份并重建")
-            
-            try:
-                # 创建备份文件
-                backup_path = file_path.with_suffix('.backup')
-                async with aiofiles.open(backup_path, 'w', encoding='utf-8') as f:
-                    await f.write(content)
-                
-                # 创建新的空数据文件
-                async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                    await f.write('[]')
-                
-                self.logger.info(f"已备份损坏文件到 {backup_path}，并创建新的空数据文件")
-                return []
-                
-            except (IOError, OSError, json.JSONDecodeError) as e:
-                self.logger.error(f"备份和重建文件失败: {e}")
-                return []
-    
-    async def _save_json_safely(self, file_path: Path, data: List[Dict]) -> bool:
-        """安全地保存JSON数据
-        
-        使用临时文件确保原子性写入。
-        
-        Args:
-            file_path (Path): 目标文件路径
-            data (List[Dict]): 要保存的数据
-            
-        Returns:
-            bool: 保存是否成功
-        """
-        try:
-            # 创建临时文件
-            temp_file = file_path.with_suffix('.tmp')
-            
-            # 写入临时文件
-            async with aiofiles.open(temp_file, 'w', encoding='utf-8') as f:
-                json_content = await asyncio.to_thread(json.dumps, data, ensure_ascii=False, indent=2)
-                await f.write(json_content)
-            
-            # 原子性移动到目标文件
-            await asyncio.to_thread(temp_file.replace, file_path)
-            return True
-            
-        except (IOError, OSError) as e:
-            self.logger.error(f"安全保存文件失败: {e}")
-            # 清理临时文件
-            temp_file = file_path.with_suffix('.tmp')
-            if await asyncio.to_thread(temp_file.exists):
-                await asyncio.to_thread(temp_file.unlink)
-            return False
-    
     # ========== 群组数据管理 ==========
     
     @safe_data_operation(default_return=[])
     async def get_group_data(self, group_id: str) -> List[UserData]:
         """获取群组数据
         
-        从缓存或文件读取指定群组的用户数据。
+        优先返回常驻内存的群组状态，未加载时才从存储后端读取。
+        内存中的对象是权威数据源，保存后仍然保留，活跃群组在进程生命周期内只解析一次。
         
         Args:
             group_id (str): 群组ID，必须是有效的数字字符串
             
         Returns:
-            List[UserData]: 用户数据列表，如果读取失败则返回空列表
+            List[UserData]: 用户数据列表（带 user_id 索引的 GroupUsers），如果读取失败则返回空列表
             
         Raises:
             ValueError: 当group_id格式不正确时
@@ -263,31 +239,97 @@ class DataManager:
         if not group_id.isdigit():
             raise ValueError(f"群组ID必须是数字字符串，当前值: {group_id}")
         
-        cache_key = f"group_data_{group_id}"
-        
-        # 检查缓存
-        if cache_key in self.data_cache:
-            return self.data_cache[cache_key]
+        # 检查常驻状态
+        users = self._group_states.get(group_id)
+        if users is not None:
+            self._touch_group(group_id)
+            return users
         
         # 使用GroupDataStore加载数据
         users = await self.group_store.load_group_data(group_id)
         
-        # 缓存结果
-        self.data_cache[cache_key] = users
+        # 并发加载时以先放入的状态为准，避免出现两份不同的对象
+        if group_id in self._group_states:
+            self._touch_group(group_id)
+            return self._group_states[group_id]
+        
+        users = self._set_group_state(group_id, users)
+        self._evict_idle_groups()
         return users
     
-    @safe_data_operation(default_return=None)
-    async def save_group_data(self, group_id: str, users: List[UserData]):
+    def _touch_group(self, group_id: str):
+        """更新群组的最近访问顺序和时间"""
+        self._group_states.move_to_end(group_id)
+        self._group_last_access[group_id] = time.monotonic()
+    
+    def _set_group_state(self, group_id: str, users: List[UserData]) -> GroupUsers:
+        """写入（或替换）群组的常驻状态
+        
+        普通列表会被包装为带 user_id 索引的 GroupUsers，索引随群组对象常驻内存，
+        之后的按用户查找和更新都不需要再遍历列表。
+        
+        Returns:
+            GroupUsers: 实际常驻的群组对象
+        """
+        if not isinstance(users, GroupUsers):
+            users = GroupUsers(users)
+        if self._group_states.get(group_id) is not users:
+            # 群组对象被整体替换，基于旧对象构建的矩阵不再可用
+            self._activity_matrices.pop(group_id, None)
+        self._group_states[group_id] = users
+        self._touch_group(group_id)
+        return users
+    
+    def _drop_group_state(self, group_id: str):
+        """从内存中移除群组状态"""
+        self._group_states.pop(group_id, None)
+        self._group_last_access.pop(group_id, None)
+        self._activity_matrices.pop(group_id, None)
+    
+    def _evict_idle_groups(self, force: bool = False) -> int:
+        """淘汰常驻内存的干净群组
+        
+        只淘汰已落盘（非脏）的群组：空闲超过 GROUP_STATE_IDLE_TTL 的群组，
+        以及超出 GROUP_STATE_MAXSIZE 时最久未访问的群组。
+        
+        Args:
+            force (bool): 为True时淘汰所有干净群组
+            
+        Returns:
+            int: 淘汰的群组数量
+        """
+        now = time.monotonic()
+        overflow = len(self._group_states) - GROUP_STATE_MAXSIZE
+        evicted = 0
+        
+        # OrderedDict按最近访问排序，从最久未访问的开始检查
+        for group_id in list(self._group_states.keys()):
+            if group_id in self._dirty_groups:
+                continue
+            idle = now - self._group_last_access.get(group_id, now)
+            if force or overflow > 0 or idle >= GROUP_STATE_IDLE_TTL:
+                self._drop_group_state(group_id)
+                overflow -= 1
+                evicted += 1
+            else:
+                # 后面的群组访问更近，且已不超出容量，提前结束
+                break
+        return evicted
+    
+    @safe_data_operation(default_return=False)
+    async def save_group_data(self, group_id: str, users: List[UserData]) -> bool:
         """保存群组数据
         
-        异步保存指定群组的用户数据到JSON文件，并清除相关缓存。
+        异步保存指定群组的用户数据，并将其作为常驻状态保留在内存中（写穿）。
+        立即写盘，适用于签到、管理员修改等低频操作；高频修改请使用 mark_group_dirty。
+        保存期间持有群组锁：写快照后会截断消息日志，期间追加的消息必须等快照完成。
         
         Args:
             group_id (str): 群组ID，必须是有效的数字字符串
             users (List[UserData]): 用户数据列表，将被序列化为JSON格式保存
             
         Returns:
-            None: 无返回值，保存结果通过日志输出
+            bool: 保存是否成功
             
         Raises:
             ValueError: 当group_id格式不正确时
@@ -295,20 +337,140 @@ class DataManager:
         if not group_id.isdigit():
             raise ValueError(f"群组ID必须是数字字符串，当前值: {group_id}")
         
+        async with self._group_locks[group_id]:
+            return await self._save_group_data_locked(group_id, users)
+    
+    @safe_data_operation(default_return=False)
+    async def _save_group_data_locked(self, group_id: str, users: List[UserData]) -> bool:
+        """保存群组数据，调用方必须已持有该群组的锁（群组锁不可重入）"""
         # 使用GroupDataStore保存数据
         success = await self.group_store.save_group_data(group_id, users)
         
         if success:
-            # 清除缓存
-            cache_key = f"group_data_{group_id}"
-            if cache_key in self.data_cache:
-                del self.data_cache[cache_key]
+            # 数据已落盘，不再需要延迟写回
+            self._dirty_groups.discard(group_id)
+            self._dirty_mutations.pop(group_id, None)
+            
+            # 写穿：保存的对象就是最新状态，继续常驻内存
+            self._set_group_state(group_id, users)
+            self._bump_group_version(group_id)
             
             # 只在开启详细日志时记录群组数据保存信息
             if self.plugin_config and getattr(self.plugin_config, 'detailed_logging_enabled', True):
                 self.logger.info(f"群组 {group_id} 数据已安全保存，共 {len(users)} 个用户")
         else:
             self.logger.error(f"群组 {group_id} 数据保存失败")
+        return success
+    
+    @safe_data_operation(default_return=False)
+    async def save_user_data(self, group_id: str, user: UserData) -> bool:
+        """更新群组中的单个用户并立即保存
+        
+        通过群组的 user_id 索引定位用户：不存在时追加，存在但不是同一对象时替换，
+        避免调用方为替换一个用户而遍历整个列表。
+        
+        Args:
+            group_id (str): 群组ID
+            user (UserData): 修改后的用户数据
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        async with self._group_locks[group_id]:
+            users = await self.get_group_data(group_id)
+            if not isinstance(users, GroupUsers):
+                users = GroupUsers(users)
+            
+            existing = users.get_user(user.user_id)
+            if existing is None:
+                users.append(user)
+            elif existing is not user:
+                users[users.index(existing)] = user
+            return await self._save_group_data_locked(group_id, users)
+    
+    # ========== 延迟写回 ==========
+    
+    def _get_flush_settings(self) -> tuple:
+        """获取写回间隔和修改次数阈值"""
+        interval = getattr(self.plugin_config, 'flush_interval_seconds', DEFAULT_FLUSH_INTERVAL_SECONDS)
+        max_mutations = getattr(self.plugin_config, 'flush_max_mutations', DEFAULT_FLUSH_MAX_MUTATIONS)
+        return max(1, int(interval)), max(1, int(max_mutations))
+    
+    def _start_flusher(self):
+        """启动后台写回任务（已在运行时跳过）"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def mark_group_dirty(self, group_id: str, users: List[UserData]):
+        """标记群组数据已修改，由后台任务延迟写回
+        
+        同一群组在一个写回周期内的多次修改只会产生一次磁盘写入。
+        累计修改次数达到 flush_max_mutations 时立即唤醒写回任务。
+        
+        Args:
+            group_id (str): 群组ID
+            users (List[UserData]): 修改后的完整用户列表（通常就是 get_group_data 返回的对象）
+        """
+        self._set_group_state(group_id, users)
+        self._bump_group_version(group_id)
+        self._dirty_groups.add(group_id)
+        self._dirty_mutations[group_id] += 1
+        
+        _, max_mutations = self._get_flush_settings()
+        if self._dirty_mutations[group_id] >= max_mutations:
+            self._flush_event.set()
+        
+        self._start_flusher()
+    
+    async def _flush_loop(self):
+        """后台写回循环：每个写回间隔或被修改次数阈值唤醒时写回所有脏群组"""
+        while True:
+            interval, _ = self._get_flush_settings()
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            
+            try:
+                await self.flush_all()
+            except (IOError, OSError, RuntimeError) as e:
+                # 写回失败时保留脏标记，下个周期重试
+                self.logger.error(f"后台写回群组数据失败: {e}")
+            
+            # 顺带淘汰空闲的干净群组
+            self._evict_idle_groups()
+    
+    async def flush_group(self, group_id: str) -> bool:
+        """立即写回单个脏群组
+        
+        Args:
+            group_id (str): 群组ID
+            
+        Returns:
+            bool: 是否发生了写回
+        """
+        async with self._group_locks[group_id]:
+            users = self._group_states.get(group_id)
+            if group_id not in self._dirty_groups or users is None:
+                return False
+            
+            if not await self._save_group_data_locked(group_id, users):
+                # 保存失败，保留脏标记等待下个周期重试
+                return False
+            return True
+    
+    async def flush_all(self) -> int:
+        """写回所有脏群组
+        
+        Returns:
+            int: 成功写回的群组数量
+        """
+        flushed = 0
+        for group_id in list(self._dirty_groups):
+            if await self.flush_group(group_id):
+                flushed += 1
+        return flushed
     
     @safe_data_operation(default_return=False)
     async def update_user_message(self, group_id: str, user_id: str, nickname: str) -> bool:
@@ -341,49 +503,64 @@ class DataManager:
             # 获取现有数据
             users = await self.get_group_data(group_id)
             current_timestamp = int(datetime.now().timestamp())
+            message_date = MessageDate.from_date(datetime.now().date())
+            
+            # 构建消息事件并应用到内存中的群组数据（新用户会被追加到列表）
+            event = self.group_store.build_message_event(user_id, nickname, message_date, current_timestamp)
+            self.group_store.apply_message_event(users, event)
+            self._bump_group_version(group_id)
+            
+            # 同步更新发言矩阵，无法增量更新（新用户、跨天）时丢弃，下次查询重建
+            matrix = self._activity_matrices.get(group_id)
+            if matrix is not None and not matrix.add_message(user_id, message_date.to_date()):
+                del self._activity_matrices[group_id]
             
-            # 优化性能：将用户列表转换为字典，以 user_id 为键
-            users_dict = {user.user_id: user for user in users}
-            
-            # 查找用户（O(1) 操作）
-            if user_id in users_dict:
-                # 更新现有用户 - 使用add_message方法正确记录历史
-                user = users_dict[user_id]
-                today = datetime.now().date()
-                message_date = MessageDate.from_date(today)
-                user.add_message(message_date)
-                user.last_message_time = current_timestamp
-                if user.first_message_time is None:
-                    user.first_message_time = current_timestamp
+            # 只追加一条日志记录，不再每条消息重写整个群组文件
+            try:
+                pending_events = await self.group_store.append_message_event(group_id, event)
+            except (IOError, OSError) as e:
+                # 日志写入失败时退回全量保存，保证消息不丢失
+                self.logger.warning(f"群组 {group_id} 消息日志写入失败，改为全量保存: {e}")
+                await self._save_group_data_locked(group_id, users)
+                return True
+            
+            # 日志累计到阈值后交给后台写回任务写检查点，合并到快照并截断日志
+            if pending_events >= MESSAGE_LOG_CHECKPOINT_EVENTS:
+                await self.mark_group_dirty(group_id, users)
+            return True
+    
+    @safe_data_operation(default_return=False)
+    async def update_user_nickname(self, group_id: str, user_id: str, nickname: str) -> bool:
+        """更新用户在群组中记录的昵称，不计入发言
+        
+        群名片变更通知使用；用户还没有发言记录时不创建新用户。
+        
+        Args:
+            group_id (str): 群组ID
+            user_id (str): 用户ID
+            nickname (str): 新昵称
+            
+        Returns:
+            bool: 昵称是否发生变化
+        """
+        async with self._group_locks[group_id]:
+            users = await self.get_group_data(group_id)
+            if isinstance(users, GroupUsers):
+                user = users.get_user(user_id)
             else:
-                # 如果用户不存在，创建新用户
-                # 为新用户创建消息记录
-                today = datetime.now().date()
-                message_date = MessageDate.from_date(today)
-                
-                new_user = UserData(
-                    user_id=user_id,
-                    nickname=nickname,
-                    message_count=0,  # 先设为0，add_message会增加到1
-                    first_message_time=current_timestamp,
-                    last_message_time=current_timestamp
-                )
-                # 添加第一条消息记录（这会将message_count增加到1）
-                new_user.add_message(message_date)
-                users_dict[user_id] = new_user
-            
-            # 将字典转换回列表
-            updated_users = list(users_dict.values())
-            
-            # 保存更新后的数据
-            await self.save_group_data(group_id, updated_users)
+                user = next((user for user in users if user.user_id == user_id), None)
+            if user is None or user.nickname == nickname:
+                return False
+            
+            user.nickname = nickname
+            await self.mark_group_dirty(group_id, users)
             return True
     
     @safe_data_operation(default_return=False)
     async def clear_group_data(self, group_id: str) -> bool:
         """清空群组数据
         
-        删除指定群组的所有数据。
+        删除指定群组的所有数据。持有群组锁，避免并发的消息追加或检查点在删除后重新写出日志或快照。
         
         Args:
             group_id (str): 群组ID
@@ -391,15 +568,13 @@ class DataManager:
         Returns:
             bool: 操作是否成功
         """
-        file_path = self.groups_dir / f"{group_id}.json"
-        
-        if await aiofiles.os.path.exists(file_path):
-            await aiofiles.os.remove(file_path)
-        
-        # 清除缓存
-        cache_key = f"group_data_{group_id}"
-        if cache_key in self.data_cache:
-            del self.data_cache[cache_key]
+        async with self._group_locks[group_id]:
+            # 丢弃尚未写回的修改和常驻状态，同时删除快照和消息日志
+            self._dirty_groups.discard(group_id)
+            self._dirty_mutations.pop(group_id, None)
+            self._drop_group_state(group_id)
+            self._bump_group_version(group_id)
+            await self.group_store.delete_group_data(group_id)
         
         self.logger.info(f"群组 {group_id} 数据已清空")
         return True
@@ -418,23 +593,86 @@ class DataManager:
             Optional[UserData]: 用户信息，如果用户不存在则返回None
         """
         users = await self.get_group_data(group_id)
-        for user in users:
-            if user.user_id == user_id:
-                return user
-        return None
+        if isinstance(users, GroupUsers):
+            return users.get_user(user_id)
+        return next((user for user in users if user.user_id == user_id), None)
+    
+    @safe_data_operation(default_return=None)
+    async def get_period_message_counts(self, group_id: str, start_date, end_date) -> Optional[Dict[str, int]]:
+        """按用户汇总指定日期范围内的发言数
+        
+        支持索引查询的存储后端（SQLite）直接返回 {user_id: 发言数}；
+        JSON后端返回None，由调用方基于内存中的历史记录计算。
+        
+        Args:
+            group_id (str): 群组ID
+            start_date (date): 开始日期（包含）
+            end_date (date): 结束日期（包含）
+            
+        Returns:
+            Optional[Dict[str, int]]: 各用户时间段内的发言数，不支持时返回None
+        """
+        return await self.group_store.get_period_counts(group_id, start_date, end_date)
+    
+    @safe_data_operation(default_return=None)
+    async def get_range_message_counts(self, group_id: str, start_date, end_date) -> Optional[Dict[str, int]]:
+        """按用户汇总任意日期范围内的发言数
+        
+        优先使用存储后端的索引查询（SQLite），其次使用发言前缀和矩阵（需要NumPy）：
+        矩阵按群组缓存并随消息增量更新，每次查询只是一次向量减法。
+        两者都不可用时返回None，由调用方逐用户计算。
+        
+        Args:
+            group_id (str): 群组ID
+            start_date (date): 开始日期（包含）
+            end_date (date): 结束日期（包含）
+            
+        Returns:
+            Optional[Dict[str, int]]: 各用户范围内的发言数，不支持时返回None
+        """
+        period_counts = await self.group_store.get_period_counts(group_id, start_date, end_date)
+        if period_counts is not None or not NUMPY_AVAILABLE:
+            return period_counts
+        
+        matrix = await self.get_activity_matrix(group_id)
+        if matrix is None:
+            return None
+        return matrix.range_counts(start_date, end_date)
+    
+    async def get_activity_matrix(self, group_id: str) -> Optional[ActivityMatrix]:
+        """获取群组的发言前缀和矩阵，不存在时构建
+        
+        Args:
+            group_id (str): 群组ID
+            
+        Returns:
+            Optional[ActivityMatrix]: 发言矩阵；NumPy不可用或群组过大时返回None
+        """
+        matrix = self._activity_matrices.get(group_id)
+        if matrix is not None:
+            self._activity_matrices.move_to_end(group_id)
+            return matrix
+        
+        # 构建期间持有群组锁，避免消息更新与线程中遍历历史记录并发
+        async with self._group_locks[group_id]:
+            users = await self.get_group_data(group_id)
+            matrix = await asyncio.to_thread(ActivityMatrix.build, users, datetime.now().date())
+            if matrix is not None:
+                self._activity_matrices[group_id] = matrix
+                while len(self._activity_matrices) > ACTIVITY_MATRIX_MAXSIZE:
+                    self._activity_matrices.popitem(last=False)
+        return matrix
     
     @safe_data_operation(default_return=[])
     async def get_all_groups(self) -> List[str]:
         """获取所有群组ID列表
         
-        扫描数据目录，返回所有已记录群组的ID列表。
+        由存储后端返回所有已记录群组的ID列表。
         
         Returns:
             List[str]: 群组ID列表
         """
-        group_files = list(self.groups_dir.glob("*.json"))
-        group_ids = [file.stem for file in group_files if file.is_file()]
-        return group_ids
+        return await self.group_store.list_group_ids()
     
     # ========== 配置管理 ==========
     
@@ -453,7 +691,7 @@ class DataManager:
             
         Raises:
             IOError: 当配置文件读取失败时抛出
-            json.JSONDecodeError: 当配置文件格式错误时抛出
+            ValueError: 当配置文件格式错误时抛出
         """
         cache_key = "plugin_config"
         
@@ -462,9 +700,9 @@ class DataManager:
             return self.config_cache[cache_key]
         
         if await asyncio.to_thread(self.config_file.exists):
-            async with aiofiles.open(self.config_file, 'r', encoding='utf-8') as f:
+            async with aiofiles.open(self.config_file, 'rb') as f:
                 content = await f.read()
-                config_data = await asyncio.to_thread(json.loads, content)
+                config_data = await asyncio.to_thread(self.config_manager.serializer.loads, content)
             
             config = PluginConfig.from_dict(config_data)
             
@@ -543,6 +781,117 @@ class DataManager:
             self.logger.error(f"更新配置时发生未知错误: {e}")
             return False
     
+    # ========== 排行榜结果缓存 ==========
+    
+    def get_group_version(self, group_id: str) -> int:
+        """获取群组数据版本号
+        
+        每次写入群组数据（消息统计、保存、标记修改、清空）时递增，
+        排行榜结果缓存把它作为缓存键的一部分，数据变化后旧结果自然失效。
+        
+        Args:
+            group_id (str): 群组ID
+            
+        Returns:
+            int: 当前版本号（进程内有效）
+        """
+        return self._group_versions.get(group_id, 0)
+    
+    def _bump_group_version(self, group_id: str):
+        """群组数据发生写入，递增版本号"""
+        self._group_versions[group_id] += 1
+    
+    def get_rank_cache_key(self, group_id: str, *parts: Any) -> str:
+        """生成排行榜结果缓存键
+        
+        Args:
+            group_id (str): 群组ID
+            *parts (Any): 排行榜类型、时间段锚点、显示人数等区分结果的参数
+            
+        Returns:
+            str: 形如 "群号:类型:...:v版本号" 的缓存键
+            
+        Example:
+            >>> dm.get_rank_cache_key("123", "daily", "2026-10-18", 20)
+            '123:daily:2026-10-18:20:v42'
+        """
+        return ":".join([group_id, *(str(part) for part in parts), f"v{self.get_group_version(group_id)}"])
+    
+    @safe_cache_operation(default_return=None)
+    async def get_cached_rank(self, cache_key: str) -> Optional[Any]:
+        """获取缓存的排行榜结果（筛选排序后的数据或文字消息）
+        
+        Args:
+            cache_key (str): get_rank_cache_key 生成的缓存键
+            
+        Returns:
+            Optional[Any]: 缓存的结果，不存在或已过期时返回None
+        """
+        return self.data_cache.get(f"rank_{cache_key}")
+    
+    @safe_cache_operation(default_return=False)
+    async def cache_rank(self, cache_key: str, value: Any) -> bool:
+        """缓存排行榜结果，随数据缓存的TTL过期
+        
+        Args:
+            cache_key (str): get_rank_cache_key 生成的缓存键
+            value (Any): 要缓存的结果
+            
+        Returns:
+            bool: 缓存是否成功
+        """
+        self.data_cache[f"rank_{cache_key}"] = value
+        return True
+    
+    def get_rank_image_path(self, cache_key: str, suffix: str = ".png") -> Path:
+        """获取排行榜缓存图片的保存路径
+        
+        文件名去掉了版本号，同一排行榜的新图片覆盖旧图片，缓存目录大小有上限。
+        
+        Args:
+            cache_key (str): get_rank_cache_key 生成的缓存键
+            suffix (str): 图片扩展名，与渲染后端输出的格式一致
+            
+        Returns:
+            Path: 缓存目录下的图片文件路径
+        """
+        stem = re.sub(r'[^0-9A-Za-z_-]', '_', re.sub(r':v\d+', '', cache_key))
+        return self.cache_dir / f"rank_{stem}{suffix}"
+    
+    async def store_rank_image(self, cache_key: str, image_path: str) -> Optional[str]:
+        """把生成的排行榜图片复制到缓存目录并登记到图片缓存
+        
+        Args:
+            cache_key (str): get_rank_cache_key 生成的缓存键
+            image_path (str): 刚生成的图片路径（临时文件，调用方负责清理）
+            
+        Returns:
+            Optional[str]: 缓存图片路径，复制失败时返回None
+        """
+        cached_path = self.get_rank_image_path(cache_key, Path(image_path).suffix or ".png")
+        try:
+            await asyncio.to_thread(shutil.copyfile, image_path, cached_path)
+        except (IOError, OSError) as e:
+            self.logger.warning(f"缓存排行榜图片失败: {e}")
+            return None
+        await self.cache_image(cache_key, str(cached_path))
+        return str(cached_path)
+    
+    def _purge_rank_images(self) -> int:
+        """删除缓存目录中的排行榜图片
+        
+        Returns:
+            int: 删除的文件数量
+        """
+        removed = 0
+        for image_file in self.cache_dir.glob("rank_*.*"):
+            try:
+                image_file.unlink()
+                removed += 1
+            except OSError as e:
+                self.logger.warning(f"删除缓存图片失败 {image_file}: {e}")
+        return removed
+    
     # ========== 缓存管理 ==========
     
     @safe_cache_operation(default_return=None)
@@ -606,7 +955,9 @@ class DataManager:
         try:
             if cache_type in ["all", "data"]:
                 self.data_cache.clear()
-                self.logger.info("数据缓存已清空")
+                # 常驻的群组状态只淘汰已落盘的部分，尚未写回的修改不能丢弃
+                evicted = self._evict_idle_groups(force=True)
+                self.logger.info(f"数据缓存已清空，释放 {evicted} 个群组的常驻数据")
             
             if cache_type in ["all", "config"]:
                 self.config_cache.clear()
@@ -617,6 +968,7 @@ class DataManager:
                 image_keys = [key for key in self.data_cache.keys() if key.startswith("image_")]
                 for key in image_keys:
                     del self.data_cache[key]
+                await asyncio.to_thread(self._purge_rank_images)
                 self.logger.info("图片缓存已清空")
                 
         except (KeyError, TypeError) as e:
@@ -651,6 +1003,9 @@ class DataManager:
             return {
                 "data_cache_size": len(self.data_cache),
                 "data_cache_maxsize": self.data_cache.maxsize,
+                "group_state_size": len(self._group_states),
+                "group_state_maxsize": GROUP_STATE_MAXSIZE,
+                "dirty_group_count": len(self._dirty_groups),
                 "config_cache_size": len(self.config_cache),
                 "config_cache_maxsize": self.config_cache.maxsize,
                 "total_cache_size": len(self.data_cache) + len(self.config_cache)
@@ -754,10 +1109,9 @@ class DataManager:
         """
         try:
             users = await self.get_group_data(group_id)
-            # 过滤掉0次发言的用户，然后按消息数降序排序
-            active_users = [user for user in users if user.message_count > 0]
-            sorted_users = sorted(active_users, key=lambda x: x.message_count, reverse=True)
-            return sorted_users[:limit]
+            # 过滤掉0次发言的用户，然后按消息数选出前limit名
+            active_users = (user for user in users if user.message_count > 0)
+            return top_k(active_users, limit, key=lambda x: x.message_count)
         except (IOError, OSError) as e:
             self.logger.error(f"获取群组 {group_id} 排行榜时文件操作失败: {e}")
             return []
@@ -966,7 +1320,8 @@ class DataManager:
     async def backup_group_data(self, group_id: str) -> Optional[Path]:
         """备份群组数据
         
-        为指定群组创建数据备份。
+        为指定群组创建数据备份。备份从常驻内存的群组状态导出（包含尚未写回的修改），
+        使用当前序列化器写成带 format_version 文件头的快照格式，JSON和SQLite后端都适用。
         
         Args:
             group_id (str): 群组ID
@@ -975,12 +1330,6 @@ class DataManager:
             Optional[Path]: 备份文件路径，失败时返回None
         """
         try:
-            source_file = self.groups_dir / f"{group_id}.json"
-            
-            if not await asyncio.to_thread(source_file.exists):
-                self.logger.warning(f"群组 {group_id} 数据文件不存在，无法备份")
-                return None
-            
             # 创建备份目录
             backup_dir = self.data_dir / "backups"
             await asyncio.to_thread(backup_dir.mkdir, exist_ok=True)
@@ -989,12 +1338,14 @@ class DataManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = backup_dir / f"{group_id}_{timestamp}.json"
             
-            # 复制文件
-            async with aiofiles.open(source_file, 'r', encoding='utf-8') as src:
-                content = await src.read()
-            
-            async with aiofiles.open(backup_file, 'w', encoding='utf-8') as dst:
-                await dst.write(content)
+            # 持有群组锁导出，避免序列化期间有新消息修改数据
+            async with self._group_locks[group_id]:
+                users = await self.get_group_data(group_id)
+                if not users:
+                    self.logger.warning(f"群组 {group_id} 没有数据，无法备份")
+                    return None
+                if not await self.group_store.export_group_data(group_id, users, backup_file):
+                    return None
             
             self.logger.info(f"群组 {group_id} 数据已备份到: {backup_file}")
             return backup_file
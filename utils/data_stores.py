@@ -5,15 +5,18 @@
 
 import json
 import asyncio
+import sqlite3
+import threading
 import aiofiles
 import aiofiles.os
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, date
 from astrbot.api import logger as astrbot_logger
 from cachetools import TTLCache
 
-from .models import UserData, PluginConfig, MessageDate
+from .models import UserData, GroupUsers, PluginConfig, MessageDate
+from .serializers import Serializer, get_serializer, DATA_FORMAT_VERSION, LEGACY_FORMAT_VERSION
 
 
 # 缓存配置常量
@@ -22,17 +25,41 @@ DATA_CACHE_TTL = 300  # 5分钟
 CONFIG_CACHE_MAXSIZE = 10
 CONFIG_CACHE_TTL = 60  # 1分钟
 
+# 消息日志配置常量
+MESSAGE_LOG_SUFFIX = ".log"  # 群组追加式消息日志文件后缀，与快照文件 <group_id>.json 并存
+MESSAGE_LOG_CHECKPOINT_EVENTS = 500  # 日志累计多少条事件后合并到快照并截断日志
+
+# 存储后端常量
+STORAGE_BACKEND_JSON = "json"  # 默认：每个群组一个JSON快照 + 追加式消息日志
+STORAGE_BACKEND_SQLITE = "sqlite"  # 可选：所有群组存放在一个SQLite数据库中
+SQLITE_DB_FILENAME = "message_stats.db"  # SQLite数据库文件名，位于数据目录下
+
 
 class GroupDataStore:
     """群组数据存储管理器
     
     专门负责群组数据（JSON文件）的增删改查和修复。
+    
+    每个群组由两部分组成：
+    - <group_id>.json: 全量快照，只在检查点时整体重写
+    - <group_id>.log: 追加式消息日志，每条消息追加一行小JSON记录
+    
+    加载时先读快照再重放日志；保存快照时记录已合并的事件序号并截断日志，
+    因此单条消息的写入开销与群组规模无关。
+    
+    文件内容通过可插拔的序列化器读写（默认orjson紧凑格式），快照头部带有
+    format_version 字段；没有该字段的旧版本带缩进文件仍可正常加载。
     """
     
-    def __init__(self, groups_dir: Path, logger=None):
+    def __init__(self, groups_dir: Path, logger=None, serializer: Optional[Serializer] = None):
         self.groups_dir = groups_dir
         self.logger = logger or astrbot_logger
+        self.serializer = serializer or get_serializer()
         # 目录创建延迟到首次使用时异步执行
+        
+        # 每个群组当前的日志事件序号，以及尚未合并到快照的事件数量
+        self._log_seq: Dict[str, int] = {}
+        self._pending_log_events: Dict[str, int] = {}
     
     async def _ensure_groups_directory(self):
         """确保群组数据目录存在"""
@@ -42,85 +69,308 @@ class GroupDataStore:
         """获取群组数据文件路径"""
         return self.groups_dir / f"{group_id}.json"
     
+    def _get_group_log_path(self, group_id: str) -> Path:
+        """获取群组消息日志文件路径"""
+        return self.groups_dir / f"{group_id}{MESSAGE_LOG_SUFFIX}"
+    
     async def load_group_data(self, group_id: str) -> List[UserData]:
-        """加载群组数据"""
+        """加载群组数据
+        
+        先读取全量快照，再重放快照之后追加的消息日志。
+        """
         # 确保目录存在
         await self._ensure_groups_directory()
         file_path = self._get_group_file_path(group_id)
         
-        if not await aiofiles.os.path.exists(file_path):
-            return []
+        users = []
+        checkpoint_seq = 0
         
-        try:
-            async with aiofiles.open(str(file_path), 'r', encoding='utf-8') as f:
-                content = await f.read()
-                data = await asyncio.to_thread(json.loads, content)
-            
-            # 转换为UserData对象列表
-            users = []
-            
-            # 处理不同的数据格式
-            if isinstance(data, list):
-                # 如果数据是列表格式，直接使用
-                user_data_list = data
-            elif isinstance(data, dict):
-                # 如果数据是字典格式，获取users字段
-                user_data_list = data.get('users', [])
-            else:
-                # 如果数据格式不正确，返回空列表
-                self.logger.warning(f"群组 {group_id} 数据格式不正确")
+        if await aiofiles.os.path.exists(file_path):
+            try:
+                async with aiofiles.open(str(file_path), 'rb') as f:
+                    content = await f.read()
+                    data = await asyncio.to_thread(self.serializer.loads, content)
+                
+                # 处理不同的数据格式
+                if isinstance(data, list):
+                    # 如果数据是列表格式，直接使用
+                    user_data_list = data
+                elif isinstance(data, dict):
+                    # 如果数据是字典格式，获取users字段
+                    user_data_list = data.get('users', [])
+                    checkpoint_seq = data.get('log_seq', 0)
+                    format_version = data.get('format_version', LEGACY_FORMAT_VERSION)
+                    if format_version > DATA_FORMAT_VERSION:
+                        self.logger.warning(
+                            f"群组 {group_id} 数据格式版本 {format_version} 高于当前支持的版本 {DATA_FORMAT_VERSION}，尝试兼容加载"
+                        )
+                else:
+                    # 如果数据格式不正确，返回空列表
+                    self.logger.warning(f"群组 {group_id} 数据格式不正确")
+                    return []
+                
+                for user_data in user_data_list:
+                    try:
+                        # 使用UserData.from_dict方法来消除逻辑重复，history延迟到首次访问时解码
+                        user = UserData.from_dict(user_data, lazy=True)
+                        users.append(user)
+                    except (ValueError, TypeError) as e:
+                        self.logger.warning(f"跳过无效的用户数据: {e}")
+                        continue
+                
+            except (IOError, json.JSONDecodeError) as e:
+                self.logger.error(f"读取群组数据失败 {group_id}: {e}")
                 return []
-            
-            for user_data in user_data_list:
-                try:
-                    # 使用UserData.from_dict方法来消除逻辑重复
-                    user = UserData.from_dict(user_data)
-                    users.append(user)
-                except (ValueError, TypeError) as e:
-                    self.logger.warning(f"跳过无效的用户数据: {e}")
-                    continue
-            
-            return users
-            
-        except (IOError, json.JSONDecodeError) as e:
-            self.logger.error(f"读取群组数据失败 {group_id}: {e}")
-            return []
+        
+        # 重放快照之后的消息日志
+        await self._replay_message_log(group_id, users, checkpoint_seq)
+        return users
     
     async def save_group_data(self, group_id: str, users: List[UserData]) -> bool:
-        """保存群组数据"""
+        """保存群组数据
+        
+        写入全量快照（检查点），成功后截断消息日志。
+        快照通过临时文件原子替换，并记录已合并的日志序号，
+        即使截断日志前进程退出，重放时也不会重复计数。
+        """
         file_path = self._get_group_file_path(group_id)
         
         try:
-            # 准备数据
-            data = {
-                'group_id': group_id,
-                'last_updated': datetime.now().isoformat(),
-                'users': [user.to_dict() for user in users]
-            }
-            
-            json_content = await asyncio.to_thread(json.dumps, data, ensure_ascii=False, indent=2)
-            async with aiofiles.open(str(file_path), 'w', encoding='utf-8') as f:
-                await f.write(json_content)
+            await self._write_snapshot(file_path, group_id, users)
             
+            # 快照已包含全部事件，截断日志
+            await self._truncate_message_log(group_id)
             return True
             
         except (IOError, OSError) as e:
             self.logger.error(f"保存群组数据失败 {group_id}: {e}")
             return False
     
+    async def _write_snapshot(self, file_path: Path, group_id: str, users: List[UserData]):
+        """把群组数据序列化为快照格式，通过临时文件原子写入 file_path"""
+        # 准备数据（format_version放在最前面，作为文件头）
+        data = {
+            'format_version': DATA_FORMAT_VERSION,
+            'group_id': group_id,
+            'last_updated': datetime.now().isoformat(),
+            'log_seq': self._log_seq.get(group_id, 0),
+            'users': [user.to_dict() for user in users]
+        }
+        
+        temp_path = file_path.with_suffix('.tmp')
+        content = await asyncio.to_thread(self.serializer.dumps, data)
+        async with aiofiles.open(str(temp_path), 'wb') as f:
+            await f.write(content)
+        await asyncio.to_thread(temp_path.replace, file_path)
+    
+    async def export_group_data(self, group_id: str, users: List[UserData], target_path: Path) -> bool:
+        """把群组数据导出为快照格式的文件（用于备份）
+        
+        导出内容与JSON后端的群组快照格式相同（带 format_version 文件头），
+        不依赖当前使用的存储后端，不截断消息日志。
+        
+        Args:
+            group_id (str): 群组ID
+            users (List[UserData]): 要导出的用户数据
+            target_path (Path): 导出文件路径
+            
+        Returns:
+            bool: 导出是否成功
+        """
+        try:
+            await self._write_snapshot(target_path, group_id, users)
+            return True
+        except (IOError, OSError) as e:
+            self.logger.error(f"导出群组数据失败 {group_id}: {e}")
+            return False
+    
     async def delete_group_data(self, group_id: str) -> bool:
-        """删除群组数据"""
+        """删除群组数据（包括快照和消息日志）"""
         file_path = self._get_group_file_path(group_id)
+        log_path = self._get_group_log_path(group_id)
         
         try:
-            if await aiofiles.os.path.exists(file_path):
-                await aiofiles.os.remove(file_path)
-                return True
-            return False
+            deleted = False
+            for path in (file_path, log_path):
+                if await aiofiles.os.path.exists(path):
+                    await aiofiles.os.remove(path)
+                    deleted = True
+            self._log_seq.pop(group_id, None)
+            self._pending_log_events.pop(group_id, None)
+            return deleted
         except OSError as e:
             self.logger.error(f"删除群组数据失败 {group_id}: {e}")
             return False
     
+    # ========== 追加式消息日志 ==========
+    
+    @staticmethod
+    def build_message_event(user_id: str, nickname: str, message_date: MessageDate, timestamp: int) -> Dict[str, Any]:
+        """构建一条消息事件记录"""
+        return {
+            'user_id': user_id,
+            'nickname': nickname,
+            'date': str(message_date),
+            'timestamp': timestamp
+        }
+    
+    @staticmethod
+    def apply_message_event(users: List[UserData], event: Dict[str, Any],
+                            users_dict: Optional[Dict[str, UserData]] = None) -> UserData:
+        """将一条消息事件应用到用户列表
+        
+        消息记录和日志重放共用此方法，保证两条路径的统计结果一致。
+        
+        Args:
+            users (List[UserData]): 群组用户列表，新用户会被追加到末尾
+            event (Dict[str, Any]): 消息事件记录
+            users_dict (Optional[Dict[str, UserData]]): 可选的 user_id 索引，会同步更新；
+                users 为 GroupUsers 时默认使用其自带索引
+            
+        Returns:
+            UserData: 被更新或新建的用户
+            
+        Raises:
+            KeyError: 当事件缺少必需字段时抛出
+            ValueError: 当日期格式错误时抛出
+        """
+        user_id = event['user_id']
+        timestamp = event['timestamp']
+        year, month, day = map(int, event['date'].split('-'))
+        message_date = MessageDate(year, month, day)
+        
+        if users_dict is None and isinstance(users, GroupUsers):
+            # 常驻群组自带 user_id 索引，append 时会自动维护
+            users_dict = users.user_index
+        
+        if users_dict is not None:
+            user = users_dict.get(user_id)
+        else:
+            user = next((u for u in users if u.user_id == user_id), None)
+        
+        if user is None:
+            # 新用户，add_message会将message_count增加到1
+            user = UserData(
+                user_id=user_id,
+                nickname=event.get('nickname') or user_id,
+                message_count=0,
+                first_message_time=timestamp
+            )
+            users.append(user)
+            if users_dict is not None:
+                users_dict[user_id] = user
+        
+        user.add_message(message_date)
+        user.last_message_time = timestamp
+        if user.first_message_time is None:
+            user.first_message_time = timestamp
+        return user
+    
+    def get_pending_event_count(self, group_id: str) -> int:
+        """获取尚未合并到快照的日志事件数量"""
+        return self._pending_log_events.get(group_id, 0)
+    
+    async def append_message_event(self, group_id: str, event: Dict[str, Any]) -> int:
+        """追加一条消息事件到群组日志
+        
+        Args:
+            group_id (str): 群组ID
+            event (Dict[str, Any]): 由 build_message_event 构建的事件
+            
+        Returns:
+            int: 追加后尚未合并到快照的事件数量，调用方据此决定是否写检查点
+            
+        Raises:
+            IOError: 当日志写入失败时抛出
+        """
+        seq = self._log_seq.get(group_id, 0) + 1
+        record = dict(event, seq=seq)
+        line = self.serializer.dumps(record) + b'\n'
+        
+        async with aiofiles.open(str(self._get_group_log_path(group_id)), 'ab') as f:
+            await f.write(line)
+        
+        self._log_seq[group_id] = seq
+        pending = self._pending_log_events.get(group_id, 0) + 1
+        self._pending_log_events[group_id] = pending
+        return pending
+    
+    async def _replay_message_log(self, group_id: str, users: List[UserData], checkpoint_seq: int) -> int:
+        """重放消息日志
+        
+        跳过序号不大于快照检查点的事件；末尾因进程中断而写了一半的行会被忽略。
+        
+        Returns:
+            int: 重放的事件数量
+        """
+        log_path = self._get_group_log_path(group_id)
+        last_seq = checkpoint_seq
+        replayed = 0
+        
+        if await aiofiles.os.path.exists(log_path):
+            try:
+                async with aiofiles.open(str(log_path), 'rb') as f:
+                    content = await f.read()
+            except (IOError, OSError) as e:
+                self.logger.error(f"读取群组消息日志失败 {group_id}: {e}")
+                content = b""
+            
+            users_dict = {user.user_id: user for user in users}
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    event = self.serializer.loads(line)
+                    seq = int(event.get('seq', 0))
+                    if seq <= checkpoint_seq:
+                        continue
+                    self.apply_message_event(users, event, users_dict)
+                    last_seq = max(last_seq, seq)
+                    replayed += 1
+                except (json.JSONDecodeError, KeyError, ValueError, TypeError, AttributeError) as e:
+                    self.logger.warning(f"跳过无效的消息日志记录 {group_id}: {e}")
+                    continue
+            
+            # 补齐被中断的末行，避免后续追加的记录与其拼接成一行
+            if content and not content.endswith(b'\n'):
+                try:
+                    async with aiofiles.open(str(log_path), 'ab') as f:
+                        await f.write(b'\n')
+                except (IOError, OSError) as e:
+                    self.logger.warning(f"修复群组消息日志末行失败 {group_id}: {e}")
+
+            if replayed:
+                self.logger.info(f"群组 {group_id} 已重放 {replayed} 条消息日志")
+        
+        self._log_seq[group_id] = last_seq
+        self._pending_log_events[group_id] = replayed
+        return replayed
+    
+    async def _truncate_message_log(self, group_id: str):
+        """截断群组消息日志（快照写入成功后调用）"""
+        log_path = self._get_group_log_path(group_id)
+        if await aiofiles.os.path.exists(log_path):
+            async with aiofiles.open(str(log_path), 'wb') as f:
+                await f.write(b'')
+        self._pending_log_events[group_id] = 0
+    
+    async def list_group_ids(self) -> List[str]:
+        """列出所有已存储的群组ID"""
+        # 尚未写过检查点的新群组只有消息日志文件
+        group_files = list(self.groups_dir.glob("*.json")) + list(self.groups_dir.glob(f"*{MESSAGE_LOG_SUFFIX}"))
+        return list(dict.fromkeys(file.stem for file in group_files if file.is_file()))
+    
+    async def get_period_counts(self, group_id: str, start_date: date, end_date: date) -> Optional[Dict[str, int]]:
+        """按用户汇总指定日期范围内的发言数
+        
+        JSON存储没有索引，返回None表示由调用方在内存中计算。
+        """
+        return None
+    
+    async def close(self):
+        """释放存储资源（JSON存储无需处理）"""
+        return None
+    
     async def repair_corrupted_json(self, group_id: str) -> bool:
         """修复损坏的JSON文件"""
         file_path = self._get_group_file_path(group_id)
@@ -130,17 +380,17 @@ class GroupDataStore:
         
         try:
             # 读取文件内容
-            async with aiofiles.open(str(file_path), 'r', encoding='utf-8') as f:
+            async with aiofiles.open(str(file_path), 'rb') as f:
                 content = await f.read()
             
             # 尝试解析JSON
             try:
-                await asyncio.to_thread(json.loads, content)
+                await asyncio.to_thread(self.serializer.loads, content)
                 return True  # 文件正常
             except json.JSONDecodeError:
                 # 文件损坏，创建备份
                 backup_path = file_path.with_suffix('.json.backup')
-                async with aiofiles.open(str(backup_path), 'w', encoding='utf-8') as f:
+                async with aiofiles.open(str(backup_path), 'wb') as f:
                     await f.write(content)
                 
                 # 创建新的空数据文件
@@ -153,15 +403,363 @@ class GroupDataStore:
             return False
 
 
+class SQLiteGroupDataStore(GroupDataStore):
+    """SQLite群组数据存储
+    
+    GroupDataStore 的替代实现，所有群组存放在同一个SQLite数据库中：
+    - users: 用户资料和Rbot字段，主键 (group_id, user_id)
+    - daily_counts: 按天聚合的发言数，主键 (group_id, user_id, day)，
+      另有 (group_id, day, user_id, count) 覆盖索引用于时间段排行榜
+    
+    每条消息只执行一次UPSERT事务，不再重写整个群组；日/周/月排行榜
+    通过索引上的 GROUP BY 范围查询完成。滚动周期计数（today_count 等）
+    与 UserData 一样在UPSERT中增量维护，加载时不需要从日计数重建。首次访问某个群组时，
+    若数据库中没有该群组而存在旧的JSON数据，会自动迁移。
+    """
+    
+    # users表中除 group_id 外的列，顺序与 _user_to_row 一致
+    _USER_COLUMNS = (
+        "user_id", "nickname", "message_count", "last_date", "first_message_time",
+        "last_message_time", "cultivation", "experience", "spirit_stones", "points",
+        "last_sign_date", "total_sign_days", "today_count", "week_count", "month_count", "period_anchor"
+    )
+    
+    # 后来加入的列及其定义，旧数据库打开时通过 ALTER TABLE 补齐
+    _ADDED_USER_COLUMNS = (
+        ("today_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("week_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("month_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("period_anchor", "TEXT")
+    )
+    
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            group_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            nickname TEXT NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            last_date TEXT,
+            first_message_time INTEGER,
+            last_message_time INTEGER,
+            cultivation INTEGER NOT NULL DEFAULT 0,
+            experience INTEGER NOT NULL DEFAULT 0,
+            spirit_stones INTEGER NOT NULL DEFAULT 0,
+            points INTEGER NOT NULL DEFAULT 0,
+            last_sign_date TEXT,
+            total_sign_days INTEGER NOT NULL DEFAULT 0,
+            today_count INTEGER NOT NULL DEFAULT 0,
+            week_count INTEGER NOT NULL DEFAULT 0,
+            month_count INTEGER NOT NULL DEFAULT 0,
+            period_anchor TEXT,
+            PRIMARY KEY (group_id, user_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS daily_counts (
+            group_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (group_id, user_id, day)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_daily_counts_group_day
+            ON daily_counts (group_id, day, user_id, count);
+    """
+    
+    def __init__(self, groups_dir: Path, db_path: Path, logger=None):
+        super().__init__(groups_dir, logger)
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite3连接在线程池中使用，需要串行化访问
+        self._db_lock = threading.Lock()
+        # 每个群组中已与数据库同步的用户发言数，用于保存时只重写变化用户的日计数
+        self._synced_counts: Dict[str, Dict[str, int]] = {}
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取数据库连接（首次调用时创建并初始化表结构）"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self._SCHEMA)
+            self._migrate_schema(conn)
+            self._conn = conn
+        return self._conn
+    
+    def _migrate_schema(self, conn: sqlite3.Connection):
+        """为旧数据库补齐后来加入的列"""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+        with conn:
+            for column, definition in self._ADDED_USER_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+    
+    async def _run(self, func, *args):
+        """在线程池中串行执行数据库操作"""
+        def _locked():
+            with self._db_lock:
+                return func(self._get_connection(), *args)
+        return await asyncio.to_thread(_locked)
+    
+    @staticmethod
+    def _user_to_row(group_id: str, user: UserData) -> tuple:
+        """将UserData转换为users表的一行"""
+        return (
+            group_id, user.user_id, user.nickname, user.message_count, user.last_date,
+            user.first_message_time, user.last_message_time, user.cultivation, user.experience,
+            user.spirit_stones, user.points, user.last_sign_date, user.total_sign_days,
+            user.today_count, user.week_count, user.month_count, user.period_anchor
+        )
+    
+    # ---------- 同步数据库操作（在线程池中执行） ----------
+    
+    def _load_sync(self, conn: sqlite3.Connection, group_id: str) -> List[UserData]:
+        columns = ", ".join(self._USER_COLUMNS)
+        rows = conn.execute(f"SELECT {columns} FROM users WHERE group_id = ?", (group_id,)).fetchall()
+        users = [UserData(**dict(zip(self._USER_COLUMNS, row))) for row in rows]
+        users_dict = {user.user_id: user for user in users}
+        
+        for user_id, day, count in conn.execute(
+            "SELECT user_id, day, count FROM daily_counts WHERE group_id = ?", (group_id,)
+        ):
+            user = users_dict.get(user_id)
+            if user is not None:
+                user.history[day] = count
+        
+        # 旧数据库的行没有周期计数，从日计数重建一次并写回，之后由UPSERT增量维护
+        backfill = []
+        for user in users:
+            if user.period_anchor is None and user.history:
+                user.get_period_counts()  # 锚点缺失时从历史重建
+                backfill.append((user.today_count, user.week_count, user.month_count,
+                                 user.period_anchor, group_id, user.user_id))
+        if backfill:
+            with conn:
+                conn.executemany(
+                    "UPDATE users SET today_count = ?, week_count = ?, month_count = ?, period_anchor = ? "
+                    "WHERE group_id = ? AND user_id = ?", backfill
+                )
+        return users
+    
+    def _save_sync(self, conn: sqlite3.Connection, group_id: str, users: List[UserData],
+                   synced: Dict[str, int]) -> Dict[str, int]:
+        placeholders = ", ".join("?" for _ in range(len(self._USER_COLUMNS) + 1))
+        updates = ", ".join(f"{col} = excluded.{col}" for col in self._USER_COLUMNS[1:])
+        current_ids = {user.user_id for user in users}
+        new_synced = {}
+        
+        with conn:
+            existing_ids = {row[0] for row in conn.execute(
+                "SELECT user_id FROM users WHERE group_id = ?", (group_id,)
+            )}
+            removed = [(group_id, user_id) for user_id in existing_ids - current_ids]
+            if removed:
+                conn.executemany("DELETE FROM users WHERE group_id = ? AND user_id = ?", removed)
+                conn.executemany("DELETE FROM daily_counts WHERE group_id = ? AND user_id = ?", removed)
+            
+            conn.executemany(
+                f"INSERT INTO users (group_id, {', '.join(self._USER_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(group_id, user_id) DO UPDATE SET {updates}",
+                [self._user_to_row(group_id, user) for user in users]
+            )
+            
+            # 只有发言数与数据库不一致的用户（导入、迁移等）才重写日计数
+            for user in users:
+                if synced.get(user.user_id) != user.message_count:
+                    conn.execute(
+                        "DELETE FROM daily_counts WHERE group_id = ? AND user_id = ?",
+                        (group_id, user.user_id)
+                    )
+                    conn.executemany(
+                        "INSERT INTO daily_counts (group_id, user_id, day, count) VALUES (?, ?, ?, ?)",
+                        [(group_id, user.user_id, day, count) for day, count in user.history.items()]
+                    )
+                new_synced[user.user_id] = user.message_count
+        return new_synced
+    
+    # 与 UserData._count_period_message 相同的规则：同一周期累加，新周期重置为1并前移锚点，
+    # 早于锚点的补录发言只计入与锚点同周期的计数。周以周一开始
+    _PERIOD_UPSERT = (
+        "today_count = CASE WHEN period_anchor IS NULL THEN 1 "
+        "WHEN period_anchor = excluded.period_anchor THEN today_count + 1 "
+        "WHEN excluded.period_anchor > period_anchor THEN 1 ELSE today_count END, "
+        "week_count = CASE WHEN period_anchor IS NULL THEN 1 "
+        "WHEN date(period_anchor, '-6 days', 'weekday 1') = date(excluded.period_anchor, '-6 days', 'weekday 1') "
+        "THEN week_count + 1 "
+        "WHEN excluded.period_anchor > period_anchor THEN 1 ELSE week_count END, "
+        "month_count = CASE WHEN period_anchor IS NULL THEN 1 "
+        "WHEN substr(period_anchor, 1, 7) = substr(excluded.period_anchor, 1, 7) THEN month_count + 1 "
+        "WHEN excluded.period_anchor > period_anchor THEN 1 ELSE month_count END, "
+        "period_anchor = CASE WHEN period_anchor IS NULL OR excluded.period_anchor > period_anchor "
+        "THEN excluded.period_anchor ELSE period_anchor END"
+    )
+    
+    def _append_sync(self, conn: sqlite3.Connection, group_id: str, event: Dict[str, Any]):
+        year, month, day = map(int, event['date'].split('-'))
+        message_day = date(year, month, day)
+        timestamp = event['timestamp']
+        
+        with conn:
+            conn.execute(
+                "INSERT INTO users (group_id, user_id, nickname, message_count, last_date, "
+                "first_message_time, last_message_time, today_count, week_count, month_count, period_anchor) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?, 1, 1, 1, ?) "
+                "ON CONFLICT(group_id, user_id) DO UPDATE SET "
+                "message_count = message_count + 1, last_date = excluded.last_date, "
+                "last_message_time = excluded.last_message_time, "
+                "first_message_time = COALESCE(first_message_time, excluded.first_message_time), "
+                + self._PERIOD_UPSERT,
+                (group_id, event['user_id'], event.get('nickname') or event['user_id'],
+                 event['date'], timestamp, timestamp, message_day.isoformat())
+            )
+            conn.execute(
+                "INSERT INTO daily_counts (group_id, user_id, day, count) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(group_id, user_id, day) DO UPDATE SET count = count + 1",
+                (group_id, event['user_id'], message_day.toordinal())
+            )
+    
+    def _delete_sync(self, conn: sqlite3.Connection, group_id: str) -> bool:
+        with conn:
+            deleted = conn.execute("DELETE FROM users WHERE group_id = ?", (group_id,)).rowcount
+            conn.execute("DELETE FROM daily_counts WHERE group_id = ?", (group_id,))
+        return deleted > 0
+    
+    # ---------- GroupDataStore 接口 ----------
+    
+    async def load_group_data(self, group_id: str) -> List[UserData]:
+        """加载群组数据，数据库中没有该群组时尝试从旧的JSON数据迁移"""
+        try:
+            users = await self._run(self._load_sync, group_id)
+        except sqlite3.Error as e:
+            self.logger.error(f"读取群组数据失败 {group_id}: {e}")
+            return []
+        
+        if not users:
+            # 首次切换到SQLite时，从JSON快照和消息日志迁移
+            legacy_users = await super().load_group_data(group_id)
+            if legacy_users:
+                self._synced_counts[group_id] = {}
+                if await self.save_group_data(group_id, legacy_users):
+                    self.logger.info(f"群组 {group_id} 已从JSON迁移到SQLite，共 {len(legacy_users)} 个用户")
+                return legacy_users
+        
+        self._synced_counts[group_id] = {user.user_id: user.message_count for user in users}
+        return users
+    
+    async def save_group_data(self, group_id: str, users: List[UserData]) -> bool:
+        """在一个事务中保存群组数据"""
+        synced = self._synced_counts.get(group_id, {})
+        try:
+            self._synced_counts[group_id] = await self._run(self._save_sync, group_id, users, synced)
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"保存群组数据失败 {group_id}: {e}")
+            return False
+    
+    async def delete_group_data(self, group_id: str) -> bool:
+        """删除群组数据（同时清理残留的JSON文件，避免被再次迁移）"""
+        try:
+            deleted = await self._run(self._delete_sync, group_id)
+        except sqlite3.Error as e:
+            self.logger.error(f"删除群组数据失败 {group_id}: {e}")
+            return False
+        self._synced_counts.pop(group_id, None)
+        legacy_deleted = await super().delete_group_data(group_id)
+        return deleted or legacy_deleted
+    
+    async def append_message_event(self, group_id: str, event: Dict[str, Any]) -> int:
+        """以一次UPSERT事务记录一条消息
+        
+        Returns:
+            int: 始终为0，数据已直接落库，无需检查点
+            
+        Raises:
+            IOError: 当数据库写入失败时抛出
+        """
+        try:
+            await self._run(self._append_sync, group_id, event)
+        except sqlite3.Error as e:
+            raise IOError(f"写入消息记录失败: {e}") from e
+        
+        synced = self._synced_counts.setdefault(group_id, {})
+        synced[event['user_id']] = synced.get(event['user_id'], 0) + 1
+        return 0
+    
+    def get_pending_event_count(self, group_id: str) -> int:
+        """SQLite存储没有待合并的日志事件"""
+        return 0
+    
+    async def list_group_ids(self) -> List[str]:
+        """列出数据库中的群组以及尚未迁移的JSON群组"""
+        def _query(conn):
+            return [row[0] for row in conn.execute("SELECT DISTINCT group_id FROM users")]
+        
+        try:
+            group_ids = await self._run(_query)
+        except sqlite3.Error as e:
+            self.logger.error(f"读取群组列表失败: {e}")
+            group_ids = []
+        return list(dict.fromkeys(group_ids + await super().list_group_ids()))
+    
+    async def get_period_counts(self, group_id: str, start_date: date, end_date: date) -> Optional[Dict[str, int]]:
+        """通过覆盖索引上的范围查询汇总各用户在日期范围内的发言数"""
+        def _query(conn):
+            return dict(conn.execute(
+                "SELECT user_id, SUM(count) FROM daily_counts "
+                "WHERE group_id = ? AND day BETWEEN ? AND ? GROUP BY user_id",
+                (group_id, start_date.toordinal(), end_date.toordinal())
+            ).fetchall())
+        
+        try:
+            return await self._run(_query)
+        except sqlite3.Error as e:
+            self.logger.error(f"查询群组 {group_id} 时间段发言数失败: {e}")
+            return None
+    
+    async def close(self):
+        """关闭数据库连接"""
+        def _close():
+            with self._db_lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+        await asyncio.to_thread(_close)
+    
+    async def repair_corrupted_json(self, group_id: str) -> bool:
+        """检查数据库完整性，损坏时备份数据库文件并重建
+        
+        方法名沿用 GroupDataStore 的接口。
+        """
+        def _check(conn):
+            return conn.execute("PRAGMA integrity_check").fetchone()[0]
+        
+        try:
+            if await self._run(_check) == "ok":
+                return True
+        except sqlite3.DatabaseError as e:
+            self.logger.warning(f"SQLite数据库完整性检查失败: {e}")
+        
+        try:
+            await self.close()
+            backup_path = self.db_path.with_suffix('.db.backup')
+            await asyncio.to_thread(self.db_path.replace, backup_path)
+            self._synced_counts.clear()
+            self.logger.warning(f"已重建损坏的SQLite数据库，备份保存至 {backup_path}")
+            return True
+        except OSError as e:
+            self.logger.error(f"修复SQLite数据库失败: {e}")
+            return False
+
+
 class ConfigManager:
     """配置管理器
     
-    专门负责 config.json 的读写。
+    专门负责 config.json 的读写。配置文件需要手工编辑，因此保留缩进输出。
     """
     
-    def __init__(self, config_file: Path, logger=None):
+    def __init__(self, config_file: Path, logger=None, serializer: Optional[Serializer] = None):
         self.config_file = config_file
         self.logger = logger or astrbot_logger
+        self.serializer = serializer or get_serializer()
         # 目录创建延迟到首次使用时异步执行
     
     async def _ensure_config_directory(self):
@@ -179,9 +777,9 @@ class ConfigManager:
             return default_config
         
         try:
-            async with aiofiles.open(str(self.config_file), 'r', encoding='utf-8') as f:
+            async with aiofiles.open(str(self.config_file), 'rb') as f:
                 content = await f.read()
-                data = await asyncio.to_thread(json.loads, content)
+                data = await asyncio.to_thread(self.serializer.loads, content)
             
             # 转换为PluginConfig对象
             return PluginConfig.from_dict(data)
@@ -196,9 +794,9 @@ class ConfigManager:
         try:
             data = config.to_dict()
             
-            json_content = await asyncio.to_thread(json.dumps, data, ensure_ascii=False, indent=2)
-            async with aiofiles.open(str(self.config_file), 'w', encoding='utf-8') as f:
-                await f.write(json_content)
+            content = await asyncio.to_thread(self.serializer.dumps, data, True)
+            async with aiofiles.open(str(self.config_file), 'wb') as f:
+                await f.write(content)
             
             return True
             
@@ -0,0 +1,221 @@
+"""
+群组元数据模块
+
+排行榜标题需要群名称。原来命令每次都调用 event.get_group 或 get_group_info，
+定时推送则读取并解析整个群组数据文件寻找群名字段（而 save_group_data 从不写入该字段），
+最后仍然要调用API。
+
+GroupMetadataStore 把所有群的元数据（群名称、成员数、上次刷新时间）保存在一个小索引文件中：
+- 启动时加载一次，之后按群ID直接查询内存字典
+- 元数据超过有效期后继续使用，同时在后台刷新；只有从未获取过的群才等待API
+- 同一个群同时只有一个刷新任务，两次刷新至少间隔 GROUP_METADATA_MIN_INTERVAL
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiofiles
+
+from astrbot.api import logger as astrbot_logger
+
+from .serializers import get_serializer
+
+GROUP_METADATA_TTL = 6 * 60 * 60  # 元数据有效期（秒），过期后在后台刷新
+GROUP_METADATA_MIN_INTERVAL = 5 * 60  # 同一个群两次调用 get_group_info 的最小间隔（秒）
+GROUP_METADATA_FILENAME = "group_metadata.json"
+
+# 获取群信息的协程函数，返回平台 get_group_info 的结果字典
+GroupInfoFetcher = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class GroupMetadataStore:
+    """群组元数据索引
+
+    Attributes:
+        index_file (Path): 索引文件路径
+        ttl (float): 元数据有效期（秒）
+
+    Example:
+        >>> store = GroupMetadataStore(data_dir / "group_metadata.json")
+        >>> await store.load()
+        >>> name = await store.get_group_name(group_id, lambda: fetch_group_info(group_id))
+    """
+
+    def __init__(self, index_file, ttl: float = GROUP_METADATA_TTL, logger=None):
+        self.index_file = Path(index_file)
+        self.ttl = ttl
+        self.logger = logger or astrbot_logger
+        self._serializer = get_serializer()
+
+        # group_id -> {"group_name": ..., "member_count": ..., "refreshed_at": 时间戳}
+        self._groups: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._last_attempt: Dict[str, float] = {}
+        self._save_lock = asyncio.Lock()
+
+        self._refreshes = 0
+        self._refresh_failures = 0
+
+    async def load(self):
+        """从索引文件加载全部群组元数据，文件不存在或损坏时从空索引开始"""
+        try:
+            async with aiofiles.open(self.index_file, "rb") as f:
+                data = self._serializer.loads(await f.read())
+            loaded = {str(group_id): dict(entry) for group_id, entry in data.items()}
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.logger.warning(f"读取群组元数据索引失败，将重新获取: {e}")
+            return
+        # 加载前已刷新的群保留新数据
+        loaded.update(self._groups)
+        self._groups = loaded
+
+    # ========== 读取 ==========
+
+    def get(self, group_id: str) -> Optional[Dict[str, Any]]:
+        """查询群组元数据，不触发刷新
+
+        Returns:
+            Optional[Dict[str, Any]]: 包含 group_name、member_count、refreshed_at，未记录时返回None
+        """
+        return self._groups.get(str(group_id))
+
+    def is_stale(self, group_id: str) -> bool:
+        """元数据不存在或已超过有效期"""
+        entry = self._groups.get(str(group_id))
+        return entry is None or time.time() - entry.get("refreshed_at", 0.0) >= self.ttl
+
+    async def get_group_name(self, group_id: str, fetcher: Optional[GroupInfoFetcher] = None) -> str:
+        """获取群名称
+
+        已有记录时直接返回（过期则在后台刷新）；从未记录的群等待一次刷新。
+
+        Args:
+            group_id (str): 群组ID
+            fetcher (Optional[GroupInfoFetcher]): 需要刷新时调用，获取群信息
+
+        Returns:
+            str: 群名称，获取失败时返回 "群<group_id>"
+        """
+        group_id = str(group_id)
+        entry = self._groups.get(group_id)
+        if entry is None:
+            task = self.refresh(group_id, fetcher)
+            if task is not None:
+                await task
+                entry = self._groups.get(group_id)
+        elif self.is_stale(group_id):
+            self.refresh(group_id, fetcher)
+
+        if entry and entry.get("group_name"):
+            return entry["group_name"]
+        return f"群{group_id}"
+
+    # ========== 刷新 ==========
+
+    def refresh(self, group_id: str, fetcher: Optional[GroupInfoFetcher],
+                force: bool = False) -> Optional[asyncio.Task]:
+        """在后台刷新群组元数据
+
+        Args:
+            group_id (str): 群组ID
+            fetcher (Optional[GroupInfoFetcher]): 获取群信息的协程函数，为None时不刷新
+            force (bool): 为True时忽略最小刷新间隔
+
+        Returns:
+            Optional[asyncio.Task]: 刷新任务（已有进行中的任务时返回该任务），未安排刷新时返回None
+        """
+        group_id = str(group_id)
+        task = self._inflight.get(group_id)
+        if task is not None:
+            return task
+        if fetcher is None:
+            return None
+        if not force and time.time() - self._last_attempt.get(group_id, 0.0) < GROUP_METADATA_MIN_INTERVAL:
+            return None
+
+        self._last_attempt[group_id] = time.time()
+        task = asyncio.create_task(self._refresh(group_id, fetcher))
+        self._inflight[group_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(group_id, None))
+        return task
+
+    async def _refresh(self, group_id: str, fetcher: GroupInfoFetcher) -> bool:
+        """获取群信息并写入索引"""
+        try:
+            info = await fetcher()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._refresh_failures += 1
+            self.logger.warning(f"获取群组 {group_id} 信息失败: {e}")
+            return False
+
+        group_name = None
+        member_count = None
+        if isinstance(info, dict):
+            group_name = info.get("group_name") or info.get("group_title") or info.get("name")
+            member_count = info.get("member_count")
+        if not group_name and member_count is None:
+            self._refresh_failures += 1
+            return False
+
+        await self.update(group_id, group_name=group_name, member_count=member_count)
+        self._refreshes += 1
+        return True
+
+    async def update(self, group_id: str, group_name: Optional[str] = None,
+                     member_count: Optional[int] = None):
+        """更新群组元数据并写入索引文件，未提供的字段保留原值
+
+        Args:
+            group_id (str): 群组ID
+            group_name (Optional[str]): 群名称
+            member_count (Optional[int]): 群成员数
+        """
+        group_id = str(group_id)
+        entry = self._groups.get(group_id) or {"group_name": "", "member_count": 0}
+        if group_name:
+            entry["group_name"] = str(group_name).strip()
+        if member_count is not None:
+            try:
+                entry["member_count"] = int(member_count)
+            except (TypeError, ValueError):
+                pass
+        entry["refreshed_at"] = time.time()
+        self._groups[group_id] = entry
+        await self._save()
+
+    async def _save(self):
+        """原子写入索引文件"""
+        async with self._save_lock:
+            temp_path = self.index_file.with_suffix(".tmp")
+            try:
+                async with aiofiles.open(temp_path, "wb") as f:
+                    await f.write(self._serializer.dumps(self._groups))
+                os.replace(temp_path, self.index_file)
+            except OSError as e:
+                self.logger.warning(f"写入群组元数据索引失败: {e}")
+
+    # ========== 管理 ==========
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取索引统计信息"""
+        return {
+            'groups': len(self._groups),
+            'refreshing': len(self._inflight),
+            'refreshes': self._refreshes,
+            'refresh_failures': self._refresh_failures
+        }
+
+    async def close(self):
+        """取消进行中的刷新任务"""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
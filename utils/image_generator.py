@@ -5,47 +5,125 @@
 
 import asyncio
 import aiofiles
+import html  # 用于HTML转义安全防护
+import importlib.util
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Union
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Union
 from datetime import datetime
 import tempfile
 import os
 import traceback
 import hashlib
 import json
+import re
 import uuid
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 
 
 from astrbot.api import logger as astrbot_logger
 
+from .models import UserData, GroupInfo, PluginConfig
+from .exception_handlers import safe_generation, safe_file_operation
+from .pillow_renderer import PillowRankRenderer, PIL_AVAILABLE
+from .avatar_cache import (
+    AvatarCache, AVATAR_URL_PATTERN, AVATAR_PLACEHOLDER_SVG,
+    AVATAR_PLACEHOLDER_CONTENT_TYPE, guess_image_type
+)
+from .render_worker import RenderWorkerClient
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page
+
 # 常量定义
 IMAGE_WIDTH = 1200
 VIEWPORT_HEIGHT = 1
 BROWSER_TIMEOUT = 10000  # 毫秒
 DEFAULT_FONT_SIZE = 14
 ROW_HEIGHT = 30
+DEFAULT_RENDER_POOL_SIZE = 2  # 默认预热的浏览器页面数量，同时也是并发渲染上限
+MAX_RENDER_POOL_SIZE = 8  # 页面池大小上限，避免占用过多内存
+RENDER_STATS_WINDOW = 100  # 渲染耗时统计保留最近多少次
+RENDER_READY_TIMEOUT = 5000  # 等待页面就绪的最长时间（毫秒），超时后直接截图
+# 页面就绪判定：字体加载完成，且所有图片（头像）都已加载完成或加载失败（img.complete 对失败的图片同样为true）。
+# 由Playwright在页面中求值，不受模板Content-Security-Policy对内联脚本的限制
+RENDER_READY_PREDICATE = """() => (!document.fonts || document.fonts.status === 'loaded')
+    && Array.prototype.every.call(document.images, (img) => img.complete)"""
 
-# Jinja2模板引擎
-try:
-    from jinja2 import Template, Environment, select_autoescape, FileSystemLoader
-    import html  # 用于HTML转义安全防护
-    JINJA2_AVAILABLE = True
-except ImportError:
-    JINJA2_AVAILABLE = False
-    astrbot_logger.warning("Jinja2未安装，将使用不安全的字符串拼接方式")
+# 常驻模板页面：样式占位符，以及每次渲染通过 page.evaluate 执行的数据更新函数。
+# 只使用textContent写入文字，不拼接HTML，不需要额外转义
+CLIENT_TEMPLATE_STYLE_PLACEHOLDER = "/*RANK_STYLES*/"
+CLIENT_RENDER_SCRIPT = """(data) => {
+    document.getElementById('group-info').textContent = data.group_label;
+    document.getElementById('title').textContent = data.title;
+    document.getElementById('total-messages').textContent = '总发言数：' + data.total_messages + ' 条';
+    document.getElementById('current-time').textContent = '生成时间: ' + data.current_time;
 
-try:
-    from playwright.async_api import async_playwright, Browser, Page
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
-    astrbot_logger.warning("Playwright未安装，图片生成功能将不可用")
+    const template = document.getElementById('user-item-template').content.firstElementChild;
+    const rows = data.user_items.map((item) => {
+        const row = template.cloneNode(true);
+        row.className = item.is_current_user ? 'user-item-current' : 'user-item';
+        if (item.is_separator) {
+            row.style.cssText = 'margin-top: 20px; border-top: 2px dashed #bdc3c7;';
+        }
+        row.querySelector('.rank-number').textContent = '#' + item.rank;
+        row.querySelector('.avatar').src = item.avatar_url;
+        row.querySelector('.nickname').textContent = item.nickname;
+        row.querySelector('.date').textContent = '最近发言: ' + item.last_date;
+        row.querySelector('.count').textContent = item.total + ' 次';
+        row.querySelector('.percentage').textContent = '(' + item.percentage.toFixed(2) + '%)';
+        return row;
+    });
+    document.getElementById('rank-card').replaceChildren(...rows);
+}"""
 
-from .models import UserData, GroupInfo, PluginConfig
-from .exception_handlers import safe_generation, safe_file_operation
+# 渲染后端
+RENDER_BACKEND_PLAYWRIGHT = "playwright"  # 默认：Chromium渲染HTML模板，效果最完整
+RENDER_BACKEND_PILLOW = "pillow"  # 可选：Pillow直接绘制，不需要浏览器
+
+# Jinja2和Playwright导入耗时较长，模块加载时只检查是否安装（不输出日志），首次使用时才导入；
+# 未安装的警告由实际使用它们的代码输出
+JINJA2_AVAILABLE = importlib.util.find_spec("jinja2") is not None
+Template = Environment = select_autoescape = FileSystemLoader = None
 
+PLAYWRIGHT_AVAILABLE = importlib.util.find_spec("playwright") is not None
+async_playwright = None
+PlaywrightTimeoutError = TimeoutError  # 导入Playwright后替换为其超时异常
 
 
+def _load_jinja2() -> bool:
+    """导入Jinja2，返回是否可用"""
+    global JINJA2_AVAILABLE, Template, Environment, select_autoescape, FileSystemLoader
+    if Environment is not None:
+        return True
+    if not JINJA2_AVAILABLE:
+        return False
+    try:
+        from jinja2 import Template, Environment, select_autoescape, FileSystemLoader
+    except ImportError as e:
+        JINJA2_AVAILABLE = False
+        astrbot_logger.warning(f"Jinja2导入失败，将使用不安全的字符串拼接方式: {e}")
+        return False
+    return True
+
+
+def _load_playwright() -> bool:
+    """导入Playwright，返回是否可用"""
+    global PLAYWRIGHT_AVAILABLE, async_playwright, PlaywrightTimeoutError
+    if async_playwright is not None:
+        return True
+    if not PLAYWRIGHT_AVAILABLE:
+        return False
+    try:
+        from playwright.async_api import async_playwright
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    except ImportError as e:
+        PLAYWRIGHT_AVAILABLE = False
+        astrbot_logger.warning(f"Playwright导入失败，图片生成功能将不可用: {e}")
+        return False
+    return True
+
 
 class ImageGenerationError(Exception):
     """图片生成异常
@@ -78,16 +156,24 @@ class ImageGenerator:
     Attributes:
         config (PluginConfig): 插件配置对象，包含生成参数
         browser (Optional[Browser]): Playwright浏览器实例
-        page (Optional[Page]): Playwright页面实例
+        page (Optional[Page]): 兼容保留的页面属性，渲染改用页面池，不再使用
         playwright: Playwright实例
         logger: 日志记录器
         width (int): 图片宽度，默认1200像素
         timeout (int): 页面加载超时时间，默认10秒
         viewport_height (int): 视口高度，默认1像素
+        pool_size (int): 页面池大小，即同时渲染的最大数量
+        avatar_cache (Optional[AvatarCache]): 本地头像缓存，提供时头像请求由缓存响应，不访问外部网络
+        render_backend (str): 渲染后端，"playwright"（默认）或 "pillow"
+        persistent_render_page (bool): 是否使用常驻模板页面，每次渲染只推送数据而不重新加载整个HTML
+        pillow_renderer (Optional[PillowRankRenderer]): Pillow渲染器，使用Pillow后端时创建
+        render_worker (Optional[RenderWorkerClient]): 独立渲染进程客户端，启用后本实例只负责转发渲染任务
         template_path (Path): HTML模板文件路径
-        jinja_env (Optional[Environment]): Jinja2环境对象
+        jinja_env (Optional[Environment]): Jinja2环境对象，首次访问时创建，Jinja2不可用时为None
         _template_cache (Dict): 模板缓存字典
         _cache_lock (Lock): 缓存锁，确保线程安全
+        _idle_pages (deque): 空闲的预热页面，每个页面独占一个浏览器上下文
+        _render_semaphore (Semaphore): 限制同时渲染的数量不超过 pool_size
         
     Example:
         >>> generator = ImageGenerator(config)
@@ -95,15 +181,24 @@ class ImageGenerator:
         >>> image_path = await generator.generate_rank_image(users, group_info, "排行榜")
     """
     
-    def __init__(self, config: PluginConfig):
+    def __init__(self, config: PluginConfig, avatar_cache: Optional[AvatarCache] = None):
         """初始化图片生成器
         
         Args:
             config (PluginConfig): 插件配置对象，包含生成参数和设置
+            avatar_cache (Optional[AvatarCache]): 本地头像缓存，为None时由浏览器直接下载头像
         """
         self.config = config
-        self.browser: Optional[Browser] = None
-        self.page: Optional[Page] = None
+        self.avatar_cache = avatar_cache
+        self.render_backend = getattr(config, "render_backend", RENDER_BACKEND_PLAYWRIGHT)
+        self.pillow_renderer: Optional[PillowRankRenderer] = None
+        # 在共享排行榜图片上追加请求者行使用的Pillow渲染器，首次使用时创建；False表示不可用
+        self._row_renderer = None
+        self.persistent_render_page = bool(getattr(config, "persistent_render_page", False))
+        self.render_worker_enabled = bool(getattr(config, "render_worker_enabled", False))
+        self.render_worker: Optional[RenderWorkerClient] = None
+        self.browser: Optional["Browser"] = None
+        self.page: Optional["Page"] = None
         self.playwright = None
         self.logger = astrbot_logger
         
@@ -112,8 +207,26 @@ class ImageGenerator:
         self.timeout = BROWSER_TIMEOUT
         self.viewport_height = VIEWPORT_HEIGHT
         
+        # 页面池：预热的上下文和页面在多次渲染之间复用，信号量限制并发渲染数量
+        pool_size = getattr(config, "render_pool_size", DEFAULT_RENDER_POOL_SIZE)
+        self.pool_size = max(1, min(int(pool_size), MAX_RENDER_POOL_SIZE))
+        self._idle_pages: deque = deque()
+        self._render_semaphore = asyncio.Semaphore(self.pool_size)
+        self._init_lock = asyncio.Lock()
+        
+        # 渲染耗时统计
+        self._render_times: deque = deque(maxlen=RENDER_STATS_WINDOW)
+        self._render_count = 0
+        self._render_failures = 0
+        self._ready_wait_times: deque = deque(maxlen=RENDER_STATS_WINDOW)
+        self._ready_timeouts = 0
+        
         # 模板路径
         self.template_path = Path(__file__).parent.parent / "templates" / "rank_template.html"
+        self.client_template_path = Path(__file__).parent.parent / "templates" / "rank_client_template.html"
+        
+        # 已加载常驻模板的页面
+        self._template_pages: set = set()
         
         # 模板缓存机制
         self._template_cache: Dict[str, Any] = {}
@@ -121,45 +234,34 @@ class ImageGenerator:
         self._cache_hits = 0
         self._cache_misses = 0
         
-        # Jinja2环境将在initialize方法中初始化
-        self.jinja_env = None
-    
-
+        # Jinja2环境在首次访问 jinja_env 时创建，与使用哪种渲染后端无关
+        self._jinja_env = None
+        self._jinja_env_checked = False
     
-    async def _init_jinja2_env(self):
-        """初始化Jinja2环境
-        
-        创建Jinja2模板环境，启用自动转义以防止XSS攻击。
-        如果Jinja2不可用，将使用不安全的字符串拼接方式作为备用。
-        添加模板缓存机制以提高性能。
+    @property
+    def jinja_env(self) -> Optional["Environment"]:
+        """Jinja2环境，首次访问时导入Jinja2并创建
         
-        Returns:
-            None: 无返回值，初始化结果通过日志输出
-            
-        Example:
-            >>> await self._init_jinja2_env()
-            # 将初始化Jinja2环境或记录警告信息
+        启用自动转义以防止XSS攻击；Jinja2不可用时返回None，
+        调用方使用不安全的字符串拼接方式作为备用。
         """
-        if JINJA2_AVAILABLE:
+        if self._jinja_env is None and not self._jinja_env_checked:
+            self._jinja_env_checked = True
+            if not _load_jinja2():
+                self.logger.warning("Jinja2不可用，将使用不安全的字符串拼接")
+                return None
             try:
                 # 创建Jinja2环境，启用自动转义和缓存，但不启用异步
-                self.jinja_env = Environment(
+                self._jinja_env = Environment(
                     autoescape=select_autoescape(['html', 'xml']),
                     trim_blocks=True,
                     lstrip_blocks=True,
                     cache_size=400  # 启用模板缓存，但不启用异步
                 )
-                
-                # 预加载模板文件
-                await self._preload_templates()
-                
                 self.logger.info("Jinja2环境初始化成功，模板缓存已启用")
             except Exception as e:
                 self.logger.error(f"Jinja2环境初始化失败: {e}")
-                self.jinja_env = None
-        else:
-            self.jinja_env = None
-            self.logger.warning("Jinja2不可用，将使用不安全的字符串拼接")
+        return self._jinja_env
     
     async def _preload_templates(self):
         """预加载模板文件到缓存"""
@@ -223,6 +325,13 @@ class ImageGenerator:
                 'hit_rate': self._cache_hits / max(1, self._cache_hits + self._cache_misses)
             }
     
+    @property
+    def is_available(self) -> bool:
+        """是否可以生成图片（浏览器已启动、使用Pillow渲染或渲染进程正在运行）"""
+        if self.render_worker is not None:
+            return self.render_worker.is_running
+        return self.browser is not None or self.pillow_renderer is not None
+    
     @safe_generation(default_return=None)
     async def initialize(self):
         """初始化图片生成器
@@ -243,15 +352,61 @@ class ImageGenerator:
             >>> print(generator.browser is not None)
             True
         """
-        if not PLAYWRIGHT_AVAILABLE:
+        if self.render_worker_enabled:
+            async with self._init_lock:
+                if self.render_worker is not None:
+                    return
+                if await self._start_render_worker():
+                    return
+            self.logger.warning("渲染进程启动失败，回退到在当前进程中渲染")
+            self.render_worker_enabled = False
+        
+        if self.render_backend == RENDER_BACKEND_PILLOW:
+            if PIL_AVAILABLE:
+                # Pillow后端不需要启动浏览器
+                self.pillow_renderer = PillowRankRenderer(
+                    self.avatar_cache, getattr(self.config, "pillow_font_path", "") or None, self.logger
+                )
+                self.logger.info("图片生成器初始化完成（Pillow渲染）")
+                return
+            self.logger.warning("Pillow未安装，回退到Playwright渲染")
+        
+        if not _load_playwright():
             self.logger.error("Playwright未安装，图片生成功能将不可用")
             raise ImageGenerationError("Playwright未安装，无法生成图片")
         
+        async with self._init_lock:
+            # 并发渲染可能同时触发初始化，只启动一次浏览器
+            if self.browser:
+                return
+            await self._launch_browser()
+    
+    async def _start_render_worker(self) -> bool:
+        """启动独立渲染进程，浏览器和头像缓存都在渲染进程中创建"""
+        avatar_options = None
+        if self.avatar_cache:
+            avatar_options = {
+                'cache_dir': str(self.avatar_cache.cache_dir),
+                'ttl': self.avatar_cache.ttl,
+                'max_bytes': self.avatar_cache.max_bytes
+            }
+        
+        worker = RenderWorkerClient(self.config, avatar_options, self.logger)
+        if not await worker.start():
+            await worker.stop()
+            return False
+        
+        self.render_worker = worker
+        self.logger.info("图片生成器初始化完成（独立渲染进程）")
+        return True
+    
+    async def _launch_browser(self):
+        """启动Playwright浏览器并预热页面池"""
         try:
             self.logger.info("开始初始化图片生成器...")
             
-            # 首先初始化Jinja2环境
-            await self._init_jinja2_env()
+            # 预加载模板文件（首次访问时创建Jinja2环境）
+            await self._preload_templates()
             
             self.playwright = await async_playwright().start()
             self.logger.info("Playwright启动成功")
@@ -270,6 +425,8 @@ class ImageGenerator:
             )
             self.logger.info("Chromium浏览器启动成功")
             
+            await self._warm_up_page_pool()
+            
             self.logger.info("图片生成器初始化完成")
         except FileNotFoundError as e:
             self.logger.error(f"浏览器可执行文件未找到: {e}")
@@ -314,10 +471,18 @@ class ImageGenerator:
             True
         """
         try:
+            if self.render_worker:
+                await self.render_worker.stop()
+                self.render_worker = None
+            
             if self.page:
                 await self.page.close()
                 self.page = None
             
+            # 关闭页面池中的空闲页面及其上下文，正在使用的页面随浏览器一起关闭
+            while self._idle_pages:
+                await self._discard_page(self._idle_pages.popleft())
+            
             if self.browser:
                 await self.browser.close()
                 self.browser = None
@@ -333,45 +498,245 @@ class ImageGenerator:
         except Exception as e:
             self.logger.error(f"清理图片生成器资源失败: {e}")
     
+    # ========== 页面池 ==========
+    
+    async def _create_pooled_page(self) -> "Page":
+        """创建一个独立浏览器上下文中的页面
+        
+        每个页面使用独立的上下文，并发渲染之间不会共享Cookie、缓存和页面状态。
+        """
+        context = await self.browser.new_context(
+            viewport={"width": self.width, "height": self.viewport_height}
+        )
+        if self.avatar_cache:
+            # 头像请求由本地缓存响应，渲染不等待外部网络
+            await context.route(AVATAR_URL_PATTERN, self._serve_avatar)
+        page = await context.new_page()
+        page.set_default_timeout(self.timeout)
+        return page
+    
+    async def _serve_avatar(self, route):
+        """用本地缓存响应头像请求，未命中时返回占位头像并在后台下载"""
+        user_id = AvatarCache.user_id_from_url(route.request.url)
+        data = await self.avatar_cache.get(user_id) if user_id else None
+        if data:
+            await route.fulfill(status=200, body=data, content_type=guess_image_type(data))
+        else:
+            await route.fulfill(status=200, body=AVATAR_PLACEHOLDER_SVG, content_type=AVATAR_PLACEHOLDER_CONTENT_TYPE)
+    
+    async def _discard_page(self, page: "Page"):
+        """关闭页面及其所属的浏览器上下文"""
+        self._template_pages.discard(page)
+        try:
+            await page.context.close()
+        except Exception as e:
+            self.logger.debug(f"关闭渲染页面失败: {e}")
+    
+    async def _warm_up_page_pool(self):
+        """预热页面池，启动时创建 pool_size 个页面"""
+        for _ in range(self.pool_size - len(self._idle_pages)):
+            self._idle_pages.append(await self._create_pooled_page())
+        self.logger.info(f"渲染页面池已预热: {len(self._idle_pages)} 个页面")
+    
+    async def _reset_page(self, page: "Page"):
+        """重置页面以便复用：恢复初始视口，非常驻模板页面同时清空文档"""
+        if page not in self._template_pages:
+            await page.goto("about:blank")
+        await page.set_viewport_size({"width": self.width, "height": self.viewport_height})
+    
+    @asynccontextmanager
+    async def _acquire_page(self):
+        """从页面池借出一个页面，使用完毕后重置并归还
+        
+        信号量保证同时借出的页面不超过 pool_size 个；渲染出错的页面直接关闭，
+        下次借出时按需补充新页面，避免把状态异常的页面放回池中。
+        
+        Example:
+            >>> async with self._acquire_page() as page:
+            ...     await page.set_content(html_content)
+        """
+        async with self._render_semaphore:
+            page = self._idle_pages.popleft() if self._idle_pages else None
+            if page is None or page.is_closed():
+                page = await self._create_pooled_page()
+            
+            reusable = False
+            try:
+                yield page
+                await self._reset_page(page)
+                reusable = True
+            finally:
+                if reusable and self.browser:
+                    self._idle_pages.append(page)
+                else:
+                    await self._discard_page(page)
+    
+    def _record_render(self, elapsed: float, success: bool):
+        """记录一次渲染的耗时"""
+        self._render_count += 1
+        if success:
+            self._render_times.append(elapsed)
+        else:
+            self._render_failures += 1
+    
+    def get_render_stats(self) -> Dict[str, Any]:
+        """获取渲染耗时统计
+        
+        Returns:
+            Dict[str, Any]: 页面池状态、最近 RENDER_STATS_WINDOW 次成功渲染的耗时（毫秒），
+                以及等待页面就绪的平均耗时和超时次数
+        """
+        times = sorted(self._render_times)
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))] if times else 0
+        ready_waits = self._ready_wait_times
+        return {
+            'pool_size': self.pool_size,
+            'idle_pages': len(self._idle_pages),
+            'total_renders': self._render_count,
+            'failed_renders': self._render_failures,
+            'avg_ms': round(sum(times) / len(times) * 1000, 1) if times else 0,
+            'p95_ms': round(p95 * 1000, 1),
+            'max_ms': round(times[-1] * 1000, 1) if times else 0,
+            'avg_ready_wait_ms': round(sum(ready_waits) / len(ready_waits) * 1000, 1) if ready_waits else 0,
+            'ready_timeouts': self._ready_timeouts
+        }
+    
+    # ========== 常驻模板页面 ==========
+    
+    async def _get_client_template(self) -> str:
+        """获取常驻模板页面的HTML
+        
+        样式从 rank_template.html 的<style>中提取，修改排行榜样式只需要改一处。
+        """
+        async with self._cache_lock:
+            cached = self._template_cache.get('client_template')
+        if cached:
+            return cached['content']
+        
+        styles = ""
+        try:
+            async with aiofiles.open(self.template_path, 'r', encoding='utf-8') as f:
+                rank_template = await f.read()
+            match = re.search(r"<style[^>]*>(.*?)</style>", rank_template, re.S)
+            if match:
+                styles = re.sub(r"{%-?\s*(end)?raw\s*-?%}", "", match.group(1))
+        except (FileNotFoundError, PermissionError, UnicodeDecodeError) as e:
+            self.logger.warning(f"读取排行榜模板样式失败，常驻模板页面将不带样式: {e}")
+        
+        async with aiofiles.open(self.client_template_path, 'r', encoding='utf-8') as f:
+            content = (await f.read()).replace(CLIENT_TEMPLATE_STYLE_PLACEHOLDER, styles)
+        
+        async with self._cache_lock:
+            self._template_cache['client_template'] = {'content': content, 'template': None}
+        return content
+    
+    def _build_client_payload(self, users: List[UserData], group_info: GroupInfo, title: str,
+                              current_user_id: Optional[str]) -> Dict[str, Any]:
+        """生成推送给常驻模板页面的数据，字段与 rank_template.html 使用的模板变量一致"""
+        processed_data = self._process_user_data_batch(users, current_user_id)
+        group_id = str(group_info.group_id)
+        group_name = group_info.group_name if group_info.group_name and group_info.group_name != group_id else f"群{group_id}"
+        return {
+            'group_label': f"{group_name}[{group_id}]",
+            'title': title,
+            'total_messages': processed_data['total_messages'],
+            'current_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'user_items': processed_data['user_items']
+        }
+    
+    async def _render_on_template_page(self, page: "Page", payload: Dict[str, Any]):
+        """在常驻模板页面上更新数据，页面首次使用时加载模板
+        
+        模板的HTML和CSS每个页面只解析一次，之后每次渲染只替换文字和用户行。
+        """
+        if page not in self._template_pages:
+            await page.set_content(await self._get_client_template(), wait_until="domcontentloaded")
+            self._template_pages.add(page)
+        await page.evaluate(CLIENT_RENDER_SCRIPT, payload)
+    
+    # ========== 页面就绪 ==========
+    
+    async def _wait_until_ready(self, page: "Page"):
+        """等待页面就绪，超过 RENDER_READY_TIMEOUT 后不再等待
+        
+        超时通常是个别头像加载过慢，此时直接截图，未加载的头像显示为空白。
+        """
+        started = time.perf_counter()
+        try:
+            await page.wait_for_function(RENDER_READY_PREDICATE, timeout=RENDER_READY_TIMEOUT, polling="raf")
+        except PlaywrightTimeoutError:
+            self._ready_timeouts += 1
+            self.logger.warning(f"等待排行榜页面就绪超时({RENDER_READY_TIMEOUT}ms)，部分头像可能未加载")
+        finally:
+            self._ready_wait_times.append(time.perf_counter() - started)
+    
     @safe_generation(default_return=None)
     async def generate_rank_image(self, 
                                  users: List[UserData], 
                                  group_info: GroupInfo, 
                                  title: str,
                                  current_user_id: Optional[str] = None) -> str:
-        """生成排行榜图片"""
-        if not self.browser:
+        """生成排行榜图片
+        
+        Playwright后端从页面池借出预热好的页面进行渲染，不同群组的请求可以并行生成，
+        同时渲染的数量受 pool_size 限制；Pillow后端直接在线程中绘制。
+        启用独立渲染进程时只把数据发给渲染进程，由渲染进程完成以上工作。
+        """
+        if not self.is_available:
             await self.initialize()
         
-        temp_path = None
+        if self.render_worker:
+            # 渲染进程异常退出时由客户端自动重启，这里只转发任务
+            return await self.render_worker.render(users, group_info, title, current_user_id)
+        
+        started = time.perf_counter()
+        success = False
+        
+        if self.avatar_cache:
+            # 提前在后台下载缺失的头像，本次渲染未下载完成的使用占位头像
+            self.avatar_cache.prefetch(user.user_id for user in users)
         
         try:
-            # 创建页面
-            self.page = await self.browser.new_page()
-            
-            # 设置视口
-            await self.page.set_viewport_size({"width": self.width, "height": self.viewport_height})
-            
-            # 生成HTML内容
-            html_content = await self._generate_html(users, group_info, title, current_user_id)
-            
-            # 设置页面内容
-            await self.page.set_content(html_content, wait_until="networkidle")
-            
-            # 等待页面加载完成
-            await self.page.wait_for_timeout(2000)
+            if self.pillow_renderer:
+                processed_data = self._process_user_data_batch(users, current_user_id)
+                temp_path = await self.pillow_renderer.render(
+                    processed_data['user_items'], group_info, title, processed_data['total_messages']
+                )
+                success = True
+                return temp_path
             
-            # 动态调整页面高度
-            body_height = await self.page.evaluate("document.body.scrollHeight")
-            await self.page.set_viewport_size({"width": self.width, "height": body_height})
+            # 常驻模板页面只推送数据；没有数据时使用完整HTML的空榜模板
+            use_template_page = self.persistent_render_page and bool(users)
             
-            # 生成临时文件路径（异步方式）
-            temp_filename = f"rank_image_{uuid.uuid4().hex}.png"
-            temp_path = Path(tempfile.gettempdir()) / temp_filename
+            # 生成HTML内容或页面数据（不占用页面）
+            if use_template_page:
+                payload = self._build_client_payload(users, group_info, title, current_user_id)
+            else:
+                html_content = await self._generate_html(users, group_info, title, current_user_id)
             
-            # 截图
-            await self.page.screenshot(path=temp_path, full_page=True)
+            async with self._acquire_page() as page:
+                if use_template_page:
+                    await self._render_on_template_page(page, payload)
+                else:
+                    # 设置页面内容，DOM解析完成即返回，字体和头像由就绪判定等待
+                    self._template_pages.discard(page)
+                    await page.set_content(html_content, wait_until="domcontentloaded")
+                
+                # 等待字体和头像加载完成（或失败）
+                await self._wait_until_ready(page)
+                
+                # 动态调整页面高度
+                body_height = await page.evaluate("document.body.scrollHeight")
+                await page.set_viewport_size({"width": self.width, "height": body_height})
+                
+                # 生成临时文件路径（异步方式）
+                temp_filename = f"rank_image_{uuid.uuid4().hex}.png"
+                temp_path = Path(tempfile.gettempdir()) / temp_filename
+                
+                # 截图
+                await page.screenshot(path=temp_path, full_page=True)
             
+            success = True
             return str(temp_path)
         
         except FileNotFoundError as e:
@@ -390,13 +755,62 @@ class ImageGenerator:
             raise ImageGenerationError(f"生成图片失败: {e}")
         
         finally:
-            if self.page:
-                await self.page.close()
-                self.page = None
+            elapsed = time.perf_counter() - started
+            self._record_render(elapsed, success)
+            self.logger.debug(f"排行榜图片渲染{'完成' if success else '失败'}，耗时 {elapsed * 1000:.0f}ms")
             
             # 注意：不在这里删除临时文件，让调用方负责清理
             # 以避免在返回路径后立即删除文件的问题
     
+    async def append_user_row(self, image_path: str, user: UserData, rank: int,
+                              total_messages: int, top_messages: int) -> Optional[str]:
+        """在共享的排行榜图片底部追加榜外用户的行
+        
+        排行榜图片按榜单共享、不高亮任何人；榜外的请求者用虚线分隔、高亮的一行追加在图片底部，
+        与原先按用户渲染时的样式一致，只需绘制一行而不必重新渲染整张图片。
+        追加行始终用Pillow绘制，与图片使用的渲染后端无关。
+        
+        Args:
+            image_path (str): 共享的排行榜图片，不会被修改
+            user (UserData): 请求者，display_total 为时间段内的发言数
+            rank (int): 请求者在完整排名中的名次
+            total_messages (int): 榜单的发言总数，用于计算占比
+            top_messages (int): 榜首的发言数，用于归一化占比条
+            
+        Returns:
+            Optional[str]: 新的临时图片路径，由调用方清理；Pillow不可用或绘制失败时返回None
+        """
+        if self._row_renderer is None:
+            self._row_renderer = self.pillow_renderer or False
+            if not self._row_renderer and PIL_AVAILABLE:
+                try:
+                    self._row_renderer = PillowRankRenderer(
+                        self.avatar_cache, getattr(self.config, "pillow_font_path", "") or None, self.logger
+                    )
+                except ImportError as e:
+                    self.logger.warning(f"Pillow不可用，榜外用户名次将以文字显示: {e}")
+        if not self._row_renderer:
+            return None
+        
+        user_messages = getattr(user, 'display_total', user.message_count)
+        item = {
+            'rank': rank,
+            'nickname': user.nickname,
+            'avatar_url': self._get_avatar_url(user.user_id, "qq"),
+            'total': user_messages,
+            'percentage': (user_messages / total_messages * 100) if total_messages > 0 else 0,
+            'last_date': user.last_date or "未知",
+            'is_current_user': True,
+            'is_separator': True,
+            'user_id': user.user_id
+        }
+        max_percentage = (top_messages / total_messages * 100) if total_messages > 0 else 0
+        try:
+            return await self._row_renderer.append_rows(str(image_path), [item], max_percentage)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"追加榜外用户行失败: {e}")
+            return None
+    
     @safe_generation(default_return="")
     async def _generate_html(self, 
                       users: List[UserData], 
@@ -460,7 +874,8 @@ class ImageGenerator:
                 'percentage': (user_messages / total_messages * 100) if total_messages > 0 else 0,
                 'last_date': user.last_date or "未知",
                 'is_current_user': is_current_user,
-                'is_separator': False
+                'is_separator': False,
+                'user_id': user.user_id
             })
         
         # 如果当前用户不在排行榜中，添加到末尾
@@ -478,7 +893,8 @@ class ImageGenerator:
                     'percentage': (current_user_messages / total_messages * 100) if total_messages > 0 else 0,
                     'last_date': current_user_data.last_date or "未知",
                     'is_current_user': True,
-                    'is_separator': True
+                    'is_separator': True,
+                    'user_id': current_user_data.user_id
                 })
         
         return {
@@ -1291,9 +1707,13 @@ class ImageGenerator:
         
         return {
             'cache_stats': cache_stats,
+            'render_stats': self.get_render_stats(),
+            'avatar_cache_stats': self.avatar_cache.get_stats() if self.avatar_cache else None,
+            'render_worker_stats': self.render_worker.get_stats() if self.render_worker else None,
             'cached_templates': list(self._template_cache.keys()),
             'jinja2_enabled': JINJA2_AVAILABLE and self.jinja_env is not None,
             'playwright_enabled': PLAYWRIGHT_AVAILABLE,
+            'render_backend': RENDER_BACKEND_PILLOW if self.pillow_renderer else RENDER_BACKEND_PLAYWRIGHT,
             'template_path': str(self.template_path),
             'template_exists': await aiofiles.os.path.exists(self.template_path) if self.template_path else False
         }
@@ -1316,6 +1736,9 @@ class ImageGenerator:
                 async with aiofiles.open(macro_path, 'r', encoding='utf-8') as f:
                     macro_content = await f.read()
                 
+                if not _load_jinja2():
+                    return None
+                
                 # 创建环境并加载宏模板
                 env = Environment(
                     loader=FileSystemLoader(str(macro_path.parent)),
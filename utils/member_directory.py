@@ -0,0 +1,306 @@
+"""
+群成员目录模块
+
+记录发言时需要成员的群名片或昵称。原来昵称缓存未命中时直接调用 get_group_member_list，
+大群一次返回上千个成员，消息记录要等它返回；列表只保存在内存中，重启后全部失效。
+
+MemberDirectory 把每个群的成员列表（只保留ID、群名片和昵称）保存到本地磁盘：
+- 查询只读内存和本地文件，从不等待平台API
+- 列表超过有效期后继续使用，同时在后台刷新（stale-while-revalidate）
+- 同一个群同时只有一个刷新任务，刷新失败或查不到新成员时，
+  距上次刷新不足 MEMBER_REFRESH_MIN_INTERVAL 不再重复拉取
+- 入群、退群和群名片变更通知直接修改目录中的单个成员；收到过通知的群
+  改用 MEMBER_DIRECTORY_NOTICE_TTL，只在很长的间隔后才重新拉取完整列表
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import aiofiles
+
+from astrbot.api import logger as astrbot_logger
+
+from .serializers import get_serializer
+
+MEMBER_DIRECTORY_TTL = 30 * 60  # 成员列表有效期（秒），过期后在后台刷新
+MEMBER_DIRECTORY_NOTICE_TTL = 24 * 60 * 60  # 收到过成员变动通知的群的成员列表有效期（秒）
+MEMBER_REFRESH_MIN_INTERVAL = 60  # 同一个群两次拉取成员列表的最小间隔（秒）
+MEMBER_FILE_SUFFIX = ".json"
+
+# 合法的群ID（同时作为文件名）
+_GROUP_ID_PATTERN = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+
+# 拉取群成员列表的协程函数，返回平台API的成员字典列表
+MemberFetcher = Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+class MemberDirectory:
+    """持久化的群成员目录
+
+    Attributes:
+        directory_dir (Path): 存放成员列表的目录，每个群一个 <group_id>.json 文件
+        ttl (float): 成员列表有效期（秒）
+        notice_ttl (float): 收到过成员变动通知的群的成员列表有效期（秒）
+
+    Example:
+        >>> directory = MemberDirectory(data_dir / "cache" / "members")
+        >>> member = await directory.get_member(group_id, user_id, lambda: fetch_members(group_id))
+        >>> name = (member["card"] or member["nickname"]) if member else None
+    """
+
+    def __init__(self, directory_dir, ttl: float = MEMBER_DIRECTORY_TTL,
+                 notice_ttl: float = MEMBER_DIRECTORY_NOTICE_TTL, logger=None):
+        self.directory_dir = Path(directory_dir)
+        self.ttl = ttl
+        self.notice_ttl = notice_ttl
+        self.logger = logger or astrbot_logger
+        self._serializer = get_serializer()
+
+        # group_id -> {"members": {user_id: {"card": ..., "nickname": ...}}, "fetched_at": 时间戳}
+        self._groups: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._last_attempt: Dict[str, float] = {}
+        # 同一个群的写入串行执行，后台刷新和成员变动通知共用同一个临时文件
+        self._save_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # 收到过成员变动通知的群，目录由通知保持最新
+        self._notice_groups: set = set()
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._patches = 0
+
+        self.directory_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, group_id: str) -> Path:
+        return self.directory_dir / f"{group_id}{MEMBER_FILE_SUFFIX}"
+
+    # ========== 读取 ==========
+
+    async def _load_group(self, group_id: str) -> Dict[str, Any]:
+        """返回群的成员列表，首次访问时从磁盘加载，没有文件时返回空列表"""
+        entry = self._groups.get(group_id)
+        if entry is not None:
+            return entry
+
+        entry = {"members": {}, "fetched_at": 0.0}
+        if _GROUP_ID_PATTERN.match(group_id):
+            try:
+                async with aiofiles.open(self._path(group_id), "rb") as f:
+                    data = self._serializer.loads(await f.read())
+                entry = {"members": dict(data["members"]), "fetched_at": float(data["fetched_at"])}
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.logger.warning(f"读取群 {group_id} 成员目录失败，将重新拉取: {e}")
+
+        # 并发加载同一个群时保留先完成的结果
+        return self._groups.setdefault(group_id, entry)
+
+    async def get_member(self, group_id: str, user_id: str,
+                         fetcher: Optional[MemberFetcher] = None) -> Optional[Dict[str, str]]:
+        """查询群成员，不等待平台API
+
+        列表已过期时返回旧数据并在后台刷新；查不到成员时也安排刷新（可能是新成员）。
+
+        Args:
+            group_id (str): 群组ID
+            user_id (str): 用户ID
+            fetcher (Optional[MemberFetcher]): 需要刷新时调用，拉取完整的成员列表
+
+        Returns:
+            Optional[Dict[str, str]]: 包含 card 和 nickname 的成员信息，不在目录中时返回None
+        """
+        group_id, user_id = str(group_id), str(user_id)
+        entry = await self._load_group(group_id)
+        member = entry["members"].get(user_id)
+
+        if member is None:
+            self._misses += 1
+            self.refresh(group_id, fetcher)
+            return None
+
+        self._hits += 1
+        if time.time() - entry["fetched_at"] >= self._ttl_for(group_id):
+            self._stale_hits += 1
+            self.refresh(group_id, fetcher)
+        return member
+
+    def _ttl_for(self, group_id: str) -> float:
+        return self.notice_ttl if group_id in self._notice_groups else self.ttl
+
+    async def get_members(self, group_id: str) -> Dict[str, Dict[str, str]]:
+        """获取群的全部成员（user_id -> 成员信息），不触发刷新"""
+        entry = await self._load_group(str(group_id))
+        return entry["members"]
+
+    # ========== 刷新 ==========
+
+    def refresh(self, group_id: str, fetcher: Optional[MemberFetcher],
+                force: bool = False) -> Optional[asyncio.Task]:
+        """在后台刷新群成员列表
+
+        Args:
+            group_id (str): 群组ID
+            fetcher (Optional[MemberFetcher]): 拉取成员列表的协程函数，为None时不刷新
+            force (bool): 为True时忽略最小刷新间隔
+
+        Returns:
+            Optional[asyncio.Task]: 刷新任务（已有进行中的任务时返回该任务），未安排刷新时返回None
+        """
+        group_id = str(group_id)
+        task = self._inflight.get(group_id)
+        if task is not None:
+            return task
+        if fetcher is None:
+            return None
+        if not force and time.time() - self._last_attempt.get(group_id, 0.0) < MEMBER_REFRESH_MIN_INTERVAL:
+            return None
+
+        self._last_attempt[group_id] = time.time()
+        task = asyncio.create_task(self._refresh(group_id, fetcher))
+        self._inflight[group_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(group_id, None))
+        return task
+
+    async def _refresh(self, group_id: str, fetcher: MemberFetcher) -> bool:
+        """拉取成员列表并写入目录"""
+        try:
+            members = await fetcher()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._refresh_failures += 1
+            self.logger.warning(f"刷新群 {group_id} 成员目录失败: {e}")
+            return False
+
+        if not members:
+            self._refresh_failures += 1
+            return False
+
+        await self.update_members(group_id, members)
+        self._refreshes += 1
+        return True
+
+    async def update_members(self, group_id: str, members: Iterable[Dict[str, Any]]):
+        """用完整的成员列表替换目录并写入磁盘
+
+        Args:
+            group_id (str): 群组ID
+            members (Iterable[Dict[str, Any]]): 平台API返回的成员信息，需包含 user_id
+        """
+        group_id = str(group_id)
+        compact = {}
+        for member in members:
+            user_id = member.get("user_id")
+            if user_id:
+                compact[str(user_id)] = {
+                    "card": member.get("card") or "",
+                    "nickname": member.get("nickname") or ""
+                }
+
+        entry = {"members": compact, "fetched_at": time.time()}
+        self._groups[group_id] = entry
+        await self._save(group_id, entry)
+
+    # ========== 成员变动通知 ==========
+
+    async def upsert_member(self, group_id: str, user_id: str,
+                            card: Optional[str] = None, nickname: Optional[str] = None):
+        """新增或修改单个成员，不改变列表的拉取时间
+
+        Args:
+            group_id (str): 群组ID
+            user_id (str): 用户ID
+            card (Optional[str]): 新的群名片，为None时保留原值
+            nickname (Optional[str]): 新的昵称，为None时保留原值
+        """
+        group_id, user_id = str(group_id), str(user_id)
+        entry = await self._load_group(group_id)
+        member = entry["members"].setdefault(user_id, {"card": "", "nickname": ""})
+        if card is not None:
+            member["card"] = card
+        if nickname is not None:
+            member["nickname"] = nickname
+        self._notice_groups.add(group_id)
+        self._patches += 1
+        await self._save(group_id, entry)
+
+    async def remove_member(self, group_id: str, user_id: str) -> bool:
+        """删除单个成员，返回成员是否在目录中"""
+        group_id, user_id = str(group_id), str(user_id)
+        entry = await self._load_group(group_id)
+        self._notice_groups.add(group_id)
+        if entry["members"].pop(user_id, None) is None:
+            return False
+        self._patches += 1
+        await self._save(group_id, entry)
+        return True
+
+    def drop_group(self, group_id: str):
+        """删除整个群的成员目录（机器人退出或被移出群时使用）"""
+        group_id = str(group_id)
+        self._groups.pop(group_id, None)
+        self._last_attempt.pop(group_id, None)
+        self._notice_groups.discard(group_id)
+        if _GROUP_ID_PATTERN.match(group_id):
+            try:
+                self._path(group_id).unlink()
+            except OSError:
+                pass
+
+    async def _save(self, group_id: str, entry: Dict[str, Any]):
+        """原子写入群成员文件"""
+        if not _GROUP_ID_PATTERN.match(group_id):
+            return
+        path = self._path(group_id)
+        temp_path = path.with_suffix(".tmp")
+        async with self._save_locks[group_id]:
+            try:
+                async with aiofiles.open(temp_path, "wb") as f:
+                    await f.write(self._serializer.dumps(entry))
+                os.replace(temp_path, path)
+            except OSError as e:
+                self.logger.warning(f"写入群 {group_id} 成员目录失败: {e}")
+
+    # ========== 管理 ==========
+
+    def clear(self):
+        """清空内存和磁盘上的全部成员目录"""
+        self._groups.clear()
+        self._last_attempt.clear()
+        self._notice_groups.clear()
+        for path in self.directory_dir.glob(f"*{MEMBER_FILE_SUFFIX}"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取目录统计信息"""
+        return {
+            'groups': len(self._groups),
+            'members': sum(len(entry["members"]) for entry in self._groups.values()),
+            'hits': self._hits,
+            'stale_hits': self._stale_hits,
+            'misses': self._misses,
+            'refreshing': len(self._inflight),
+            'refreshes': self._refreshes,
+            'refresh_failures': self._refresh_failures,
+            'patches': self._patches
+        }
+
+    async def close(self):
+        """取消进行中的刷新任务"""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
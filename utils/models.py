@@ -8,6 +8,7 @@
 - date_utils: 日期时间处理工具
 """
 
+from collections import Counter
 from dataclasses import dataclass, field
 from datetime import datetime, date
 from typing import List, Optional, Dict, Any
@@ -33,6 +34,7 @@ class RankType(Enum):
         DAILY (str): 日排行榜，仅包含当日发言统计
         WEEKLY (str): 周排行榜，仅包含本周发言统计
         MONTHLY (str): 月排行榜，仅包含本月发言统计
+        CUSTOM (str): 自定义日期范围排行榜，如 #发言榜 2026-09-01 2026-09-30
         
     Example:
         >>> rank_type = RankType.TOTAL
@@ -43,6 +45,7 @@ class RankType(Enum):
     DAILY = "daily"
     WEEKLY = "weekly"
     MONTHLY = "monthly"
+    CUSTOM = "custom"
 
 
 @dataclass
@@ -175,7 +178,8 @@ class UserData:
         user_id (str): 用户唯一标识符
         nickname (str): 用户昵称
         message_count (int): 总发言次数，默认为0
-        history (List[MessageDate]): 发言日期历史记录列表
+        history (Dict[int, int]): 按天聚合的发言历史，键为日期序号(date.toordinal())，值为当天发言次数。
+            以 lazy 模式加载时保留原始数据，首次访问才解码
         last_date (Optional[str]): 最后发言日期的字符串表示
         first_message_time (Optional[int]): 首次发言时间戳
         last_message_time (Optional[int]): 最后发言时间戳
@@ -186,11 +190,18 @@ class UserData:
         points (int): 积分数量，默认为0
         last_sign_date (Optional[str]): 最后签到日期，用于防止重复签到
         total_sign_days (int): 总签到天数，默认为0
+        # 滚动周期计数（随add_message增量维护）
+        today_count (int): period_anchor 当天的发言数
+        week_count (int): period_anchor 所在周（周一开始）的发言数
+        month_count (int): period_anchor 所在月的发言数
+        period_anchor (Optional[str]): 周期计数所属的日期（最近一次计入的发言日期）
         
     Methods:
         add_message(): 添加新的消息记录
         get_last_message_date(): 获取最后发言日期
         get_message_count_in_period(): 获取指定时间段内的发言数量
+        get_period_count(): 获取今日/本周/本月发言数（O(1)，不扫描历史）
+        get_period_counts(): 一次取出今日、本周、本月发言数
         to_dict(): 转换为字典格式
         from_dict(): 从字典创建实例
         sign_today(): 执行今日签到
@@ -205,7 +216,6 @@ class UserData:
     user_id: str
     nickname: str
     message_count: int = 0
-    history: List[MessageDate] = field(default_factory=list)
     last_date: Optional[str] = None
     first_message_time: Optional[int] = None
     last_message_time: Optional[int] = None
@@ -216,12 +226,69 @@ class UserData:
     points: int = 0  # 积分数量
     last_sign_date: Optional[str] = None  # 最后签到日期
     total_sign_days: int = 0  # 总签到天数
+    # 滚动周期计数，period_anchor所在日/周/月的发言数，跨周期时惰性清零
+    today_count: int = 0
+    week_count: int = 0
+    month_count: int = 0
+    period_anchor: Optional[str] = None
+    # 发言历史的实际存储，通过 history 属性访问
+    _history: Dict[int, int] = field(default_factory=dict, repr=False)
+    # 延迟加载时尚未解码的原始history数据，首次访问 history 时才解析
+    _raw_history: Any = field(default=None, repr=False, compare=False)
+    
+    @property
+    def history(self) -> Dict[int, int]:
+        """按天聚合的发言历史，延迟加载的数据在首次访问时解码"""
+        if self._raw_history is not None:
+            raw_history, self._raw_history = self._raw_history, None
+            self._merge_raw_history(raw_history)
+        return self._history
+    
+    @history.setter
+    def history(self, value: Dict[int, int]):
+        self._history = value
+        self._raw_history = None
+    
+    @property
+    def history_loaded(self) -> bool:
+        """发言历史是否已解码（未解码时访问 history 会触发解析）"""
+        return self._raw_history is None
+    
+    def _merge_raw_history(self, history: Any):
+        """解析原始history数据并合并到计数桶
+        
+        兼容旧版本逐条记录的历史格式（["YYYY-MM-DD", ...]），加载时自动聚合为按天计数。
+        
+        Args:
+            history (Any): {"YYYY-MM-DD": 次数} 或旧版 ["YYYY-MM-DD", ...]
+        """
+        if isinstance(history, dict):
+            # 新格式：{"YYYY-MM-DD": 次数}
+            day_counts = history.items()
+        elif isinstance(history, list):
+            # 旧格式：每条消息一个日期字符串，先按字符串聚合再解析，迁移时每个日期只解析一次
+            day_counts = Counter(str(h) for h in history).items()
+        else:
+            # 如果history不是可迭代对象，跳过但记录更详细的警告
+            logger.warning(f"history字段类型错误，不是可迭代对象: {type(history)}")
+            return
+        
+        buckets = self._history
+        for hist_str, count in day_counts:
+            try:
+                year, month, day = map(int, hist_str.split('-'))
+                ordinal = date(year, month, day).toordinal()
+                buckets[ordinal] = buckets.get(ordinal, 0) + int(count)
+            except (ValueError, IndexError, TypeError, AttributeError) as e:
+                # 跳过格式错误的日期记录，但记录警告
+                logger.warning(f"跳过格式错误的日期记录 '{hist_str}': {e}")
+                continue
     
     def add_message(self, message_date: MessageDate):
         """添加消息记录
         
-        增加用户的发言计数并记录发言日期。每次发言都会记录到历史中，
-        保持message_count字段与实际发言次数的一致性。
+        增加用户的发言计数，并将当天的发言次数加1。历史按天聚合，
+        内存和磁盘占用只与发言天数有关，与发言条数无关。
         
         Args:
             message_date (MessageDate): 消息日期对象
@@ -237,11 +304,127 @@ class UserData:
         """
         self.message_count += 1
         
-        # 每次发言都添加到历史记录中
-        self.history.append(message_date)
+        # 累加到当天的计数桶
+        day = message_date.to_date().toordinal()
+        self.history[day] = self.history.get(day, 0) + 1
         
         # 更新最后发言日期
         self.last_date = str(message_date)
+        
+        # 增量维护今日/本周/本月计数
+        self._count_period_message(message_date.to_date())
+    
+    @staticmethod
+    def _period_keys(day: date) -> tuple:
+        """返回日期所属的 (日, 周, 月) 标识，标识相同即属于同一周期"""
+        ordinal = day.toordinal()
+        return ordinal, ordinal - day.weekday(), (day.year, day.month)
+    
+    def _get_period_anchor(self) -> Optional[date]:
+        """解析周期计数锚点，格式错误时视为未初始化"""
+        if not self.period_anchor:
+            return None
+        try:
+            return date.fromisoformat(self.period_anchor)
+        except (ValueError, TypeError):
+            return None
+    
+    def _rebuild_period_counters(self) -> Optional[date]:
+        """从发言历史重建周期计数
+        
+        只在旧数据首次使用、或锚点缺失时执行一次，之后由 add_message 增量维护。
+        
+        Returns:
+            Optional[date]: 新的锚点（最后发言日期），无历史时返回None
+        """
+        if not self.history:
+            self.today_count = self.week_count = self.month_count = 0
+            self.period_anchor = None
+            return None
+        
+        anchor = date.fromordinal(max(self.history))
+        day_key, week_key, month_key = self._period_keys(anchor)
+        self.today_count = self.history.get(day_key, 0)
+        self.week_count = sum(count for day, count in self.history.items() if week_key <= day <= day_key)
+        self.month_count = self.get_message_count_in_period(anchor.replace(day=1), anchor)
+        self.period_anchor = str(anchor)
+        return anchor
+    
+    def _count_period_message(self, day: date):
+        """将一条发言计入滚动周期计数
+        
+        新周期的发言会把对应计数重置为1并前移锚点；早于锚点的补录发言
+        只计入与锚点同周期的计数。
+        
+        Args:
+            day (date): 发言日期（已计入history）
+        """
+        anchor = self._get_period_anchor()
+        if anchor is None:
+            # 旧数据没有周期计数，直接从已包含本条发言的历史重建
+            self._rebuild_period_counters()
+            return
+        
+        new_keys = self._period_keys(day)
+        anchor_keys = self._period_keys(anchor)
+        counts = [self.today_count, self.week_count, self.month_count]
+        for i, (new_key, anchor_key) in enumerate(zip(new_keys, anchor_keys)):
+            if new_key == anchor_key:
+                counts[i] += 1
+            elif day > anchor:
+                counts[i] = 1
+        self.today_count, self.week_count, self.month_count = counts
+        if day > anchor:
+            self.period_anchor = str(day)
+    
+    def get_period_count(self, rank_type: RankType, current_date: Optional[date] = None) -> int:
+        """获取今日/本周/本月发言数
+        
+        直接读取增量维护的滚动计数，锚点不在当前周期时说明该周期内没有发言，返回0。
+        
+        Args:
+            rank_type (RankType): DAILY、WEEKLY 或 MONTHLY
+            current_date (Optional[date]): 当前日期，默认为今天
+            
+        Returns:
+            int: 当前周期内的发言次数
+            
+        Raises:
+            ValueError: 当rank_type不是日/周/月榜时抛出
+            
+        Example:
+            >>> user = UserData("123", "用户")
+            >>> user.add_message(MessageDate(2024, 1, 15))
+            >>> user.get_period_count(RankType.WEEKLY, date(2024, 1, 17))
+            1
+        """
+        period_index = {RankType.DAILY: 0, RankType.WEEKLY: 1, RankType.MONTHLY: 2}.get(rank_type)
+        if period_index is None:
+            raise ValueError(f"不支持的周期类型: {rank_type}")
+        return self.get_period_counts(current_date)[period_index]
+    
+    def get_period_counts(self, current_date: Optional[date] = None) -> tuple:
+        """一次取出今日、本周、本月发言数
+        
+        Args:
+            current_date (Optional[date]): 当前日期，默认为今天
+            
+        Returns:
+            tuple: (今日发言数, 本周发言数, 本月发言数)
+        """
+        anchor = self._get_period_anchor()
+        if anchor is None:
+            if self.message_count <= 0:
+                return 0, 0, 0
+            anchor = self._rebuild_period_counters()
+            if anchor is None:
+                return 0, 0, 0
+        
+        anchor_keys = self._period_keys(anchor)
+        current_keys = self._period_keys(current_date or date.today())
+        counts = (self.today_count, self.week_count, self.month_count)
+        return tuple(count if anchor_key == current_key else 0
+                     for count, anchor_key, current_key in zip(counts, anchor_keys, current_keys))
     
     def get_last_message_date(self) -> Optional[MessageDate]:
         """获取最后消息日期
@@ -258,12 +441,15 @@ class UserData:
             >>> print(last_date.year)
             2024
         """
-        return self.history[-1] if self.history else None
+        if not self.history:
+            return None
+        return MessageDate.from_date(date.fromordinal(max(self.history)))
     
     def get_message_count_in_period(self, start_date: date, end_date: date) -> int:
         """获取指定时间段内的消息数量
         
-        计算用户在指定日期范围内的发言次数。
+        计算用户在指定日期范围内的发言次数。只遍历按天聚合的计数桶，
+        开销与发言天数成正比，与发言条数无关。
         
         Args:
             start_date (date): 开始日期（包含）
@@ -280,11 +466,9 @@ class UserData:
             >>> print(count)
             2
         """
-        count = 0
-        for hist_date in self.history:
-            if start_date <= hist_date.to_date() <= end_date:
-                count += 1
-        return count
+        start_day = start_date.toordinal()
+        end_day = end_date.toordinal()
+        return sum(count for day, count in self.history.items() if start_day <= day <= end_day)
     
     def sign_today(self) -> tuple[bool, str, int, int]:
         """执行今日签到
@@ -396,7 +580,7 @@ class UserData:
                 - user_id: 用户ID
                 - nickname: 用户昵称
                 - message_count: 总发言次数
-                - history: 发言日期历史（字符串列表）
+                - history: 按天聚合的发言历史（{"YYYY-MM-DD": 次数}）
                 - last_date: 最后发言日期
                 - first_message_time: 首次发言时间戳
                 - last_message_time: 最后发言时间戳
@@ -406,6 +590,8 @@ class UserData:
                 - points: 积分数量
                 - last_sign_date: 最后签到日期
                 - total_sign_days: 总签到天数
+                - today_count/week_count/month_count: 滚动周期计数
+                - period_anchor: 周期计数所属日期
                 
         Example:
             >>> user = UserData("123", "用户")
@@ -413,11 +599,17 @@ class UserData:
             >>> print(data['nickname'])
             '用户'
         """
+        if isinstance(self._raw_history, dict):
+            # 未解码且已是新格式，原样写回，不做解析和重新格式化
+            history = self._raw_history
+        else:
+            history = {str(date.fromordinal(day)): count for day, count in sorted(self.history.items())}
+        
         return {
             "user_id": self.user_id,
             "nickname": self.nickname,
             "message_count": self.message_count,
-            "history": [str(h) for h in self.history],
+            "history": history,
             "last_date": self.last_date,
             "first_message_time": self.first_message_time,
             "last_message_time": self.last_message_time,
@@ -426,17 +618,24 @@ class UserData:
             "spirit_stones": self.spirit_stones,
             "points": self.points,
             "last_sign_date": self.last_sign_date,
-            "total_sign_days": self.total_sign_days
+            "total_sign_days": self.total_sign_days,
+            "today_count": self.today_count,
+            "week_count": self.week_count,
+            "month_count": self.month_count,
+            "period_anchor": self.period_anchor
         }
     
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'UserData':
+    def from_dict(cls, data: Dict[str, Any], lazy: bool = False) -> 'UserData':
         """从字典创建
         
         从字典数据创建UserData实例，自动重建发言历史记录和Rbot功能数据。
+        兼容旧版本逐条记录的历史格式（["YYYY-MM-DD", ...]），加载时自动聚合为按天计数。
         
         Args:
             data (Dict[str, Any]): 用户数据字典，必须包含user_id和nickname字段
+            lazy (bool): 为True时只加载汇总字段，history保留原始数据，
+                首次访问时才解码（总榜、签到、个人信息等不需要历史的场景不再解析日期）
             
         Returns:
             UserData: 对应的UserData实例
@@ -464,24 +663,21 @@ class UserData:
             spirit_stones=data.get("spirit_stones", 0),
             points=data.get("points", 0),
             last_sign_date=data.get("last_sign_date"),
-            total_sign_days=data.get("total_sign_days", 0)
+            total_sign_days=data.get("total_sign_days", 0),
+            # 滚动周期计数，旧数据没有这些字段，首次使用时从history重建
+            today_count=data.get("today_count", 0),
+            week_count=data.get("week_count", 0),
+            month_count=data.get("month_count", 0),
+            period_anchor=data.get("period_anchor")
         )
         
         # 重建history
-        if "history" in data:
-            try:
-                for hist_str in data["history"]:
-                    try:
-                        year, month, day = map(int, hist_str.split('-'))
-                        user_data.history.append(MessageDate(year, month, day))
-                    except (ValueError, IndexError) as e:
-                        # 跳过格式错误的日期记录，但记录警告
-                        logger.warning(f"跳过格式错误的日期记录 '{hist_str}': {e}")
-                        continue
-            except TypeError as e:
-                # 如果history不是可迭代对象，跳过但记录更详细的警告
-                logger.warning(f"history字段类型错误，不是可迭代对象: {type(data.get('history'))}, 错误: {e}")
-                # 不使用pass，而是记录具体的错误信息
+        history = data.get("history")
+        if history:
+            if lazy:
+                user_data._raw_history = history
+            else:
+                user_data._merge_raw_history(history)
         
         return user_data
     
@@ -492,6 +688,88 @@ class UserData:
         return self.message_count < other.message_count  # 升序排列，用于sorted()函数
 
 
+class GroupUsers(list):
+    """带 user_id 索引的群组用户列表
+    
+    常驻内存的群组数据使用此类型。它是 list 的子类，保留原有的顺序遍历、
+    切片、append 等用法，同时在每次增删改时同步维护 {user_id: UserData} 索引，
+    按用户ID查找、插入和更新都是 O(1)，无需每条消息重建字典。
+    
+    Example:
+        >>> users = GroupUsers([UserData("1", "甲")])
+        >>> users.append(UserData("2", "乙"))
+        >>> users.get_user("2").nickname
+        '乙'
+    """
+    
+    def __init__(self, iterable=()):
+        super().__init__(iterable)
+        self._index: Dict[str, UserData] = {}
+        self._rebuild_index()
+    
+    def _rebuild_index(self):
+        """重建索引（列表被批量修改后调用）"""
+        self._index = {user.user_id: user for user in self}
+    
+    @property
+    def user_index(self) -> Dict[str, UserData]:
+        """user_id 到 UserData 的实时索引（只读使用）"""
+        return self._index
+    
+    def get_user(self, user_id: str) -> Optional['UserData']:
+        """按用户ID查找用户，O(1)"""
+        return self._index.get(user_id)
+    
+    def has_user(self, user_id: str) -> bool:
+        """检查用户是否存在，O(1)"""
+        return user_id in self._index
+    
+    def append(self, user: 'UserData'):
+        super().append(user)
+        self._index[user.user_id] = user
+    
+    def extend(self, users):
+        super().extend(users)
+        self._rebuild_index()
+    
+    def insert(self, position, user: 'UserData'):
+        super().insert(position, user)
+        self._index[user.user_id] = user
+    
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            super().__setitem__(key, value)
+            self._rebuild_index()
+            return
+        old_user = self[key]
+        super().__setitem__(key, value)
+        if old_user.user_id != value.user_id and self._index.get(old_user.user_id) is old_user:
+            del self._index[old_user.user_id]
+        self._index[value.user_id] = value
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._rebuild_index()
+    
+    def __iadd__(self, users):
+        result = super().__iadd__(users)
+        self._rebuild_index()
+        return result
+    
+    def remove(self, user: 'UserData'):
+        super().remove(user)
+        self._rebuild_index()
+    
+    def pop(self, *args) -> 'UserData':
+        user = super().pop(*args)
+        self._rebuild_index()
+        return user
+    
+    def clear(self):
+        super().clear()
+        self._index.clear()
+
+
 class PluginConfig:
     """插件基本配置
     
@@ -513,6 +791,18 @@ class PluginConfig:
         rbot_enabled_groups (List[str]): Rbot功能生效的群组ID列表，为空表示所有群组
         rbot_admin_users (List[str]): Rbot功能管理员用户ID列表，可以修改修为阅历积分
         rbot_weekly_reset_day (int): 每周重置阅历的星期几，0-6对应周一到周日，默认为0（周一）
+        # 数据持久化配置
+        flush_interval_seconds (int): 延迟写回的最长间隔（秒），脏数据最多在内存中停留这么久
+        flush_max_mutations (int): 单个群组累计多少次修改后立即触发写回
+        storage_backend (str): 群组数据存储后端，"json"（默认）或 "sqlite"
+        # 图片渲染配置
+        render_pool_size (int): 预热的浏览器页面数量，即同时渲染排行榜图片的最大数量
+        avatar_cache_ttl_hours (int): 本地头像缓存有效期（小时），过期后在后台刷新
+        avatar_cache_max_mb (int): 本地头像缓存目录的最大总大小（MB）
+        render_backend (str): 排行榜图片渲染后端，"playwright"（默认）或 "pillow"
+        pillow_font_path (str): Pillow渲染使用的中文字体文件路径，为空时自动查找
+        persistent_render_page (bool): 是否使用常驻模板页面（只推送数据，不重新解析HTML和CSS）
+        render_worker_enabled (bool): 是否在独立进程中渲染图片，避免渲染占用消息处理的事件循环
         
     Methods:
         to_dict(): 转换为字典格式
@@ -541,6 +831,20 @@ class PluginConfig:
         self.rbot_enabled_groups = []  # 为空表示所有群组都启用
         self.rbot_admin_users = []  # Rbot功能管理员用户ID列表
         self.rbot_weekly_reset_day = 0  # 每周一重置阅历
+        
+        # 数据持久化配置
+        self.flush_interval_seconds = 10  # 脏数据最长10秒写回一次
+        self.flush_max_mutations = 200  # 单群组累计200次修改立即写回
+        self.storage_backend = "json"  # 默认使用JSON文件存储
+        
+        # 图片渲染配置
+        self.render_pool_size = 2  # 默认预热2个页面，最多同时渲染2张图片
+        self.avatar_cache_ttl_hours = 72  # 头像3天后在后台刷新
+        self.avatar_cache_max_mb = 50  # 头像缓存最多占用50MB
+        self.render_backend = "playwright"  # 默认使用浏览器渲染HTML模板
+        self.pillow_font_path = ""  # 为空时自动查找系统中文字体
+        self.persistent_render_page = False  # 默认每次渲染完整HTML，支持自定义模板结构
+        self.render_worker_enabled = False  # 默认在插件进程内渲染
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典
@@ -563,6 +867,16 @@ class PluginConfig:
                 - rbot_enabled_groups: Rbot功能生效群组
                 - rbot_admin_users: Rbot功能管理员用户ID列表
                 - rbot_weekly_reset_day: 每周重置阅历的星期几
+                - flush_interval_seconds: 延迟写回间隔
+                - flush_max_mutations: 触发写回的修改次数
+                - storage_backend: 群组数据存储后端
+                - render_pool_size: 渲染页面池大小
+                - avatar_cache_ttl_hours: 头像缓存有效期
+                - avatar_cache_max_mb: 头像缓存最大大小
+                - render_backend: 图片渲染后端
+                - pillow_font_path: Pillow渲染字体路径
+                - persistent_render_page: 常驻模板页面开关
+                - render_worker_enabled: 独立渲染进程开关
                 
         Example:
             >>> config = PluginConfig()
@@ -583,7 +897,17 @@ class PluginConfig:
             "rbot_enabled": self.rbot_enabled,
             "rbot_enabled_groups": self.rbot_enabled_groups,
             "rbot_admin_users": self.rbot_admin_users,
-            "rbot_weekly_reset_day": self.rbot_weekly_reset_day
+            "rbot_weekly_reset_day": self.rbot_weekly_reset_day,
+            "flush_interval_seconds": self.flush_interval_seconds,
+            "flush_max_mutations": self.flush_max_mutations,
+            "storage_backend": self.storage_backend,
+            "render_pool_size": self.render_pool_size,
+            "avatar_cache_ttl_hours": self.avatar_cache_ttl_hours,
+            "avatar_cache_max_mb": self.avatar_cache_max_mb,
+            "render_backend": self.render_backend,
+            "pillow_font_path": self.pillow_font_path,
+            "persistent_render_page": self.persistent_render_page,
+            "render_worker_enabled": self.render_worker_enabled
         }
     
     @classmethod
@@ -609,6 +933,16 @@ class PluginConfig:
                 - rbot_enabled_groups: Rbot功能生效群组
                 - rbot_admin_users: Rbot功能管理员用户ID列表
                 - rbot_weekly_reset_day: 每周重置阅历的星期几
+                - flush_interval_seconds: 延迟写回间隔
+                - flush_max_mutations: 触发写回的修改次数
+                - storage_backend: 群组数据存储后端
+                - render_pool_size: 渲染页面池大小
+                - avatar_cache_ttl_hours: 头像缓存有效期
+                - avatar_cache_max_mb: 头像缓存最大大小
+                - render_backend: 图片渲染后端
+                - pillow_font_path: Pillow渲染字体路径
+                - persistent_render_page: 常驻模板页面开关
+                - render_worker_enabled: 独立渲染进程开关
             
         Returns:
             PluginConfig: 对应的PluginConfig实例
@@ -642,6 +976,20 @@ class PluginConfig:
         config.rbot_admin_users = data.get("rbot_admin_users", [])
         config.rbot_weekly_reset_day = data.get("rbot_weekly_reset_day", 0)
         
+        # 数据持久化配置
+        config.flush_interval_seconds = data.get("flush_interval_seconds", 10)
+        config.flush_max_mutations = data.get("flush_max_mutations", 200)
+        config.storage_backend = data.get("storage_backend", "json")
+        
+        # 图片渲染配置
+        config.render_pool_size = data.get("render_pool_size", 2)
+        config.avatar_cache_ttl_hours = data.get("avatar_cache_ttl_hours", 72)
+        config.avatar_cache_max_mb = data.get("avatar_cache_max_mb", 50)
+        config.render_backend = data.get("render_backend", "playwright")
+        config.pillow_font_path = data.get("pillow_font_path", "")
+        config.persistent_render_page = data.get("persistent_render_page", False)
+        config.render_worker_enabled = data.get("render_worker_enabled", False)
+        
         return config
 
 
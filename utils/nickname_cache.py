@@ -0,0 +1,171 @@
+"""
+昵称缓存模块
+
+同一个用户在不同群里的群名片不同，昵称必须按 (group_id, user_id) 缓存。
+NicknameCache 是两级结构：第一级按群组，第二级是该群 user_id -> 昵称 的映射。
+
+- 条目带TTL，过期后视为未命中
+- 总条目数超过 maxsize 时，从最久未访问的群组中淘汰最早写入的条目
+- 支持按群组批量失效（刷新群成员列表、成员变动后使用）
+- 记录命中、未命中、过期和淘汰次数
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+NICKNAME_CACHE_MAXSIZE = 5000  # 默认最多缓存的昵称数量（所有群组合计）
+NICKNAME_CACHE_TTL = 600  # 默认昵称有效期（秒）
+
+
+class NicknameCache:
+    """按群组划分的有界昵称缓存
+
+    Attributes:
+        maxsize (int): 所有群组合计的最大条目数
+        ttl (float): 条目有效期（秒）
+
+    Example:
+        >>> cache = NicknameCache()
+        >>> cache.set("123456", "10001", "小明")
+        >>> cache.get("123456", "10001")
+        '小明'
+        >>> cache.invalidate("123456")
+    """
+
+    def __init__(self, maxsize: int = NICKNAME_CACHE_MAXSIZE, ttl: float = NICKNAME_CACHE_TTL):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+
+        # group_id -> (user_id -> (昵称, 过期时间))，两级都按最近使用顺序排列
+        self._groups: "OrderedDict[str, OrderedDict[str, Tuple[str, float]]]" = OrderedDict()
+        self._size = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, group_id: str, user_id: str) -> Optional[str]:
+        """读取昵称
+
+        Args:
+            group_id (str): 群组ID
+            user_id (str): 用户ID
+
+        Returns:
+            Optional[str]: 缓存的昵称，未缓存或已过期时返回None
+        """
+        group_id, user_id = str(group_id), str(user_id)
+        members = self._groups.get(group_id)
+        entry = members.get(user_id) if members is not None else None
+        if entry is None:
+            self._misses += 1
+            return None
+
+        nickname, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._expirations += 1
+            self._misses += 1
+            self._remove(group_id, user_id)
+            return None
+
+        self._hits += 1
+        self._groups.move_to_end(group_id)
+        members.move_to_end(user_id)
+        return nickname
+
+    def set(self, group_id: str, user_id: str, nickname: str):
+        """写入昵称，超出容量时淘汰旧条目"""
+        if not nickname:
+            return
+        group_id, user_id = str(group_id), str(user_id)
+        members = self._groups.get(group_id)
+        if members is None:
+            members = self._groups[group_id] = OrderedDict()
+        else:
+            self._groups.move_to_end(group_id)
+
+        if user_id in members:
+            members.move_to_end(user_id)
+        else:
+            self._size += 1
+        members[user_id] = (nickname, time.monotonic() + self.ttl)
+        self._evict()
+
+    def set_many(self, group_id: str, nicknames: Mapping[str, str]):
+        """批量写入同一个群组的昵称
+
+        Args:
+            group_id (str): 群组ID
+            nicknames (Mapping[str, str]): user_id -> 昵称
+        """
+        for user_id, nickname in nicknames.items():
+            self.set(group_id, user_id, nickname)
+
+    def invalidate(self, group_id: str, user_id: Optional[str] = None) -> int:
+        """使缓存失效
+
+        Args:
+            group_id (str): 群组ID
+            user_id (Optional[str]): 用户ID，为None时使整个群组的昵称失效
+
+        Returns:
+            int: 删除的条目数
+        """
+        group_id = str(group_id)
+        if user_id is not None:
+            return 1 if self._remove(group_id, str(user_id)) else 0
+
+        members = self._groups.pop(group_id, None)
+        if not members:
+            return 0
+        self._size -= len(members)
+        return len(members)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """使某个用户在所有群组中的昵称失效，返回删除的条目数"""
+        user_id = str(user_id)
+        return sum(1 for group_id in list(self._groups) if self._remove(group_id, user_id))
+
+    def clear(self):
+        """清空缓存（统计计数保留）"""
+        self._groups.clear()
+        self._size = 0
+
+    def _remove(self, group_id: str, user_id: str) -> bool:
+        members = self._groups.get(group_id)
+        if members is None or members.pop(user_id, None) is None:
+            return False
+        self._size -= 1
+        if not members:
+            del self._groups[group_id]
+        return True
+
+    def _evict(self):
+        """从最久未访问的群组开始淘汰最早写入的条目，直到不超过 maxsize"""
+        while self._size > self.maxsize and self._groups:
+            group_id, members = next(iter(self._groups.items()))
+            members.popitem(last=False)
+            self._size -= 1
+            self._evictions += 1
+            if not members:
+                del self._groups[group_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self._hits + self._misses
+        return {
+            'size': self._size,
+            'maxsize': self.maxsize,
+            'groups': len(self._groups),
+            'ttl': self.ttl,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': self._hits / lookups if lookups else 0.0,
+            'expirations': self._expirations,
+            'evictions': self._evictions
+        }
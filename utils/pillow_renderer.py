@@ -0,0 +1,384 @@
+"""
+Pillow排行榜渲染模块
+
+不依赖浏览器的排行榜图片渲染后端：直接用Pillow绘制与 rank_template.html
+相同布局的排行榜（标题区、用户行、占比条、圆形头像、页脚）。
+单次渲染在百毫秒以内，内存占用远小于Chromium，适合没有安装浏览器的环境。
+
+头像只从本地头像缓存读取，未缓存的头像绘制为占位圆形。
+Pillow为可选依赖，未安装时 PIL_AVAILABLE 为False；创建渲染器时才导入。
+"""
+
+import asyncio
+import importlib.util
+import io
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from astrbot.api import logger as astrbot_logger
+
+from .models import GroupInfo
+
+# Pillow为可选依赖，未安装时不启用Pillow渲染后端；只有使用Pillow后端时才导入
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+Image = ImageDraw = ImageFont = None
+
+
+def _load_pillow() -> bool:
+    """导入Pillow，返回是否可用"""
+    global PIL_AVAILABLE, Image, ImageDraw, ImageFont
+    if Image is not None:
+        return True
+    if not PIL_AVAILABLE:
+        return False
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        PIL_AVAILABLE = False
+        return False
+    return True
+
+
+# 画布与布局（与 rank_template.html 保持一致）
+CANVAS_WIDTH = 1200
+CONTENT_WIDTH = 900
+PAGE_PADDING = 40
+CARD_PADDING = 16
+CARD_RADIUS = 20
+ROW_PADDING = 16
+AVATAR_SIZE = 75
+AVATAR_MARGIN = 30
+RANK_COLUMN_WIDTH = 60
+ROW_HEIGHT = AVATAR_SIZE + ROW_PADDING * 2
+SEPARATOR_GAP = 20
+PERCENT_BAR_HEIGHT = 6
+PERCENT_BAR_WIDTH = 260
+AVATAR_SUPERSAMPLE = 4  # 头像圆形遮罩的超采样倍数，用于抗锯齿
+JPEG_QUALITY = 90  # 输出JPEG质量；同尺寸PNG编码耗时是JPEG的十倍以上
+
+# 配色
+BACKGROUND_TOP = (233, 239, 246)
+BACKGROUND_BOTTOM = (214, 228, 240)
+TEXT_COLOR = (31, 41, 55)
+MUTED_COLOR = (107, 114, 128)
+RANK_COLOR = (59, 130, 246)
+COUNT_COLOR = (239, 68, 68)
+PERCENT_COLOR = (34, 197, 94)
+DIVIDER_COLOR = (229, 231, 235)
+SEPARATOR_COLOR = (189, 195, 199)
+CURRENT_ROW_COLOR = (243, 232, 255)
+BAR_TRACK_COLOR = (229, 231, 235)
+AVATAR_PLACEHOLDER_COLOR = (164, 176, 190)
+
+# 常见的中文字体路径，未配置字体时按顺序查找
+CJK_FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+)
+
+
+class PillowRankRenderer:
+    """Pillow排行榜渲染器
+
+    Attributes:
+        avatar_cache (Optional[AvatarCache]): 本地头像缓存
+        font_path (Optional[str]): 使用的字体文件，None表示Pillow内置字体（不支持中文）
+
+    Example:
+        >>> renderer = PillowRankRenderer(avatar_cache)
+        >>> path = await renderer.render(user_items, group_info, "今日发言榜单", 156)
+    """
+
+    def __init__(self, avatar_cache=None, font_path: Optional[str] = None, logger=None):
+        if not _load_pillow():
+            raise ImportError("Pillow未安装，无法使用Pillow渲染后端")
+
+        self.avatar_cache = avatar_cache
+        self.logger = logger or astrbot_logger
+        self.font_path = self._find_font(font_path)
+        self._fonts: Dict[int, Any] = {}
+        self._avatar_mask = self._build_avatar_mask()
+
+        if self.font_path:
+            self.logger.info(f"Pillow渲染使用字体: {self.font_path}")
+        else:
+            self.logger.warning("未找到中文字体，Pillow渲染的中文可能无法显示，请配置 pillow_font_path")
+
+    @staticmethod
+    def _find_font(font_path: Optional[str]) -> Optional[str]:
+        """查找可用的字体文件，优先使用配置的路径"""
+        for candidate in ((font_path,) if font_path else ()) + CJK_FONT_CANDIDATES:
+            if Path(candidate).is_file():
+                return candidate
+        return None
+
+    def _font(self, size: int):
+        """按字号获取字体，同一字号只加载一次"""
+        font = self._fonts.get(size)
+        if font is None:
+            if self.font_path:
+                font = ImageFont.truetype(self.font_path, size)
+            else:
+                font = ImageFont.load_default(size)
+            self._fonts[size] = font
+        return font
+
+    @staticmethod
+    def _build_avatar_mask():
+        """生成抗锯齿的圆形头像遮罩"""
+        large = AVATAR_SIZE * AVATAR_SUPERSAMPLE
+        mask = Image.new("L", (large, large), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, large - 1, large - 1), fill=255)
+        return mask.resize((AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+
+    # ========== 渲染入口 ==========
+
+    async def render(self, user_items: List[Dict[str, Any]], group_info: GroupInfo, title: str,
+                     total_messages: int) -> str:
+        """渲染排行榜图片
+
+        Args:
+            user_items (List[Dict[str, Any]]): ImageGenerator._process_user_data_batch 生成的用户条目
+            group_info (GroupInfo): 群组信息
+            title (str): 排行榜标题
+            total_messages (int): 发言总数
+
+        Returns:
+            str: 生成的临时JPEG文件路径，由调用方负责清理
+        """
+        avatars = {}
+        if self.avatar_cache:
+            for item in user_items:
+                user_id = item.get('user_id')
+                if user_id and user_id not in avatars:
+                    avatars[user_id] = await self.avatar_cache.get(user_id)
+
+        # 绘制和编码是CPU密集操作，放到线程中执行，不阻塞事件循环
+        return await asyncio.to_thread(self._draw, user_items, group_info, title, total_messages, avatars)
+
+    def _draw(self, user_items: List[Dict[str, Any]], group_info: GroupInfo, title: str,
+              total_messages: int, avatars: Dict[str, Optional[bytes]]) -> str:
+        """同步绘制排行榜并保存为临时JPEG文件"""
+        separator_count = sum(1 for item in user_items if item.get('is_separator'))
+        rows_height = max(len(user_items), 1) * ROW_HEIGHT + separator_count * SEPARATOR_GAP
+        header_height = 24 + 10 + 32 + 15 + 18 + 20 + 40
+        card_height = rows_height + CARD_PADDING * 2
+        footer_height = 40 + 15 * 2 + 10
+        height = PAGE_PADDING * 2 + header_height + card_height + footer_height
+
+        image = self._gradient_background(CANVAS_WIDTH, height)
+        draw = ImageDraw.Draw(image)
+        left = (CANVAS_WIDTH - CONTENT_WIDTH) // 2
+        center = CANVAS_WIDTH // 2
+
+        # 标题区
+        y = PAGE_PADDING
+        group_name = group_info.group_name if group_info.group_name and group_info.group_name != group_info.group_id \
+            else f"群{group_info.group_id}"
+        self._draw_centered(draw, center, y, f"{group_name}[{group_info.group_id}]", 24, TEXT_COLOR)
+        y += 24 + 10
+        self._draw_centered(draw, center, y, title, 32, TEXT_COLOR, bold=True)
+        y += 32 + 15
+        self._draw_centered(draw, center, y, f"总发言数：{total_messages} 条", 18, MUTED_COLOR)
+        y += 18 + 20 + 40
+
+        # 白色卡片
+        draw.rounded_rectangle((left, y, left + CONTENT_WIDTH, y + card_height), radius=CARD_RADIUS, fill=(255, 255, 255))
+        y += CARD_PADDING
+        row_left = left + CARD_PADDING
+        row_right = left + CONTENT_WIDTH - CARD_PADDING
+
+        # 占比条按榜首的占比归一化，榜首为满格
+        max_percentage = max((item['percentage'] for item in user_items), default=0)
+
+        if not user_items:
+            self._draw_centered(draw, center, y + (ROW_HEIGHT - 24) // 2, "暂无数据", 24, MUTED_COLOR)
+
+        y = self._draw_rows(image, draw, user_items, row_left, row_right, y, avatars, max_percentage)
+
+        # 页脚
+        y += CARD_PADDING + 40
+        # 常见中文字体不包含彩色emoji，页脚省略机器人图标
+        self._draw_centered(draw, center, y, "由 AstrBot 发言统计插件生成", 15, MUTED_COLOR)
+        self._draw_centered(draw, center, y + 22, f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 15, MUTED_COLOR)
+
+        temp_path = Path(tempfile.gettempdir()) / f"rank_image_{uuid.uuid4().hex}.jpg"
+        image.save(temp_path, format="JPEG", quality=JPEG_QUALITY)
+        return str(temp_path)
+
+    async def append_rows(self, image_path: str, user_items: List[Dict[str, Any]], max_percentage: float) -> str:
+        """在已渲染的排行榜图片底部追加用户行
+
+        用于在共享的排行榜图片上补充请求者自己的行（虚线分隔、高亮），
+        不需要重新渲染整张排行榜；原图可以是任一渲染后端生成的图片。
+
+        Args:
+            image_path (str): 已渲染的排行榜图片，不会被修改
+            user_items (List[Dict[str, Any]]): 要追加的用户条目，格式同 render
+            max_percentage (float): 榜首的占比，用于归一化占比条
+
+        Returns:
+            str: 生成的临时JPEG文件路径，由调用方负责清理
+        """
+        avatars = {}
+        if self.avatar_cache:
+            for item in user_items:
+                user_id = item.get('user_id')
+                if user_id and user_id not in avatars:
+                    avatars[user_id] = await self.avatar_cache.get(user_id)
+
+        return await asyncio.to_thread(self._append_rows, image_path, user_items, max_percentage, avatars)
+
+    def _append_rows(self, image_path: str, user_items: List[Dict[str, Any]], max_percentage: float,
+                     avatars: Dict[str, Optional[bytes]]) -> str:
+        """同步绘制追加的用户行，与原图拼接后保存为临时JPEG文件"""
+        with Image.open(image_path) as source:
+            base = source.convert("RGB")
+
+        separator_count = sum(1 for item in user_items if item.get('is_separator'))
+        card_height = len(user_items) * ROW_HEIGHT + separator_count * SEPARATOR_GAP + CARD_PADDING * 2
+        strip_height = card_height + PAGE_PADDING
+
+        # 追加区域按 CANVAS_WIDTH 绘制，背景取原图底部颜色，再缩放到原图宽度
+        strip = Image.new("RGB", (CANVAS_WIDTH, strip_height), base.getpixel((0, base.height - 1)))
+        draw = ImageDraw.Draw(strip)
+        left = (CANVAS_WIDTH - CONTENT_WIDTH) // 2
+        draw.rounded_rectangle((left, 0, left + CONTENT_WIDTH, card_height), radius=CARD_RADIUS, fill=(255, 255, 255))
+        self._draw_rows(strip, draw, user_items, left + CARD_PADDING, left + CONTENT_WIDTH - CARD_PADDING,
+                        CARD_PADDING, avatars, max_percentage)
+
+        if base.width != CANVAS_WIDTH:
+            strip = strip.resize((base.width, round(strip_height * base.width / CANVAS_WIDTH)), Image.LANCZOS)
+
+        image = Image.new("RGB", (base.width, base.height + strip.height))
+        image.paste(base, (0, 0))
+        image.paste(strip, (0, base.height))
+
+        temp_path = Path(tempfile.gettempdir()) / f"rank_image_{uuid.uuid4().hex}.jpg"
+        image.save(temp_path, format="JPEG", quality=JPEG_QUALITY)
+        return str(temp_path)
+
+    # ========== 绘制工具 ==========
+
+    def _draw_rows(self, image, draw, user_items: List[Dict[str, Any]], row_left: int, row_right: int, y: int,
+                   avatars: Dict[str, Optional[bytes]], max_percentage: float) -> int:
+        """从 y 开始依次绘制用户行（分隔线、高亮背景），返回绘制结束的纵坐标"""
+        for index, item in enumerate(user_items):
+            if item.get('is_separator'):
+                y += SEPARATOR_GAP
+                self._draw_dashed_line(draw, row_left, row_right, y - SEPARATOR_GAP // 2)
+            elif index > 0:
+                draw.line((row_left, y, row_right, y), fill=DIVIDER_COLOR, width=1)
+
+            if item.get('is_current_user'):
+                draw.rounded_rectangle((row_left + 4, y, row_right - 4, y + ROW_HEIGHT), radius=16, fill=CURRENT_ROW_COLOR)
+
+            self._draw_row(image, draw, item, row_left, row_right, y, avatars.get(item.get('user_id')), max_percentage)
+            y += ROW_HEIGHT
+        return y
+
+    def _draw_row(self, image, draw, item: Dict[str, Any], row_left: int, row_right: int, y: int,
+                  avatar_data: Optional[bytes], max_percentage: float):
+        """绘制单个用户行：名次、头像、昵称与最近发言、占比条、发言数与占比"""
+        x = row_left + ROW_PADDING
+        middle = y + ROW_HEIGHT // 2
+
+        # 名次
+        rank_font = self._font(36)
+        rank_text = f"#{item['rank']}"
+        rank_width = draw.textlength(rank_text, font=rank_font)
+        draw.text((x + (RANK_COLUMN_WIDTH - rank_width) / 2, middle), rank_text, font=rank_font,
+                  fill=RANK_COLOR, anchor="lm", stroke_width=1, stroke_fill=RANK_COLOR)
+        x += RANK_COLUMN_WIDTH + 25 + AVATAR_MARGIN
+
+        # 头像
+        self._paste_avatar(image, draw, avatar_data, x, y + ROW_PADDING)
+        x += AVATAR_SIZE + AVATAR_MARGIN
+
+        # 右侧发言数和占比
+        stats_right = row_right - ROW_PADDING
+        count_text = f"{item['total']} 次"
+        percent_text = f"({item['percentage']:.2f}%)"
+        draw.text((stats_right, middle - 4), count_text, font=self._font(28), fill=COUNT_COLOR,
+                  anchor="rb", stroke_width=1, stroke_fill=COUNT_COLOR)
+        draw.text((stats_right, middle + 6), percent_text, font=self._font(17), fill=PERCENT_COLOR, anchor="rt")
+        stats_width = max(draw.textlength(count_text, font=self._font(28)),
+                          draw.textlength(percent_text, font=self._font(17)))
+
+        # 昵称、最近发言和占比条
+        name_width = int(stats_right - stats_width - 30 - x)
+        nickname = self._fit_text(draw, str(item['nickname']), self._font(24), name_width)
+        draw.text((x, middle - 8), nickname, font=self._font(24), fill=TEXT_COLOR, anchor="ls",
+                  stroke_width=1, stroke_fill=TEXT_COLOR)
+        draw.text((x, middle + 2), f"最近发言: {item['last_date']}", font=self._font(15), fill=MUTED_COLOR, anchor="lt")
+
+        bar_top = middle + 24
+        bar_width = min(PERCENT_BAR_WIDTH, name_width)
+        draw.rounded_rectangle((x, bar_top, x + bar_width, bar_top + PERCENT_BAR_HEIGHT),
+                               radius=PERCENT_BAR_HEIGHT // 2, fill=BAR_TRACK_COLOR)
+        filled = int(bar_width * max(item['percentage'], 0) / max_percentage) if max_percentage > 0 else 0
+        if filled > 0:
+            draw.rounded_rectangle((x, bar_top, x + max(filled, PERCENT_BAR_HEIGHT), bar_top + PERCENT_BAR_HEIGHT),
+                                   radius=PERCENT_BAR_HEIGHT // 2, fill=RANK_COLOR)
+
+    def _paste_avatar(self, image, draw, avatar_data: Optional[bytes], x: int, y: int):
+        """绘制圆形头像，头像无法解码时绘制占位圆形"""
+        avatar = None
+        if avatar_data:
+            try:
+                avatar = Image.open(io.BytesIO(avatar_data)).convert("RGB").resize((AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+            except (OSError, ValueError) as e:
+                self.logger.debug(f"头像解码失败: {e}")
+
+        if avatar is None:
+            draw.ellipse((x, y, x + AVATAR_SIZE - 1, y + AVATAR_SIZE - 1), fill=AVATAR_PLACEHOLDER_COLOR)
+        else:
+            image.paste(avatar, (x, y), self._avatar_mask)
+        draw.ellipse((x - 1, y - 1, x + AVATAR_SIZE, y + AVATAR_SIZE), outline=(255, 255, 255), width=3)
+
+    def _draw_centered(self, draw, center_x: int, top: int, text: str, size: int, color, bold: bool = False):
+        draw.text((center_x, top), text, font=self._font(size), fill=color, anchor="mt",
+                  stroke_width=1 if bold else 0, stroke_fill=color)
+
+    @staticmethod
+    def _draw_dashed_line(draw, left: int, right: int, y: int, dash: int = 8, gap: int = 6):
+        for x in range(left, right, dash + gap):
+            draw.line((x, y, min(x + dash, right), y), fill=SEPARATOR_COLOR, width=2)
+
+    @staticmethod
+    def _fit_text(draw, text: str, font, max_width: int) -> str:
+        """超出宽度的文字截断并添加省略号"""
+        if draw.textlength(text, font=font) <= max_width:
+            return text
+        # 二分查找能放下的最长前缀，避免逐字测量
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if draw.textlength(text[:middle] + "…", font=font) <= max_width:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low] + "…"
+
+    @staticmethod
+    def _gradient_background(width: int, height: int):
+        """生成从上到下的渐变背景"""
+        column = Image.new("RGB", (1, 256))
+        for i in range(256):
+            ratio = i / 255
+            column.putpixel((0, i), tuple(
+                int(top + (bottom - top) * ratio) for top, bottom in zip(BACKGROUND_TOP, BACKGROUND_BOTTOM)
+            ))
+        # 先纵向插值到目标高度；每一行颜色相同，横向拉伸用最近邻即可
+        return column.resize((1, height), Image.BILINEAR).resize((width, height), Image.NEAREST)
@@ -0,0 +1,278 @@
+"""
+排行榜服务模块
+
+发言排行榜的筛选、排序、标题和文字消息生成的统一实现，
+命令处理（main.py）和定时推送（TimerManager）共用同一套逻辑。
+
+批量接口 get_all_period_counts 一次得到总榜、日榜、周榜、月榜四份数据，
+并按群组数据版本缓存，同一群组的多次查询（包括定时推送）可以直接复用。
+SQLite后端的日榜、周榜、月榜使用索引上的 GROUP BY 查询，
+JSON后端对每个用户只读取一次汇总字段和滚动计数。
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from astrbot.api import logger as astrbot_logger
+
+from .models import UserData, RankType
+from .date_utils import get_week_start, get_month_start
+from .ranking import partial_sort
+
+# 可以由滚动计数直接得到的排行榜类型，顺序与 UserData.get_period_counts 的返回值一致
+PERIOD_RANK_TYPES = (RankType.DAILY, RankType.WEEKLY, RankType.MONTHLY)
+
+
+class RankService:
+    """排行榜服务
+
+    Attributes:
+        data_manager (DataManager): 数据管理器，用于索引查询和结果缓存
+        logger: 日志记录器
+
+    Example:
+        >>> service = RankService(data_manager)
+        >>> boards = await service.get_all_period_counts(users, group_id)
+        >>> boards[RankType.WEEKLY][:3]
+        [(UserData(...), 120), ...]
+    """
+
+    def __init__(self, data_manager, logger=None):
+        self.data_manager = data_manager
+        self.logger = logger or astrbot_logger
+
+    # ========== 时间段 ==========
+
+    @staticmethod
+    def get_time_period(rank_type: RankType, current_date: Optional[date] = None) -> tuple:
+        """获取排行榜类型对应的时间段
+
+        Args:
+            rank_type (RankType): 排行榜类型
+            current_date (Optional[date]): 当前日期，默认为今天
+
+        Returns:
+            tuple: (start_date, end_date)，总榜等不需要时间段过滤的类型返回 (None, None)
+        """
+        current_date = current_date or datetime.now().date()
+
+        if rank_type == RankType.DAILY:
+            return current_date, current_date
+        elif rank_type == RankType.WEEKLY:
+            # 本周从周一开始
+            return get_week_start(current_date), current_date
+        elif rank_type == RankType.MONTHLY:
+            return get_month_start(current_date), current_date
+        else:
+            return None, None
+
+    # ========== 数据筛选 ==========
+
+    @staticmethod
+    def compute_all_counts(group_data: List[UserData], current_date: Optional[date] = None) -> Dict[RankType, List[tuple]]:
+        """一次遍历计算总榜、日榜、周榜、月榜的数据
+
+        Args:
+            group_data (List[UserData]): 群组用户数据
+            current_date (Optional[date]): 当前日期，默认为今天
+
+        Returns:
+            Dict[RankType, List[tuple]]: 各排行榜类型的 [(UserData, 发言数)]，
+                只包含发言数大于0的用户，顺序与 group_data 一致（未排序）
+        """
+        current_date = current_date or datetime.now().date()
+        boards = {rank_type: [] for rank_type in (RankType.TOTAL, *PERIOD_RANK_TYPES)}
+        total_board = boards[RankType.TOTAL]
+        period_boards = [boards[rank_type] for rank_type in PERIOD_RANK_TYPES]
+
+        for user in group_data:
+            if user.message_count <= 0:
+                continue
+            total_board.append((user, user.message_count))
+            for board, count in zip(period_boards, user.get_period_counts(current_date)):
+                if count > 0:
+                    board.append((user, count))
+        return boards
+
+    async def get_all_period_counts(self, group_data: List[UserData], group_id: Optional[str] = None,
+                                    current_date: Optional[date] = None) -> Dict[RankType, List[tuple]]:
+        """获取四种排行榜的数据，提供group_id时按群组数据版本缓存
+
+        返回的列表会被多个调用方共享，调用方不能原地修改（排序请使用 partial_sort/top_k）。
+
+        Args:
+            group_data (List[UserData]): 群组用户数据
+            group_id (Optional[str]): 群组ID
+            current_date (Optional[date]): 当前日期，默认为今天
+
+        Returns:
+            Dict[RankType, List[tuple]]: 同 compute_all_counts
+        """
+        current_date = current_date or datetime.now().date()
+        cache_key = self.data_manager.get_rank_cache_key(group_id, "periods", current_date) if group_id else None
+
+        if cache_key:
+            boards = await self.data_manager.get_cached_rank(cache_key)
+            if boards is not None:
+                return boards
+
+        boards = await self._compute_indexed_counts(group_data, group_id, current_date) if group_id else None
+        if boards is None:
+            boards = self.compute_all_counts(group_data, current_date)
+        if cache_key:
+            await self.data_manager.cache_rank(cache_key, boards)
+        return boards
+
+    async def _compute_indexed_counts(self, group_data: List[UserData], group_id: str,
+                                      current_date: date) -> Optional[Dict[RankType, List[tuple]]]:
+        """通过存储后端的索引查询计算四种排行榜的数据
+
+        Returns:
+            Optional[Dict[RankType, List[tuple]]]: 同 compute_all_counts，存储后端不支持索引查询（JSON）时返回None
+        """
+        period_counts = []
+        for rank_type in PERIOD_RANK_TYPES:
+            start_date, end_date = self.get_time_period(rank_type, current_date)
+            counts = await self.data_manager.get_period_message_counts(group_id, start_date, end_date)
+            if counts is None:
+                return None
+            period_counts.append(counts)
+
+        boards = {rank_type: [] for rank_type in (RankType.TOTAL, *PERIOD_RANK_TYPES)}
+        for user in group_data:
+            if user.message_count <= 0:
+                continue
+            boards[RankType.TOTAL].append((user, user.message_count))
+            for rank_type, counts in zip(PERIOD_RANK_TYPES, period_counts):
+                count = counts.get(user.user_id, 0)
+                if count > 0:
+                    boards[rank_type].append((user, count))
+        return boards
+
+    async def filter_users(self, group_data: List[UserData], rank_type: RankType, group_id: Optional[str] = None,
+                           date_range: Optional[tuple] = None, current_date: Optional[date] = None) -> List[tuple]:
+        """根据排行榜类型筛选数据并计算发言数
+
+        Args:
+            group_data (List[UserData]): 群组用户数据
+            rank_type (RankType): 排行榜类型
+            group_id (Optional[str]): 群组ID，提供时启用缓存和索引查询
+            date_range (Optional[tuple]): 自定义排行榜的 (start_date, end_date)
+            current_date (Optional[date]): 当前日期，默认为今天
+
+        Returns:
+            List[tuple]: [(UserData, 发言数)]，未排序，不支持的类型返回空列表
+        """
+        if rank_type == RankType.CUSTOM:
+            if not date_range:
+                return []
+            return await self._filter_by_date_range(group_data, group_id, *date_range)
+
+        boards = await self.get_all_period_counts(group_data, group_id, current_date)
+        return boards.get(rank_type, [])
+
+    async def _filter_by_date_range(self, group_data: List[UserData], group_id: Optional[str],
+                                    start_date: date, end_date: date) -> List[tuple]:
+        """计算自定义日期范围的发言数
+
+        优先使用SQLite索引查询或NumPy前缀和矩阵，两者都不可用时逐用户累加日计数桶。
+        """
+        if group_id:
+            range_counts = await self.data_manager.get_range_message_counts(group_id, start_date, end_date)
+            if range_counts is not None:
+                return [(user, range_counts[user.user_id]) for user in group_data
+                        if range_counts.get(user.user_id, 0) > 0]
+
+        filtered_users = []
+        for user in group_data:
+            period_count = user.get_message_count_in_period(start_date, end_date)
+            if period_count > 0:
+                filtered_users.append((user, period_count))
+        return filtered_users
+
+    async def build_rank(self, group_data: List[UserData], rank_type: RankType, limit: int,
+                         group_id: Optional[str] = None, date_range: Optional[tuple] = None) -> List[tuple]:
+        """筛选并排序排行榜数据
+
+        Args:
+            group_data (List[UserData]): 群组用户数据
+            rank_type (RankType): 排行榜类型
+            limit (int): 需要排好序的前几名
+            group_id (Optional[str]): 群组ID
+            date_range (Optional[tuple]): 自定义排行榜的日期范围
+
+        Returns:
+            List[tuple]: 前limit名按发言数降序排好，其余用户保留在列表尾部用于统计发言总数
+        """
+        filtered = await self.filter_users(group_data, rank_type, group_id, date_range)
+        return partial_sort(filtered, limit, key=lambda x: x[1])
+
+    # ========== 文本生成 ==========
+
+    @staticmethod
+    def generate_title(rank_type: RankType, date_range: Optional[tuple] = None) -> str:
+        """生成排行榜标题
+
+        Args:
+            rank_type (RankType): 排行榜类型
+            date_range (Optional[tuple]): 自定义排行榜的日期范围
+
+        Returns:
+            str: 排行榜标题
+        """
+        now = datetime.now()
+
+        if rank_type == RankType.CUSTOM and date_range:
+            start_date, end_date = date_range
+            if start_date == end_date:
+                return f"{start_date}发言榜单"
+            return f"{start_date}至{end_date}发言榜单"
+        elif rank_type == RankType.TOTAL:
+            return "总发言排行榜"
+        elif rank_type == RankType.DAILY:
+            return f"今日[{now.year}年{now.month}月{now.day}日]发言榜单"
+        elif rank_type == RankType.WEEKLY:
+            # 计算周数
+            week_num = now.isocalendar().week
+            return f"本周[{now.year}年{now.month}月第{week_num}周]发言榜单"
+        elif rank_type == RankType.MONTHLY:
+            return f"本月[{now.year}年{now.month}月]发言榜单"
+        else:
+            return "发言榜单"
+
+    @staticmethod
+    def generate_text_message(users_with_values: List[tuple], title: str, limit: int, for_push: bool = False) -> str:
+        """生成文字版排行榜
+
+        Args:
+            users_with_values (List[tuple]): [(UserData, 发言数)]，前limit名已排好序
+            title (str): 排行榜标题
+            limit (int): 显示人数
+            for_push (bool): 定时推送格式（奖牌图标和推送时间），否则为命令回复格式
+
+        Returns:
+            str: 格式化的文字消息
+        """
+        # 计算时间段内的总发言数
+        total_messages = sum(sort_value for _, sort_value in users_with_values)
+        top_users = users_with_values[:limit]
+
+        if for_push:
+            msg = [f"🏆 {title} 🏆\n━━━━━━━━━━━━━━\n"]
+        else:
+            msg = [f"{title}\n发言总数: {total_messages}\n━━━━━━━━━━━━━━\n"]
+
+        for i, (user, user_messages) in enumerate(top_users):
+            # 使用时间段内的发言数计算百分比
+            percentage = ((user_messages / total_messages) * 100) if total_messages > 0 else 0
+            if for_push:
+                emoji = ("🥇", "🥈", "🥉")[i] if i < 3 else f"第{i + 1}名"
+                msg.append(f"{emoji}：{user.nickname} - {user_messages}次 (占比{percentage:.2f}%)\n")
+            else:
+                msg.append(f"第{i + 1}名:{user.nickname}·{user_messages}次(占比{percentage:.2f}%)\n")
+
+        if for_push:
+            # 添加推送标识
+            msg.append(f"\n🤖 定时推送 | {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+        return ''.join(msg)
@@ -0,0 +1,66 @@
+"""
+排行榜选择工具模块
+
+排行榜只展示前K名，没有必要对整个群组做全量排序。
+这里基于 heapq.nlargest 提供有界堆的Top-K选择，复杂度 O(n log k)。
+
+heapq.nlargest 与 sorted(..., reverse=True)[:k] 结果完全一致，
+分数相同的元素保持原有顺序，因此并列名次的先后是确定的。
+"""
+
+import heapq
+from typing import Any, Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def top_k(items: Iterable[T], k: Optional[int], key: Callable[[T], Any]) -> List[T]:
+    """按key降序选出前k个元素
+
+    Args:
+        items (Iterable[T]): 待选择的元素
+        k (Optional[int]): 需要的数量，None表示全部
+        key (Callable[[T], Any]): 排序键
+
+    Returns:
+        List[T]: 按key降序排列的前k个元素，并列时保持原有顺序
+
+    Example:
+        >>> top_k([("a", 1), ("b", 3), ("c", 3)], 2, key=lambda x: x[1])
+        [('b', 3), ('c', 3)]
+    """
+    if k is None:
+        return sorted(items, key=key, reverse=True)
+    if k <= 0:
+        return []
+    return heapq.nlargest(k, items, key=key)
+
+
+def partial_sort(items: List[T], k: Optional[int], key: Callable[[T], Any]) -> List[T]:
+    """部分排序：前k个元素按key降序排好，其余元素保持原有顺序追加在后面
+
+    适用于只展示前k名、但仍需要全体数据做汇总（如发言总数、占比）的场景。
+
+    Args:
+        items (List[T]): 待排序的元素
+        k (Optional[int]): 需要排好序的数量，None表示全部排序
+        key (Callable[[T], Any]): 排序键
+
+    Returns:
+        List[T]: 新列表，list[:k] 与 sorted(items, key=key, reverse=True)[:k] 相同
+
+    Example:
+        >>> partial_sort([("a", 1), ("b", 3), ("c", 2)], 1, key=lambda x: x[1])
+        [('b', 3), ('a', 1), ('c', 2)]
+    """
+    if k is None or k >= len(items):
+        return sorted(items, key=key, reverse=True)
+    if k <= 0:
+        return list(items)
+
+    # 带上原始下标选择，便于把未入选的元素按原顺序放回
+    selected = heapq.nlargest(k, enumerate(items), key=lambda pair: key(pair[1]))
+    selected_indexes = {index for index, _ in selected}
+    head = [item for _, item in selected]
+    tail = [item for index, item in enumerate(items) if index not in selected_indexes]
+    return head + tail
@@ -0,0 +1,479 @@
+"""
+独立渲染进程模块
+
+Playwright渲染与消息监听共用同一个事件循环时，大图渲染和浏览器卡顿会拖慢发言记录。
+开启 render_worker_enabled 后，浏览器由 multiprocessing 启动的独立进程持有：
+
+- 主进程中的 RenderWorkerClient 通过管道发送渲染任务，等待渲染进程返回PNG临时文件路径
+- 渲染进程内部仍使用 ImageGenerator（页面池、头像缓存、常驻模板页面等配置照常生效）
+- 主进程定期发送心跳，渲染进程退出、无响应或渲染超时时自动重启
+
+管道中的消息均为元组：任务为 (job_id, 类型, 参数)，结果为 (job_id, 是否成功, 结果或错误信息)。
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from astrbot.api import logger as astrbot_logger
+
+from .models import UserData, GroupInfo, PluginConfig
+
+# 常量定义
+WORKER_START_TIMEOUT = 60  # 等待渲染进程启动浏览器的最长时间（秒）
+WORKER_RENDER_TIMEOUT = 60  # 单次渲染的最长等待时间（秒），超时后重启渲染进程
+WORKER_HEALTH_INTERVAL = 30  # 心跳间隔（秒）
+WORKER_PING_TIMEOUT = 10  # 心跳响应超时（秒）
+WORKER_STOP_TIMEOUT = 10  # 停止渲染进程时等待其自行退出的时间（秒）
+WORKER_RESTART_BACKOFF_MAX = 300  # 连续重启失败时的最长重试间隔（秒）
+
+# 任务类型
+JOB_RENDER = "render"
+JOB_PING = "ping"
+JOB_STOP = "stop"
+READY_JOB_ID = 0  # 渲染进程启动完成时使用的消息ID
+
+
+class RenderWorkerError(Exception):
+    """渲染进程异常
+
+    渲染进程未运行、渲染失败或等待超时时抛出。
+    """
+    pass
+
+
+def _serialize_users(users: List[UserData]) -> List[Dict[str, Any]]:
+    """只提取渲染需要的字段，避免把完整发言历史传给渲染进程"""
+    items = []
+    for user in users:
+        item = {
+            "user_id": user.user_id,
+            "nickname": user.nickname,
+            "message_count": user.message_count,
+            "last_date": user.last_date
+        }
+        if hasattr(user, "display_total"):
+            item["display_total"] = user.display_total
+        items.append(item)
+    return items
+
+
+def _deserialize_users(items: List[Dict[str, Any]]) -> List[UserData]:
+    users = []
+    for item in items:
+        user = UserData(
+            user_id=item["user_id"],
+            nickname=item["nickname"],
+            message_count=item["message_count"],
+            last_date=item["last_date"]
+        )
+        if "display_total" in item:
+            user.display_total = item["display_total"]
+        users.append(user)
+    return users
+
+
+# ========== 渲染进程 ==========
+
+def _worker_main(job_reader, result_writer, config_data: Dict[str, Any], avatar_options: Optional[Dict[str, Any]]):
+    """渲染进程入口"""
+    try:
+        asyncio.run(_worker_loop(job_reader, result_writer, config_data, avatar_options))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(job_reader, result_writer, config_data: Dict[str, Any],
+                       avatar_options: Optional[Dict[str, Any]]):
+    """在渲染进程中创建图片生成器，逐个接收任务并发执行"""
+    # 延迟导入：image_generator 在主进程中依赖本模块
+    from .image_generator import ImageGenerator
+    from .avatar_cache import AvatarCache
+
+    config = PluginConfig.from_dict(config_data)
+    config.render_worker_enabled = False  # 渲染进程内直接渲染
+    avatar_cache = AvatarCache(**avatar_options) if avatar_options else None
+    if avatar_cache:
+        await avatar_cache.initialize()
+    generator = ImageGenerator(config, avatar_cache=avatar_cache)
+    tasks = set()
+
+    def reply(job_id: int, ok: bool, result: Any):
+        try:
+            result_writer.send((job_id, ok, result))
+        except (OSError, ValueError):
+            # 主进程已关闭管道
+            pass
+
+    async def run_render(job_id: int, payload: Dict[str, Any]):
+        try:
+            temp_path = await generator.generate_rank_image(
+                _deserialize_users(payload["users"]),
+                GroupInfo(**payload["group_info"]),
+                payload["title"],
+                payload["current_user_id"]
+            )
+        except Exception as e:
+            reply(job_id, False, f"渲染失败: {e}")
+            return
+        if temp_path:
+            reply(job_id, True, temp_path)
+        else:
+            reply(job_id, False, "渲染失败，详见渲染进程日志")
+
+    try:
+        await generator.initialize()
+        if not generator.is_available:
+            reply(READY_JOB_ID, False, "图片生成器不可用")
+            return
+        reply(READY_JOB_ID, True, None)
+
+        while True:
+            try:
+                job_id, kind, payload = await asyncio.to_thread(job_reader.recv)
+            except (EOFError, OSError):
+                # 主进程已退出
+                break
+
+            if kind == JOB_STOP:
+                break
+            if kind == JOB_PING:
+                reply(job_id, True, generator.get_render_stats())
+            elif kind == JOB_RENDER:
+                task = asyncio.create_task(run_render(job_id, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+    except Exception as e:
+        reply(READY_JOB_ID, False, str(e))
+    finally:
+        for task in list(tasks):
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await generator.cleanup()
+        if avatar_cache:
+            await avatar_cache.close()
+
+
+# ========== 主进程客户端 ==========
+
+class RenderWorkerClient:
+    """渲染进程客户端
+
+    负责启动渲染进程、分发渲染任务、心跳检测和自动重启。
+    渲染进程使用 spawn 方式启动，不继承主进程的事件循环和线程。
+
+    Attributes:
+        config (PluginConfig): 插件配置，传给渲染进程创建图片生成器
+        avatar_options (Optional[Dict[str, Any]]): 渲染进程中创建 AvatarCache 的参数，为None时不使用头像缓存
+        process (Optional[multiprocessing.Process]): 当前的渲染进程
+
+    Example:
+        >>> worker = RenderWorkerClient(config)
+        >>> if await worker.start():
+        ...     image_path = await worker.render(users, group_info, "排行榜")
+    """
+
+    def __init__(self, config: PluginConfig, avatar_options: Optional[Dict[str, Any]] = None, logger=None):
+        self.config = config
+        self.avatar_options = avatar_options
+        self.logger = logger or astrbot_logger
+        self.process = None
+
+        self._context = multiprocessing.get_context("spawn")
+        self._job_writer = None
+        self._result_reader = None
+        self._send_lock = threading.Lock()
+        self._job_ids = itertools.count(READY_JOB_ID + 1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._generation = 0  # 每次启动加1，忽略已退出进程的迟到消息
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._restart_lock = asyncio.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._spawning = False
+
+        self._started_at = 0.0
+        self._restarts = 0
+        self._jobs = 0
+        self._failures = 0
+        self._last_ping_ms: Optional[float] = None
+        self._worker_render_stats: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_running(self) -> bool:
+        """渲染进程是否存活"""
+        return self.process is not None and self.process.is_alive()
+
+    # ========== 生命周期 ==========
+
+    async def start(self) -> bool:
+        """启动渲染进程并等待浏览器就绪
+
+        Returns:
+            bool: 渲染进程是否启动成功
+        """
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        if not await self._spawn():
+            return False
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+        return True
+
+    async def _spawn(self) -> bool:
+        """启动一个新的渲染进程，等待其报告就绪"""
+        self._spawning = True
+        try:
+            return await self._spawn_process()
+        finally:
+            self._spawning = False
+
+    async def _spawn_process(self) -> bool:
+        self._generation += 1
+        generation = self._generation
+
+        job_reader, self._job_writer = self._context.Pipe(duplex=False)
+        self._result_reader, result_writer = self._context.Pipe(duplex=False)
+        ready = self._loop.create_future()
+        self._pending[READY_JOB_ID] = ready
+
+        self.process = self._context.Process(
+            target=_worker_main,
+            args=(job_reader, result_writer, self.config.to_dict(), self.avatar_options),
+            name="message-stats-render-worker",
+            daemon=True
+        )
+        try:
+            # spawn 需要启动新的解释器，放到线程中避免阻塞事件循环
+            await asyncio.to_thread(self.process.start)
+        except Exception as e:
+            self._pending.pop(READY_JOB_ID, None)
+            self.logger.error(f"启动渲染进程失败: {e}")
+            self.process = None
+            return False
+        finally:
+            # 子进程持有的一端在主进程中关闭，子进程退出时读取端才能收到EOF
+            job_reader.close()
+            result_writer.close()
+
+        threading.Thread(
+            target=self._read_results, args=(self._result_reader, generation),
+            name="render-worker-reader", daemon=True
+        ).start()
+
+        try:
+            await asyncio.wait_for(ready, timeout=WORKER_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.logger.error(f"渲染进程启动超时({WORKER_START_TIMEOUT}秒)")
+            await self._terminate_process()
+            return False
+        except RenderWorkerError as e:
+            self.logger.error(f"渲染进程启动失败: {e}")
+            await self._terminate_process()
+            return False
+        finally:
+            self._pending.pop(READY_JOB_ID, None)
+
+        self._started_at = time.time()
+        self.logger.info(f"渲染进程已启动 (pid={self.process.pid})")
+        return True
+
+    async def stop(self):
+        """停止心跳检测和渲染进程"""
+        self._stopping = True
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        if self.is_running:
+            try:
+                await asyncio.to_thread(self._send, (READY_JOB_ID, JOB_STOP, None))
+            except (OSError, ValueError):
+                pass
+        await self._terminate_process()
+        self.logger.info("渲染进程已停止")
+
+    async def _terminate_process(self):
+        """结束当前渲染进程，未完成的任务全部失败"""
+        process = self.process
+        self.process = None
+        # 使迟到的结果和EOF通知失效
+        self._generation += 1
+        self._fail_pending(RenderWorkerError("渲染进程已退出"))
+
+        if process is not None:
+            def _join():
+                process.join(WORKER_STOP_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+                    process.join(WORKER_STOP_TIMEOUT)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            await asyncio.to_thread(_join)
+
+        for conn in (self._job_writer, self._result_reader):
+            if conn is not None:
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+        self._job_writer = None
+        self._result_reader = None
+
+    async def restart(self, reason: str) -> bool:
+        """重启渲染进程
+
+        Args:
+            reason (str): 重启原因，写入日志
+
+        Returns:
+            bool: 新的渲染进程是否启动成功
+        """
+        async with self._restart_lock:
+            if self._stopping:
+                return False
+            self.logger.warning(f"重启渲染进程: {reason}")
+            self._restarts += 1
+            await self._terminate_process()
+            return await self._spawn()
+
+    # ========== 任务 ==========
+
+    def _send(self, message):
+        with self._send_lock:
+            if self._job_writer is None:
+                raise RenderWorkerError("渲染进程未运行")
+            self._job_writer.send(message)
+
+    async def _request(self, kind: str, payload: Any, timeout: float) -> Any:
+        """发送任务并等待结果"""
+        if not self.is_running:
+            raise RenderWorkerError("渲染进程未运行")
+
+        job_id = next(self._job_ids)
+        future = self._loop.create_future()
+        self._pending[job_id] = future
+        try:
+            await asyncio.to_thread(self._send, (job_id, kind, payload))
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(job_id, None)
+
+    async def render(self, users: List[UserData], group_info: GroupInfo, title: str,
+                     current_user_id: Optional[str] = None) -> str:
+        """在渲染进程中生成排行榜图片
+
+        Returns:
+            str: 渲染进程写入的PNG临时文件路径，由调用方负责删除
+
+        Raises:
+            RenderWorkerError: 渲染进程未运行、渲染失败或超时
+        """
+        payload = {
+            "users": _serialize_users(users),
+            "group_info": group_info.to_dict(),
+            "title": title,
+            "current_user_id": current_user_id
+        }
+        self._jobs += 1
+        try:
+            return await self._request(JOB_RENDER, payload, WORKER_RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._failures += 1
+            # 渲染卡住通常是浏览器异常，重启后后续任务可以恢复
+            asyncio.create_task(self.restart(f"渲染超过{WORKER_RENDER_TIMEOUT}秒未完成"))
+            raise RenderWorkerError(f"渲染进程超时({WORKER_RENDER_TIMEOUT}秒)")
+        except (RenderWorkerError, OSError, ValueError) as e:
+            self._failures += 1
+            raise RenderWorkerError(str(e))
+
+    async def ping(self) -> bool:
+        """心跳检测，渲染进程的事件循环能及时响应时返回True"""
+        started = time.perf_counter()
+        try:
+            self._worker_render_stats = await self._request(JOB_PING, None, WORKER_PING_TIMEOUT)
+        except (asyncio.TimeoutError, RenderWorkerError, OSError, ValueError):
+            return False
+        self._last_ping_ms = round((time.perf_counter() - started) * 1000, 1)
+        return True
+
+    async def _health_loop(self):
+        """定期检查渲染进程，退出或无响应时重启，连续失败时逐步延长重试间隔"""
+        backoff = WORKER_HEALTH_INTERVAL
+        while not self._stopping:
+            await asyncio.sleep(backoff)
+            if self._stopping:
+                break
+            if self.is_running and await self.ping():
+                backoff = WORKER_HEALTH_INTERVAL
+                continue
+
+            reason = "心跳无响应" if self.is_running else "进程已退出"
+            if await self.restart(reason):
+                backoff = WORKER_HEALTH_INTERVAL
+            else:
+                backoff = min(backoff * 2, WORKER_RESTART_BACKOFF_MAX)
+
+    # ========== 结果接收 ==========
+
+    def _read_results(self, conn, generation: int):
+        """在线程中读取渲染进程的结果，转交事件循环处理"""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._resolve, generation, message)
+        self._loop.call_soon_threadsafe(self._on_worker_exit, generation)
+
+    def _resolve(self, generation: int, message):
+        if generation != self._generation:
+            return
+        job_id, ok, result = message
+        future = self._pending.get(job_id)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(result)
+        else:
+            future.set_exception(RenderWorkerError(result))
+
+    def _on_worker_exit(self, generation: int):
+        """渲染进程意外退出时立即重启，不必等待下一次心跳"""
+        if generation != self._generation or self._stopping:
+            return
+        # 启动过程中退出时，等待就绪的 _spawn 会收到异常并自行处理，这里不再重启
+        self._fail_pending(RenderWorkerError("渲染进程意外退出"))
+        if not self._spawning:
+            asyncio.create_task(self.restart("进程意外退出"))
+
+    def _fail_pending(self, error: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    # ========== 统计 ==========
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取渲染进程状态：存活情况、任务数、重启次数和最近一次心跳带回的渲染统计"""
+        return {
+            'pid': self.process.pid if self.process else None,
+            'alive': self.is_running,
+            'uptime_seconds': round(time.time() - self._started_at) if self.is_running else 0,
+            'pending': len(self._pending),
+            'jobs': self._jobs,
+            'failures': self._failures,
+            'restarts': self._restarts,
+            'last_ping_ms': self._last_ping_ms,
+            'worker_render_stats': self._worker_render_stats
+        }
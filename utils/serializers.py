@@ -0,0 +1,115 @@
+"""
+序列化工具模块
+为群组数据、消息日志和配置文件提供可插拔的序列化器
+
+优先使用orjson（bytes进出、无缩进），未安装时回退到标准库json。
+两种序列化器都能读取旧版本带缩进的JSON文件。
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Union
+
+# orjson为可选依赖，未安装时回退到标准库json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    from astrbot.api import logger
+except ImportError:
+    # 测试环境或导入失败时使用标准logging
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+# 数据格式版本常量
+# 版本1：旧版本标准库json.dumps(indent=2)写入的文件，没有format_version字段
+# 版本2：紧凑格式，文件头部带有format_version字段
+DATA_FORMAT_VERSION = 2
+LEGACY_FORMAT_VERSION = 1
+
+SERIALIZER_ORJSON = "orjson"
+SERIALIZER_JSON = "json"
+
+
+class Serializer(ABC):
+    """序列化器基类
+
+    dumps 总是返回UTF-8编码的bytes，loads 同时接受bytes和str，
+    便于调用方统一使用二进制模式读写文件。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def dumps(self, data: Any, pretty: bool = False) -> bytes:
+        """序列化为bytes
+
+        Args:
+            data (Any): 要序列化的数据
+            pretty (bool): 是否带缩进输出，供需要手工编辑的文件使用
+
+        Returns:
+            bytes: UTF-8编码的JSON内容
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def loads(self, content: Union[bytes, str]) -> Any:
+        """反序列化
+
+        Raises:
+            json.JSONDecodeError: 当内容不是有效JSON时抛出（orjson的异常也是其子类）
+        """
+        raise NotImplementedError
+
+
+class StdJsonSerializer(Serializer):
+    """标准库json序列化器（orjson不可用时的回退实现）"""
+
+    name = SERIALIZER_JSON
+
+    def dumps(self, data: Any, pretty: bool = False) -> bytes:
+        if pretty:
+            return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        return json.loads(content)
+
+
+class OrjsonSerializer(Serializer):
+    """orjson序列化器"""
+
+    name = SERIALIZER_ORJSON
+
+    def dumps(self, data: Any, pretty: bool = False) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        return orjson.loads(content)
+
+
+def get_serializer(name: str = SERIALIZER_ORJSON) -> Serializer:
+    """获取序列化器
+
+    Args:
+        name (str): 序列化器名称，"orjson"（默认）或 "json"
+
+    Returns:
+        Serializer: 序列化器实例，请求orjson但未安装时返回标准库实现
+
+    Example:
+        >>> serializer = get_serializer()
+        >>> serializer.loads(serializer.dumps({"a": 1}))
+        {'a': 1}
+    """
+    if name == SERIALIZER_ORJSON:
+        if ORJSON_AVAILABLE:
+            return OrjsonSerializer()
+        logger.warning("orjson未安装，使用标准库json进行序列化")
+    return StdJsonSerializer()
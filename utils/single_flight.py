@@ -0,0 +1,73 @@
+"""
+请求合并（single-flight）模块
+
+排行榜发出后，常有几十个群成员在几秒内发送同样的 #发言榜 命令。
+SingleFlight 让同一个键的并发调用只执行一次：第一个调用者执行计算，
+其余调用者等待并共享同一个结果（或同一个异常）。计算完成后键立即释放，
+之后的调用由各自的结果缓存负责。
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """按键合并并发的异步计算
+
+    Example:
+        >>> flight = SingleFlight()
+        >>> image_path = await flight.do(cache_key, lambda: render(cache_key))
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._executed = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """执行或加入 key 对应的计算
+
+        Args:
+            key (Hashable): 计算的键，键相同的并发调用共享结果
+            func (Callable[[], Awaitable[T]]): 没有进行中的计算时调用，返回要等待的协程
+
+        Returns:
+            T: 计算结果
+
+        Raises:
+            Exception: 计算抛出的异常会传递给所有等待者
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self._shared += 1
+            # shield：某个等待者被取消时不影响共享的计算
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._executed += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免"exception was never retrieved"警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计：实际执行次数、共享结果次数和进行中的计算数量"""
+        return {
+            'executed': self._executed,
+            'shared': self._shared,
+            'inflight': len(self._inflight)
+        }
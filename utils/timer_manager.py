@@ -10,15 +10,13 @@
 """
 
 import asyncio
+import copy
 import re
-import json
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from enum import Enum
 from pathlib import Path
 import aiofiles
-# 使用croniter模块支持更灵活的定时表达式
-from croniter import croniter
 from astrbot.api import logger as astrbot_logger
 from astrbot.api.event import AstrMessageEvent, MessageChain, filter
 # PlatformAdapterType 在 astrbot.api.event.filter 中
@@ -27,7 +25,8 @@ from astrbot.api.event import AstrMessageEvent, MessageChain, filter
 from .models import RankType, UserData, GroupInfo
 from .data_manager import DataManager
 from .image_generator import ImageGenerator
-from .date_utils import get_current_date, get_week_start, get_month_start
+from .ranking import top_k
+from .rank_service import RankService
 from .exception_handlers import safe_timer_operation, safe_generation, safe_data_operation
 
 
@@ -239,7 +238,8 @@ class TimerManager:
         >>> status = await timer_manager.get_status()
     """
     
-    def __init__(self, data_manager: DataManager, image_generator: ImageGenerator, context=None, group_unified_msg_origins: Dict[str, str] = None):
+    def __init__(self, data_manager: DataManager, image_generator: ImageGenerator, context=None,
+                 group_unified_msg_origins: Dict[str, str] = None, rank_service: Optional[RankService] = None):
         """初始化定时任务管理器
         
         Args:
@@ -247,8 +247,10 @@ class TimerManager:
             image_generator (ImageGenerator): 图片生成器实例
             context: AstrBot上下文对象
             group_unified_msg_origins: 群组unified_msg_origin映射表
+            rank_service (Optional[RankService]): 排行榜服务，与命令处理共用以复用计算结果；未提供时自行创建
         """
         self.data_manager = data_manager
+        self.rank_service = rank_service or RankService(data_manager)
         self.image_generator = image_generator
         self.context = context
         self.group_unified_msg_origins = group_unified_msg_origins or {}
@@ -482,67 +484,33 @@ class TimerManager:
     async def _get_group_name(self, group_id: str) -> str:
         """获取群组名称
         
+        从群组元数据索引读取（与命令处理共用），已过期时在后台刷新。
+        
         Args:
             group_id: 群组ID
             
         Returns:
             str: 群组名称，如果获取失败则返回默认格式
         """
+        return await self.data_manager.group_metadata.get_group_name(
+            group_id, lambda: self._fetch_group_info(group_id)
+        )
+    
+    async def _fetch_group_info(self, group_id: str) -> Optional[Dict[str, Any]]:
+        """通过aiocqhttp平台API获取群信息（群名称、成员数）"""
+        if not self.context or not hasattr(self.context, 'get_platform'):
+            return None
         try:
-            # 首先尝试从缓存文件获取群组名称
-            group_file_path = self.data_manager.groups_dir / f"{group_id}.json"
-            
-            if await aiofiles.os.path.exists(group_file_path):
-                async with aiofiles.open(group_file_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    if content.strip():
-                        data = json.loads(content)
-                        # 尝试从用户数据中推断群组名称
-                        if isinstance(data, list) and len(data) > 0:
-                            # 从第一个用户的数据中尝试获取群组信息
-                            first_user = data[0]
-                            if isinstance(first_user, dict):
-                                # 尝试各种可能的群组名称字段
-                                for key in ['group_name', 'group_name_cn', '群名', '群组名', 'name', 'title']:
-                                    if key in first_user and first_user[key]:
-                                        return str(first_user[key]).strip()
-                                # 如果有群组信息字段，尝试从中提取
-                                if 'group_info' in first_user and isinstance(first_user['group_info'], dict):
-                                    for key in ['name', 'title', 'group_name']:
-                                        if key in first_user['group_info'] and first_user['group_info'][key]:
-                                            return str(first_user['group_info'][key]).strip()
-                        elif isinstance(data, dict):
-                            # 如果数据是字典格式，尝试从中获取群组名称
-                            for key in ['group_name', 'group_name_cn', '群名', '群组名', 'name', 'title']:
-                                if key in data and data[key]:
-                                    return str(data[key]).strip()
-            
-            # 如果缓存中没有，尝试通过API获取群组信息
-            if self.context:
-                try:
-                    # 检查是否为aiocqhttp平台
-                    if hasattr(self.context, 'get_platform'):
-                        platform = self.context.get_platform(filter.PlatformAdapterType.AIOCQHTTP)
-                        if platform and hasattr(platform, 'get_client'):
-                            client = platform.get_client()
-                            if client and hasattr(client, 'api'):
-                                # 调用get_group_info API
-                                group_info = await client.api.call_action('get_group_info', group_id=group_id)
-                                if group_info and isinstance(group_info, dict):
-                                    # 尝试从返回的群组信息中获取群名
-                                    group_name = group_info.get('group_name') or group_info.get('group_title') or group_info.get('name')
-                                    if group_name:
-                                        return str(group_name).strip()
-                except Exception as api_error:
-                    self.logger.warning(f"通过API获取群组 {group_id} 名称失败: {api_error}")
-            
-            # 如果所有方法都失败，返回默认格式
-            return f"群{group_id}"
-            
-        except (OSError, IOError, ValueError, TypeError, KeyError) as e:
-            # 捕获获取群组名称时的文件、系统、数值、类型和键错误
-            self.logger.warning(f"获取群组 {group_id} 名称时发生错误: {e}")
-            return f"群{group_id}"
+            platform = self.context.get_platform(filter.PlatformAdapterType.AIOCQHTTP)
+            if platform and hasattr(platform, 'get_client'):
+                client = platform.get_client()
+                if client and hasattr(client, 'api'):
+                    group_info = await client.api.call_action('get_group_info', group_id=group_id)
+                    if group_info and isinstance(group_info, dict):
+                        return group_info
+        except Exception as api_error:
+            self.logger.warning(f"通过API获取群组 {group_id} 名称失败: {api_error}")
+        return None
     
     @safe_data_operation(default_return=False)
     async def _push_to_group(self, group_id: str, config) -> bool:
@@ -566,24 +534,23 @@ class TimerManager:
         rank_type = RankType.DAILY
         self.logger.info(f"群组 {group_id} 定时推送使用今日排行榜")
         
-        filtered_data = await self._filter_data_by_rank_type(group_data, rank_type)
+        filtered_data = await self.rank_service.filter_users(group_data, rank_type, group_id)
         if not filtered_data:
             self.logger.warning(f"群组 {group_id} 没有符合条件的用户数据")
             return False
         
-        # 排序数据
-        filtered_data.sort(key=lambda x: x[1], reverse=True)
-        
-        # 限制数量
-        limited_data = filtered_data[:config.rand]
+        # 只选出前 config.rand 名，无需对全部用户排序
+        limited_data = top_k(filtered_data, config.rand, key=lambda x: x[1])
         users_for_rank = []
         
         # 为用户数据设置display_total属性，确保图片生成器使用正确的数据
         # 修复：图片版排行榜显示昨日数据的问题
+        # UserData常驻内存并与命令处理共享，只在副本上设置，避免并发的排行榜互相覆盖
         for user_data, count in limited_data:
             # 设置display_total属性（时间段内的发言数）
-            user_data.display_total = count
-            users_for_rank.append(user_data)
+            user_copy = copy.copy(user_data)
+            user_copy.display_total = count
+            users_for_rank.append(user_copy)
         
         # 创建群组信息
         group_info = GroupInfo(group_id=str(group_id))
@@ -592,14 +559,17 @@ class TimerManager:
         group_info.group_name = group_name
         
         # 生成标题
-        title = self._generate_title(rank_type)
+        title = self.rank_service.generate_title(rank_type)
         
         # 定时推送尝试发送图片版本
         image_path = await self._generate_rank_image(users_for_rank, group_info, title, config)
         if not image_path:
             self.logger.warning(f"群组 {group_id} 图片生成失败，降级到文字模式")
             # 降级到文字模式
-            text_message = self._generate_text_message([(user, getattr(user, 'display_total', user.message_count)) for user in users_for_rank], group_info, title, config)
+            text_message = self.rank_service.generate_text_message(
+                [(user, getattr(user, 'display_total', user.message_count)) for user in users_for_rank],
+                title, config.rand, for_push=True
+            )
             success = await self.push_service.push_to_group(group_id, text_message, None)
         else:
             # 定时推送只发送图片，不发送文字消息
@@ -710,7 +680,8 @@ class TimerManager:
                 return True
                 
             # 尝试cron格式
-            # 使用croniter验证cron表达式
+            # 使用croniter验证cron表达式（只有cron格式才需要，使用时再导入）
+            from croniter import croniter
             croniter(time_str)
             return True
         except Exception as e:
@@ -747,12 +718,13 @@ class TimerManager:
             else:
                 # 处理cron格式
                 # 使用croniter计算下次执行时间
+                from croniter import croniter
                 cron = croniter(push_time, now)
                 next_time = cron.get_next(datetime)
                 return next_time
             
-        except (ValueError, TypeError, OSError, IOError) as e:
-            # 捕获计算推送时间时的数值、类型和系统错误
+        except (ValueError, TypeError, OSError, IOError, ImportError) as e:
+            # 捕获计算推送时间时的数值、类型和系统错误，以及croniter未安装
             self.logger.error(f"计算下次推送时间失败: {e}")
             # 返回默认时间（明早9点）
             tomorrow = datetime.now() + timedelta(days=1)
@@ -785,131 +757,6 @@ class TimerManager:
         else:
             raise ValueError(f"无效的排行榜类型: {rank_type_str}")
     
-    async def _filter_data_by_rank_type(self, group_data: List[UserData], rank_type: RankType) -> List[tuple]:
-        """根据排行榜类型筛选数据
-        
-        Args:
-            group_data: 群组用户数据
-            rank_type: 排行榜类型
-            
-        Returns:
-            List[tuple]: 筛选后的数据，格式为[(UserData, count)]
-        """
-        try:
-            current_date = get_current_date().to_date()
-            
-            if rank_type == RankType.TOTAL:
-                # 总榜：返回每个用户及其总发言数的元组，但过滤掉从未发言的用户
-                return [(user, user.message_count) for user in group_data if user.message_count > 0]
-            
-            # 时间段过滤
-            filtered_users = []
-            for user in group_data:
-                if not user.history:
-                    continue
-                
-                # 计算指定时间段的发言次数
-                period_count = user.get_message_count_in_period(
-                    *self._get_time_period_for_rank_type(rank_type, current_date)
-                )
-                if period_count > 0:
-                    filtered_users.append((user, period_count))
-            
-            return filtered_users
-            
-        except Exception as e:
-            self.logger.error(f"筛选数据时发生错误: {e}")
-            return []
-    
-    def _get_time_period_for_rank_type(self, rank_type: RankType, current_date) -> tuple:
-        """获取排行榜类型对应的时间段
-        
-        Args:
-            rank_type: 排行榜类型
-            current_date: 当前日期
-            
-        Returns:
-            tuple: (start_date, end_date)
-        """
-        if rank_type == RankType.DAILY:
-            return current_date, current_date
-        elif rank_type == RankType.WEEKLY:
-            # 获取本周开始日期(周一)
-            week_start = get_week_start(current_date)
-            return week_start, current_date
-        elif rank_type == RankType.MONTHLY:
-            # 获取本月开始日期
-            month_start = get_month_start(current_date)
-            return month_start, current_date
-        else:
-            # 总榜不需要时间段过滤
-            return None, None
-    
-    def _generate_title(self, rank_type: RankType) -> str:
-        """生成标题
-        
-        Args:
-            rank_type: 排行榜类型
-            
-        Returns:
-            str: 排行榜标题
-        """
-        now = datetime.now()
-        
-        if rank_type == RankType.TOTAL:
-            return "总发言排行榜"
-        elif rank_type == RankType.DAILY:
-            return f"今日[{now.year}年{now.month}月{now.day}日]发言榜单"
-        elif rank_type == RankType.WEEKLY:
-            # 计算周数
-            week_num = now.isocalendar().week
-            return f"本周[{now.year}年{now.month}月第{week_num}周]发言榜单"
-        elif rank_type == RankType.MONTHLY:
-            return f"本月[{now.year}年{now.month}月]发言榜单"
-        else:
-            return "发言榜单"
-    
-    def _generate_text_message(self, users_with_values: List[tuple], group_info: GroupInfo, title: str, config) -> str:
-        """生成文字消息
-        
-        Args:
-            users_with_values: 包含(UserData, sort_value)元组的列表
-            group_info: 群组信息
-            title: 排行榜标题
-            config: 插件配置对象
-            
-        Returns:
-            str: 格式化的文字消息
-        """
-        # 计算时间段内的总发言数
-        total_messages = sum(sort_value for _, sort_value in users_with_values)
-        
-        # 数据已经在_show_rank中排好序，直接使用并限制数量
-        top_users = users_with_values[:config.rand]
-        
-        msg = [f"🏆 {title} 🏆\n━━━━━━━━━━━━━━\n"]
-        
-        for i, (user, user_messages) in enumerate(top_users):
-            # 使用时间段内的发言数计算百分比
-            percentage = ((user_messages / total_messages) * 100) if total_messages > 0 else 0
-            
-            # 添加排名表情
-            if i == 0:
-                emoji = "🥇"
-            elif i == 1:
-                emoji = "🥈"
-            elif i == 2:
-                emoji = "🥉"
-            else:
-                emoji = f"第{i+1}名"
-            
-            msg.append(f"{emoji}：{user.nickname} - {user_messages}次 (占比{percentage:.2f}%)\n")
-        
-        # 添加推送标识
-        msg.append(f"\n🤖 定时推送 | {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        
-        return ''.join(msg)
-    
     async def get_status(self) -> Dict[str, Any]:
         """获取定时任务状态
         
@@ -5,6 +5,7 @@
 
 import re
 import asyncio
+import importlib.util
 from pathlib import Path
 from typing import Any, Optional, List, Dict, Callable
 from datetime import datetime, date
@@ -12,10 +13,8 @@ from astrbot.api import logger as astrbot_logger
 import html
 
 
-try:
-    import bleach
-except ImportError:
-    bleach = None
+# bleach导入耗时较长，模块加载时只检查是否安装，清理HTML时才导入
+BLEACH_AVAILABLE = importlib.util.find_spec("bleach") is not None
 
 
 # 验证常量定义
@@ -507,6 +506,13 @@ class Validators:
         if not content:
             return ""
         
+        bleach = None
+        if BLEACH_AVAILABLE:
+            try:
+                import bleach
+            except ImportError:
+                pass
+        
         if bleach is None:
             # 记录警告日志
             Validators.logger.warning("bleach库未安装，使用基础HTML转义作为备选方案")